@@ -35,8 +35,8 @@ def fetch_pokemon():
         pass
     return ['Pikachu', 'Charizard', 'Bulbasaur', 'Squirtle', 'Jigglypuff', 'Meowth', 'Psyduck', 'Snorlax']
 
-def get_cards(theme):
-    """Get cards for the specified theme"""
+def theme_items(theme):
+    """The distinct card faces of a theme, fetching remote themes on first use"""
     if theme == 'starwars':
         if not THEMES['starwars']:
             THEMES['starwars'] = fetch_starwars_characters()
@@ -49,7 +49,27 @@ def get_cards(theme):
         items = THEMES[theme]
     else:
         items = THEMES['emoji']
-    
-    cards = items * 2
+    return items
+
+def get_cards(theme):
+    """Get cards for the specified theme"""
+    cards = theme_items(theme) * 2
     random.shuffle(cards)
     return cards
+
+def deal_decks(theme, count, pairs=None, seed=None):
+    """Deal `count` shuffled decks of `pairs` pairs (default: all) in one batch.
+
+    Every deck comes from one generator, so a seed reproduces the whole batch.
+    """
+    items = theme_items(theme)
+    pairs = len(items) if pairs is None else pairs
+    # A new Random() seeds itself from os.urandom; only pay for that when asked
+    rng = random if seed is None else random.Random(seed)
+    decks = []
+    for _ in range(count):
+        faces = items if pairs == len(items) else rng.sample(items, pairs)
+        deck = faces * 2
+        rng.shuffle(deck)
+        decks.append(deck)
+    return decks
@@ -0,0 +1,104 @@
+"""
+Benchmark CLI.
+
+    python -m benchmarks run --out results.json [--filter serialize]
+    python -m benchmarks run --out benchmarks/baselines/local.json
+    python -m benchmarks compare benchmarks/baselines/local.json results.json --threshold 0.15
+    python -m benchmarks servers --servers daphne uvicorn -- --rooms 50 --players 4 --duration 60
+
+``compare`` exits with status 1 when any benchmark's median time per op
+regressed by more than the threshold (a fraction, 0.15 = 15% slower), or
+when a benchmark in the baseline was skipped or absent from the current run.
+``servers`` runs loadgen (arguments after ``--``) against each ASGI server
+stack in turn and compares latency and server CPU per message.
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+import django
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'memory_game.settings')
+    os.environ.setdefault('LOOP_LAG_MONITOR', '0')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    django.setup()
+
+
+def cmd_run(args):
+    setup_django()
+    from . import bench_channels, bench_core, bench_http  # noqa: F401  (registers benchmarks)
+    from .harness import run_benchmarks, save
+    document = asyncio.run(run_benchmarks(args.filter, args.repeat, args.min_time))
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        save(document, args.out)
+        print(f'Saved {len(document["results"])} results to {args.out}')
+    return 0
+
+
+def cmd_compare(args):
+    from .harness import compare, load
+    current = load(args.current)
+    rows, regressions, missing = compare(load(args.baseline), current, args.threshold)
+    skipped = current.get('skipped', {})
+    print(f'{"benchmark":<48} {"baseline us":>12} {"current us":>12} {"change":>8}')
+    for name, base, value, ratio in rows:
+        base_text = f'{base * 1e6:12.2f}' if base is not None else f'{"new":>12}'
+        if value is None:
+            value_text = f'{"skipped" if name in skipped else "missing":>12}'
+        else:
+            value_text = f'{value * 1e6:12.2f}'
+        change = f'{(ratio - 1) * 100:+7.1f}%' if ratio is not None else ''
+        flag = '  REGRESSION' if name in regressions else '  MISSING' if name in missing else ''
+        print(f'{name:<48} {base_text} {value_text} {change:>8}{flag}')
+    status = 0
+    if regressions:
+        print(f'\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}')
+        status = 1
+    if missing:
+        print(f'\n{len(missing)} baseline benchmark(s) were not measured: {", ".join(missing)}')
+        status = 1
+    return status
+
+
+def cmd_servers(args):
+    setup_django()
+    from .harness import save
+    from .servers import compare_servers, format_table
+    loadgen_argv = args.loadgen_args[1:] if args.loadgen_args[:1] == ['--'] else args.loadgen_args
+    reports = asyncio.run(compare_servers(args.servers, loadgen_argv))
+    print(format_table(reports))
+    if args.out:
+        save(reports, args.out)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run', help='run benchmarks')
+    run.add_argument('--filter', help='only run benchmarks whose name contains this')
+    run.add_argument('--out', help='write JSON results here')
+    run.add_argument('--repeat', type=int, default=5)
+    run.add_argument('--min-time', type=float, default=0.05, help='minimum seconds per timed batch')
+    run.set_defaults(func=cmd_run)
+    cmp = sub.add_parser('compare', help='compare results against a baseline')
+    cmp.add_argument('baseline')
+    cmp.add_argument('current')
+    cmp.add_argument('--threshold', type=float, default=0.15)
+    cmp.set_defaults(func=cmd_compare)
+    servers = sub.add_parser('servers', help='compare ASGI server stacks under loadgen')
+    servers.add_argument('--servers', nargs='+', choices=['daphne', 'uvicorn'], default=['daphne', 'uvicorn'])
+    servers.add_argument('--out', help='write the loadgen reports here as JSON')
+    servers.add_argument('loadgen_args', nargs=argparse.REMAINDER, help='arguments for loadgen.py, after --')
+    servers.set_defaults(func=cmd_servers)
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""
+group_send fan-out benchmarks, one per channel layer and room size.
+
+Each op is one group_send to a room of N subscribed channels plus every
+member receiving it, i.e. broadcast-to-delivered latency; messages per
+second is N / (time per op). Redis layers use BENCH_REDIS_URL with the
+``bench`` prefix and are skipped when it is unreachable.
+"""
+import asyncio
+
+from memory_game.layers import CHANNEL_LAYER_BACKENDS, channel_layer_config
+from .bench_core import redis_settings, sync_redis
+from .harness import benchmark
+
+FANOUT_SIZES = (2, 10, 50, 100, 500)
+GROUP = 'bench-fanout'
+
+
+def make_layer(kind):
+    from django.conf import settings
+    from django.utils.module_loading import import_string
+    if kind != 'memory':
+        sync_redis().close()
+    redis = redis_settings()
+    config = channel_layer_config(
+        kind, redis['REDIS_HOST'], redis['REDIS_PORT'], redis['REDIS_DB'], prefix='bench',
+        capacity=settings.CHANNEL_CAPACITY,
+        expiry=settings.CHANNEL_EXPIRY,
+        group_expiry=settings.CHANNEL_GROUP_EXPIRY,
+    )
+    return import_string(config['BACKEND'])(**config['CONFIG'])
+
+
+@benchmark('group_send', params=[f'{kind}-{size}' for kind in CHANNEL_LAYER_BACKENDS for size in FANOUT_SIZES])
+async def bench_group_send(param):
+    kind, size = param.split('-')
+    layer = make_layer(kind)
+    channels = [await layer.new_channel() for _ in range(int(size))]
+    for channel in channels:
+        await layer.group_add(GROUP, channel)
+    message = {'type': 'game_update'}
+
+    async def op():
+        await layer.group_send(GROUP, message)
+        await asyncio.gather(*(layer.receive(channel) for channel in channels))
+
+    async def teardown():
+        for channel in channels:
+            await layer.group_discard(GROUP, channel)
+        await layer.flush()
+
+    return op, teardown
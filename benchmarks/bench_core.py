@@ -0,0 +1,319 @@
+"""
+Benchmarks for the game's hot functions.
+
+Benchmarks parametrized by state backend run once with the in-process
+``memory`` backend and once with ``redis``. Redis-backed benchmarks use
+BENCH_REDIS_URL (default redis://localhost:6379/15) and are skipped when
+it is unreachable. They only delete the keys they create, but
+``list_rooms`` scans every ``game:*`` key in that database, so point it
+at an otherwise empty one.
+"""
+import asyncio
+import json
+import os
+from unittest.mock import patch
+from urllib.parse import urlparse
+
+import app
+from .harness import Skip, benchmark
+
+REDIS_URL = os.getenv('BENCH_REDIS_URL', 'redis://localhost:6379/15')
+ROOM_SIZES = (2, 8, 32, 128)
+ROOM_COUNTS = (10, 1000, 50000)
+BACKENDS = ('memory', 'redis')
+
+
+def make_game(players, started=True):
+    cards = app.THEMES['emoji'] * 2
+    return {
+        'players': {
+            f'specific.channel!{i}': {'name': f'Player {i + 1}', 'score': i % 3, 'connected': True}
+            for i in range(players)
+        },
+        'cards': cards if started else [],
+        'flipped': [3],
+        'matched': [0, 8, 1, 9],
+        'current_player': 'specific.channel!0',
+        'theme': 'emoji',
+        'started': started,
+        'channel_to_player': {f'specific.channel!{i}': f'specific.channel!{i}' for i in range(players)},
+    }
+
+
+def sync_redis():
+    import redis
+    client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+    try:
+        client.ping()
+    except redis.exceptions.ConnectionError as e:
+        raise Skip(f'Redis unavailable at {REDIS_URL}: {e}')
+    return client
+
+
+def redis_settings():
+    """REDIS_* settings pointing at BENCH_REDIS_URL"""
+    url = urlparse(REDIS_URL)
+    return {
+        'REDIS_HOST': url.hostname or 'localhost',
+        'REDIS_PORT': url.port or 6379,
+        'REDIS_DB': int(url.path.lstrip('/') or 0),
+    }
+
+
+def state_backend(name):
+    """A fresh backend instance; Redis ones are checked for reachability"""
+    from memory_game.backends import MemoryStateBackend, RedisStateBackend
+    if name == 'memory':
+        return MemoryStateBackend(rooms={})
+    sync_redis().close()
+    config = redis_settings()
+    return RedisStateBackend(config['REDIS_HOST'], config['REDIS_PORT'], config['REDIS_DB'])
+
+
+@benchmark('get_cards', params=sorted(app.THEMES))
+def bench_get_cards(theme):
+    stub_names = [f'Name {i}' for i in range(8)]
+    patches = [
+        patch('app.fetch_starwars_characters', return_value=stub_names),
+        patch('app.fetch_pokemon', return_value=stub_names),
+        patch.dict(app.THEMES, {'starwars': [], 'pokemon': []}),
+    ]
+    for p in patches:
+        p.start()
+    app.get_cards(theme)  # Fill the lazily fetched themes before timing
+
+    def teardown():
+        for p in reversed(patches):
+            p.stop()
+
+    return (lambda: app.get_cards(theme)), teardown
+
+
+@benchmark('deal_decks', params=(1, 5, 20))
+def bench_deal_decks(count):
+    """One /api/decks batch; compare per deck with get_cards[emoji]"""
+    return lambda: app.deal_decks('emoji', count)
+
+
+@benchmark('turn_timer', params=('schedule_cancel', 'reschedule'))
+def bench_turn_timer(op):
+    """One timer operation on a wheel already holding 100k pending turn timers"""
+    import random
+    from memory_game.timerwheel import TimerWheel
+    wheel = TimerWheel(tick=0.25)
+    timers = [wheel.schedule(random.uniform(1, 60), lambda: None) for _ in range(100000)]
+    if op == 'reschedule':
+        return lambda: wheel.reschedule(random.choice(timers), 30)
+    return lambda: wheel.cancel(wheel.schedule(30, lambda: None))
+
+
+@benchmark('serialize_game', params=ROOM_SIZES)
+def bench_serialize_game(players):
+    from memory_game.consumers import GameConsumer
+    consumer = GameConsumer()
+    game = make_game(players)
+    player_id = 'specific.channel!1'
+    return lambda: consumer.serialize_game(game, player_id)
+
+
+@benchmark('state_encode', params=ROOM_SIZES)
+def bench_state_encode(players):
+    game = make_game(players)
+    return lambda: json.dumps(game)
+
+
+@benchmark('state_decode', params=ROOM_SIZES)
+def bench_state_decode(players):
+    payload = json.dumps(make_game(players))
+    return lambda: json.loads(payload)
+
+
+@benchmark('state_get', params=BACKENDS)
+async def bench_state_get(backend_name):
+    backend = state_backend(backend_name)
+    await backend.delete('bench-state')
+    await backend.compare_and_set('bench-state', make_game(8), None)
+
+    async def op():
+        await backend.get('bench-state')
+
+    async def teardown():
+        await backend.delete('bench-state')
+        if backend_name == 'redis':
+            await backend.client.aclose()
+
+    return op, teardown
+
+
+@benchmark('state_update', params=BACKENDS)
+async def bench_state_update(backend_name):
+    """One read-modify-write: get plus compare_and_set of an 8-player room"""
+    backend = state_backend(backend_name)
+    await backend.delete('bench-state')
+    await backend.compare_and_set('bench-state', make_game(8), None)
+
+    async def op():
+        game, version = await backend.get('bench-state')
+        game['flipped'] = [] if game['flipped'] else [3]
+        await backend.compare_and_set('bench-state', game, version)
+
+    async def teardown():
+        await backend.delete('bench-state')
+        if backend_name == 'redis':
+            await backend.client.aclose()
+
+    return op, teardown
+
+
+def seeded_backend(backend_name, names, players=2):
+    """A backend holding one room per name; returns (backend, cleanup or None)"""
+    from memory_game import backends
+    payload = json.dumps(make_game(players))
+    if backend_name == 'memory':
+        return backends.MemoryStateBackend(rooms={name: json.loads(payload) for name in names}), None
+    client = sync_redis()
+    with client.pipeline(transaction=False) as pipe:
+        for name in names:
+            pipe.set(f'game:{name}', payload)
+        pipe.execute()
+
+    def cleanup():
+        for i in range(0, len(names), 1000):
+            client.delete(*(f'game:{name}' for name in names[i:i + 1000]))
+
+    return state_backend('redis'), cleanup
+
+
+@benchmark('list_rooms', params=[f'{backend}-{rooms}' for backend in BACKENDS for rooms in ROOM_COUNTS])
+def bench_list_rooms(param):
+    """Uncached read and serialization behind /api/rooms"""
+    from memory_game import views
+    backend_name, rooms = param.split('-')
+    backend, cleanup = seeded_backend(backend_name, [f'bench-{i}' for i in range(int(rooms))])
+    backend_patch = patch('memory_game.views.get_backend', return_value=backend)
+    backend_patch.start()
+
+    async def op():
+        await views.load_room_list()
+
+    def teardown():
+        backend_patch.stop()
+        if cleanup:
+            cleanup()
+
+    return op, teardown
+
+
+API_CONCURRENCY = 32
+
+
+def legacy_list_rooms(request):
+    """/api/rooms as it was before the async views: sync, blocking client"""
+    from django.http import JsonResponse
+    from memory_game.backends import count_connected, get_backend
+    rooms = [
+        {
+            'name': room_name,
+            'players': count_connected(game_data),
+            'started': game_data.get('started', False),
+            'theme': game_data.get('theme', 'emoji')
+        }
+        for room_name, game_data in get_backend().snapshot().items()
+    ]
+    return JsonResponse({'rooms': rooms})
+
+
+@benchmark('api_rooms', params=[f'{impl}-{backend}' for impl in ('sync', 'async', 'cached') for backend in BACKENDS])
+def bench_api_rooms(param):
+    """API_CONCURRENCY concurrent /api/rooms calls over 100 rooms, as an ASGI
+    server runs them: ``sync`` is the original view dispatched to a thread
+    with sync_to_async, ``async`` the async view with ROOM_LIST_TTL=0
+    (concurrent calls still share one read), ``cached`` with the default TTL."""
+    from asgiref.sync import sync_to_async
+    from django.test import RequestFactory, override_settings
+    from memory_game import views
+    impl, backend_name = param.split('-')
+    backend, cleanup = seeded_backend(backend_name, [f'bench-api-{i}' for i in range(100)])
+    backend_patches = [
+        patch('memory_game.views.get_backend', return_value=backend),
+        patch('memory_game.backends.get_backend', return_value=backend),
+    ]
+    for p in backend_patches:
+        p.start()
+    ttl = override_settings(ROOM_LIST_TTL=0 if impl == 'async' else 1.0)
+    ttl.enable()
+    request = RequestFactory().get('/api/rooms')
+    view = sync_to_async(legacy_list_rooms) if impl == 'sync' else views.list_rooms
+
+    async def op():
+        await asyncio.gather(*(view(request) for _ in range(API_CONCURRENCY)))
+
+    def teardown():
+        ttl.disable()
+        for p in backend_patches:
+            p.stop()
+        if cleanup:
+            cleanup()
+
+    return op, teardown
+
+
+async def connected_communicator(room, backend_name):
+    from channels.layers import channel_layers
+    from channels.routing import URLRouter
+    from channels.testing import WebsocketCommunicator
+    from django.test import override_settings
+    from memory_game.backends import get_backend
+    from memory_game.routing import websocket_urlpatterns
+
+    # Measure handling, not the inbound rate limits
+    unlimited = {'WS_RATE': 1e9, 'WS_BURST': 10 ** 9, 'WS_ROOM_RATE': 1e9, 'WS_ROOM_BURST': 10 ** 9}
+    if backend_name == 'redis':
+        state_backend('redis')  # Skip early when Redis is down
+        overrides = override_settings(GAME_STATE_BACKEND='redis', **redis_settings(), **unlimited)
+    else:
+        overrides = override_settings(GAME_STATE_BACKEND='memory', **unlimited)
+    overrides.enable()
+    from django.conf import settings
+    settings.CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+    channel_layers.backends.clear()
+    communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f'ws/game/{room}/')
+    await communicator.connect()
+    await communicator.receive_json_from()  # player_joined
+    await communicator.receive_json_from()  # game_update
+
+    async def teardown():
+        await communicator.disconnect()
+        if backend_name == 'redis':
+            await get_backend().client.aclose()
+        overrides.disable()
+
+    return communicator, teardown
+
+
+@benchmark('roundtrip_start_game', params=BACKENDS)
+async def bench_roundtrip_start_game(backend_name):
+    communicator, teardown = await connected_communicator('bench-start', backend_name)
+
+    async def op():
+        await communicator.send_json_to({'action': 'start_game', 'theme': 'emoji'})
+        await communicator.receive_json_from()
+
+    return op, teardown
+
+
+@benchmark('roundtrip_matching_pair', params=BACKENDS)
+async def bench_roundtrip_matching_pair(backend_name):
+    """Start a game and flip one matching pair: 2 actions, 4 messages."""
+    communicator, teardown = await connected_communicator('bench-pair', backend_name)
+
+    async def op():
+        await communicator.send_json_to({'action': 'start_game', 'theme': 'emoji'})
+        cards = (await communicator.receive_json_from())['game']['cards']
+        await communicator.send_json_to({'action': 'flip_card', 'index': 0})
+        await communicator.receive_json_from()
+        await communicator.send_json_to({'action': 'flip_card', 'index': cards.index(cards[0], 1)})
+        for _ in range(3):  # game_update, match_found, game_update
+            await communicator.receive_json_from()
+
+    return op, teardown
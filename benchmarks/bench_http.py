@@ -0,0 +1,91 @@
+"""
+HTTP throughput of the combined ASGI servers versus split-mode gunicorn.
+
+Each benchmark starts a real server process on a free loopback port:
+``daphne`` and ``uvicorn`` (uvloop + httptools) are one ASGI process
+serving everything (the combined mode), ``gunicorn`` uses
+memory_game/gunicorn_conf.py (split mode's pages/API half). One op is
+CONCURRENCY simultaneous GETs on fresh connections, so requests per
+second is CONCURRENCY / (time per op).
+Room state uses the in-memory backend so no Redis is needed.
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from .harness import Skip, benchmark
+
+CONCURRENCY = 32
+SERVERS = ('daphne', 'uvicorn', 'gunicorn')
+PAGES = {
+    'lobby': '/',
+    'rooms': '/api/rooms',
+    'static': '/static/game.js',
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(server, port):
+    if server == 'daphne':
+        return [sys.executable, '-m', 'daphne', '-b', '127.0.0.1', '-p', str(port), 'memory_game.asgi:application']
+    if server == 'uvicorn':
+        return [sys.executable, '-m', 'uvicorn', '--host', '127.0.0.1', '--port', str(port),
+                '--loop', 'uvloop', '--http', 'httptools', '--ws', 'websockets',
+                '--lifespan', 'off', '--no-access-log', 'memory_game.asgi:application']
+    return [sys.executable, '-m', 'gunicorn', '-c', 'python:memory_game.gunicorn_conf',
+            '--bind', f'127.0.0.1:{port}', 'memory_game.wsgi:application']
+
+
+def start_server(server, env=None, timeout=15.0):
+    """Start a server process; returns (process, port) once it accepts connections"""
+    port = free_port()
+    if env is None:
+        env = dict(os.environ, GAME_STATE_BACKEND='memory', SPLIT_SERVING='0', LOOP_LAG_MONITOR='0', LOG_LEVEL='WARNING')
+    process = subprocess.Popen(server_command(server, port), env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise Skip(f'{server} server exited with {process.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return process, port
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise Skip(f'{server} server did not start within {timeout}s')
+
+
+async def get(port, path):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n'.encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    await writer.wait_closed()
+    if not response.startswith(b'HTTP/1.1 200'):
+        raise RuntimeError(f'GET {path}: {response[:40]!r}')
+
+
+@benchmark('http', params=[f'{server}-{page}' for server in SERVERS for page in PAGES])
+def bench_http(param):
+    server, page = param.split('-')
+    process, port = start_server(server)
+    path = PAGES[page]
+
+    async def op():
+        await asyncio.gather(*(get(port, path) for _ in range(CONCURRENCY)))
+
+    def teardown():
+        process.terminate()
+        process.wait()
+
+    return op, teardown
@@ -0,0 +1,140 @@
+"""
+Minimal benchmark runner with JSON results and regression comparison.
+
+A benchmark is a factory registered with ``@benchmark``. The factory does
+its setup and returns the operation to time (sync or async callable), or
+an ``(operation, teardown)`` tuple. Factories may be ``async def`` and may
+raise ``Skip`` when a dependency such as Redis is unavailable.
+"""
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+REGISTRY = []
+
+
+class Skip(Exception):
+    """Raised by a factory to skip a benchmark."""
+
+
+def benchmark(name, params=None):
+    """Register a factory; with params, one benchmark per value as name[value]."""
+    def decorator(factory):
+        if params is None:
+            REGISTRY.append((name, factory, ()))
+        else:
+            for param in params:
+                REGISTRY.append((f'{name}[{param}]', factory, (param,)))
+        return factory
+    return decorator
+
+
+async def _call(op, number, is_async):
+    start = time.perf_counter()
+    if is_async:
+        for _ in range(number):
+            await op()
+    else:
+        for _ in range(number):
+            op()
+    return time.perf_counter() - start
+
+
+async def measure(op, min_batch_time=0.05, repeat=5, max_number=1_000_000):
+    """Time op in `repeat` batches sized to take at least min_batch_time each."""
+    is_async = asyncio.iscoroutinefunction(op)
+    number = 1
+    while True:
+        elapsed = await _call(op, number, is_async)
+        if elapsed >= min_batch_time or number >= max_number:
+            break
+        number = min(max_number, number * 10 if elapsed < min_batch_time / 10 else number * 2)
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        samples.append(await _call(op, number, is_async) / number)
+    return {
+        'median': statistics.median(samples),
+        'min': min(samples),
+        'mean': statistics.fmean(samples),
+        'number': number,
+        'repeat': repeat,
+    }
+
+
+async def run_benchmarks(pattern=None, repeat=5, min_batch_time=0.05, log=print):
+    results = {}
+    skipped = {}
+    for name, factory, args in REGISTRY:
+        if pattern and pattern not in name:
+            continue
+        teardown = None
+        try:
+            op = factory(*args)
+            if asyncio.iscoroutine(op):
+                op = await op
+            if isinstance(op, tuple):
+                op, teardown = op
+            results[name] = await measure(op, min_batch_time, repeat)
+            log(f'{name:<48} {results[name]["median"] * 1e6:>12.2f} us/op')
+        except Skip as e:
+            skipped[name] = str(e)
+            log(f'{name:<48} {"skipped":>12}  ({e})')
+        finally:
+            if teardown is not None:
+                result = teardown()
+                if asyncio.iscoroutine(result):
+                    await result
+    return {
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'filter': pattern,
+        },
+        'results': results,
+        'skipped': skipped,
+    }
+
+
+def compare(baseline, current, threshold=0.15, metric='median'):
+    """
+    Return (rows, regressions, missing) comparing two result documents.
+    `missing` names the baseline benchmarks the current run didn't measure,
+    skipped ones included; those outside the run's ``--filter`` aren't missing.
+    """
+    rows = []
+    regressions = []
+    base_results = baseline['results']
+    current_results = current['results']
+    for name, result in current_results.items():
+        if name not in base_results:
+            rows.append((name, None, result[metric], None))
+            continue
+        base = base_results[name][metric]
+        ratio = result[metric] / base if base else float('inf')
+        rows.append((name, base, result[metric], ratio))
+        if ratio > 1 + threshold:
+            regressions.append(name)
+    pattern = current.get('meta', {}).get('filter')
+    missing = [
+        name for name in base_results
+        if name not in current_results and (not pattern or pattern in name)
+    ]
+    for name in missing:
+        rows.append((name, base_results[name][metric], None, None))
+    return rows, regressions, missing
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(document, path):
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+        f.write('\n')
@@ -0,0 +1,61 @@
+"""
+ASGI server-stack comparison driven by loadgen.
+
+Starts each server in turn as a single process on a free loopback port,
+plays the same loadgen scenario against it and records action-to-broadcast
+latency, message rate and the server's CPU time per 1000 messages
+delivered. Room state and the channel layer default to the in-memory ones;
+export GAME_STATE_BACKEND / CHANNEL_LAYER to compare on Redis.
+"""
+import os
+
+from .bench_http import start_server
+
+
+def cpu_seconds(pid):
+    """User + system CPU seconds used by a process, from /proc (Linux only)"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+async def compare_servers(servers, loadgen_argv, log=print):
+    """Run loadgen against each server; returns {server: report}"""
+    import loadgen
+    env = dict(os.environ, SPLIT_SERVING='0', LOOP_LAG_MONITOR='0', LOG_LEVEL='WARNING')
+    env.setdefault('GAME_STATE_BACKEND', 'memory')
+    env.setdefault('CHANNEL_LAYER', 'memory')
+    reports = {}
+    for server in servers:
+        process, port = start_server(server, env)
+        try:
+            args = loadgen.parse_args(['--url', f'ws://127.0.0.1:{port}'] + list(loadgen_argv))
+            log(f'{server}: {args.rooms} rooms x {args.players} players for {args.ramp + args.duration:.0f}s')
+            before = cpu_seconds(process.pid)
+            report = await loadgen.run(args)
+            after = cpu_seconds(process.pid)
+        finally:
+            process.terminate()
+            process.wait()
+        messages = sum(report['messages_received'].values())
+        if before is not None and after is not None:
+            report['server_cpu_s'] = round(after - before, 3)
+            report['cpu_ms_per_1k_messages'] = round((after - before) * 1e6 / messages, 2) if messages else None
+        reports[server] = report
+    return reports
+
+
+def format_table(reports):
+    header = f'{"server":<10} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"msg/s":>9} {"cpu ms/1k msg":>14} {"errors":>7}'
+    lines = [header]
+    for server, report in reports.items():
+        latency = report['action_to_broadcast_ms']
+        cpu = report.get('cpu_ms_per_1k_messages')
+        lines.append(
+            f'{server:<10} {latency.get("p50", "-"):>8} {latency.get("p95", "-"):>8} {latency.get("p99", "-"):>8} '
+            f'{report["messages_per_s"]:>9} {cpu if cpu is not None else "-":>14} {sum(report["errors"].values()):>7}'
+        )
+    return '\n'.join(lines)
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Load generator for the multiplayer memory game.
+
+Opens N rooms x M players (+ S spectators) against a running server, ramps
+connections up over time, plays real games (players start the game, flip
+cards only on their turn and mostly remember what they've seen) and reports
+connect times, action-to-broadcast latency percentiles, message rates and
+errors.
+
+    # local daphne + local Redis
+    python loadgen.py --rooms 50 --players 4 --ramp 30 --duration 120
+
+    # through the ingress
+    python loadgen.py --url wss://www.pipeline-dev-k8s.com --base-path /copilot/memory-game
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from collections import Counter
+
+import websockets
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = math.ceil(pct / 100 * len(ordered))
+    return ordered[max(0, min(len(ordered), rank) - 1)]
+
+
+def summarize(values, scale=1000.0):
+    """p50/p95/p99/max summary in milliseconds"""
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'p50': round(percentile(values, 50) * scale, 2),
+        'p95': round(percentile(values, 95) * scale, 2),
+        'p99': round(percentile(values, 99) * scale, 2),
+        'max': round(max(values) * scale, 2),
+    }
+
+
+def ramp_delays(count, ramp, profile, steps=5):
+    """Start offsets (seconds) for `count` clients under a ramp profile"""
+    if count == 0 or ramp <= 0 or profile == 'instant':
+        return [0.0] * count
+    if profile == 'step':
+        per_step = -(-count // steps)
+        return [(i // per_step) * ramp / steps for i in range(count)]
+    return [i * ramp / count for i in range(count)]
+
+
+class Stats:
+    def __init__(self):
+        self.connect_times = []
+        self.action_latencies = []
+        self.messages = Counter()
+        self.bytes_received = 0
+        self.errors = Counter()
+        self.actions_sent = 0
+        self.games_finished = 0
+        self.flips_expired = 0
+
+    def report(self, elapsed):
+        return {
+            'elapsed_s': round(elapsed, 2),
+            'connect_ms': summarize(self.connect_times),
+            'action_to_broadcast_ms': summarize(self.action_latencies),
+            'actions_sent': self.actions_sent,
+            'actions_per_s': round(self.actions_sent / elapsed, 2) if elapsed else 0,
+            'messages_received': dict(self.messages),
+            'messages_per_s': round(sum(self.messages.values()) / elapsed, 2) if elapsed else 0,
+            'bytes_received': self.bytes_received,
+            'games_finished': self.games_finished,
+            'flips_expired': self.flips_expired,
+            'errors': dict(self.errors),
+        }
+
+
+class Bot:
+    """One WebSocket client. Seat 0 of each room starts the games."""
+
+    def __init__(self, args, stats, room, seat, spectator=False):
+        self.args = args
+        self.stats = stats
+        self.room = room
+        self.seat = seat
+        self.spectator = spectator
+        self.seen = {}  # card index -> value, the bot's "memory"
+        self.pending = {}  # card index -> send time
+        self.game = None  # last game_update, to flip again after an expiry
+        self.starting = False
+        self.expected = args.players + args.spectators
+
+    @property
+    def url(self):
+        query = '?role=spectator' if self.spectator else ''
+        return f"{self.args.url.rstrip('/')}{self.args.base_path}/ws/game/{self.room}/{query}"
+
+    async def run(self, delay, deadline):
+        await asyncio.sleep(delay)
+        start = time.monotonic()
+        try:
+            async with websockets.connect(self.url, open_timeout=self.args.timeout) as ws:
+                self.stats.connect_times.append(time.monotonic() - start)
+                while time.monotonic() < deadline:
+                    until = min([deadline] + [sent + self.args.flip_timeout for sent in self.pending.values()])
+                    try:
+                        raw = await asyncio.wait_for(ws.recv(), timeout=max(0.01, until - time.monotonic()))
+                    except asyncio.TimeoutError:
+                        # A flip nobody answered: give up on it and play on
+                        if time.monotonic() < deadline and self.game is not None:
+                            await self.on_game(ws, self.game)
+                        continue
+                    await self.on_message(ws, raw)
+        except asyncio.TimeoutError:
+            self.stats.errors['connect_timeout'] += 1
+        except websockets.exceptions.ConnectionClosed as e:
+            self.stats.errors[f'closed_{e.code}'] += 1
+        except (OSError, websockets.exceptions.WebSocketException) as e:
+            self.stats.errors[type(e).__name__] += 1
+
+    async def on_message(self, ws, raw):
+        now = time.monotonic()
+        self.stats.bytes_received += len(raw)
+        data = json.loads(raw)
+        kind = data.get('type', 'unknown')
+        self.stats.messages[kind] += 1
+        if kind != 'game_update':
+            return
+        self.game = data['game']
+        await self.on_game(ws, self.game, now)
+
+    def expire_pending(self, game, now):
+        """
+        Forget flips that can no longer be answered: all of them once it
+        isn't our turn, and any unanswered for --flip-timeout (a dropped
+        message), so one lost flip can't stall the bot for the whole run.
+        """
+        for index, sent in list(self.pending.items()):
+            if not game['is_your_turn'] or now - sent >= self.args.flip_timeout:
+                del self.pending[index]
+                self.stats.flips_expired += 1
+
+    async def on_game(self, ws, game, now=None):
+        now = time.monotonic() if now is None else now
+        for index, value in enumerate(game['cards']):
+            if index in game['flipped'] or index in game['matched']:
+                self.seen[index] = value
+        for index in list(self.pending):
+            if index in game['flipped'] or index in game['matched']:
+                self.stats.action_latencies.append(now - self.pending.pop(index))
+        self.expire_pending(game, now)
+        finished = game['started'] and len(game['matched']) == len(game['cards'])
+        if self.starting:
+            # Ignore updates until the restart we asked for has landed
+            if game['started'] and not finished:
+                self.starting = False
+            else:
+                return
+        if self.seat == 0 and (finished or (not game['started'] and len(game['players']) >= self.expected)):
+            if finished:
+                self.stats.games_finished += 1
+            await self.start_game(ws)
+        elif game['started'] and game['is_your_turn'] and len(game['flipped']) < 2 and not self.pending:
+            await self.flip(ws, game)
+
+    async def start_game(self, ws):
+        self.seen.clear()
+        self.pending.clear()
+        self.starting = True
+        await ws.send(json.dumps({'action': 'start_game', 'theme': self.args.theme}))
+        self.stats.actions_sent += 1
+
+    async def flip(self, ws, game):
+        if self.args.think:
+            await asyncio.sleep(random.uniform(0, self.args.think))
+        hidden = [i for i in range(len(game['cards'])) if i not in game['matched'] and i not in game['flipped']]
+        if not hidden:
+            return
+        choice = None
+        if game['flipped'] and random.random() < self.args.accuracy:
+            value = self.seen.get(game['flipped'][0])
+            choice = next((i for i in hidden if self.seen.get(i) == value), None)
+        if choice is None:
+            choice = random.choice(hidden)
+        self.pending[choice] = time.monotonic()
+        await ws.send(json.dumps({'action': 'flip_card', 'index': choice}))
+        self.stats.actions_sent += 1
+
+
+async def run(args):
+    stats = Stats()
+    prefix = f'load-{int(time.time())}'
+    bots = []
+    for r in range(args.rooms):
+        room = f'{prefix}-{r}'
+        bots.extend(Bot(args, stats, room, seat) for seat in range(args.players))
+        bots.extend(Bot(args, stats, room, args.players + s, spectator=True) for s in range(args.spectators))
+    # Interleave rooms so a ramp fills every room gradually
+    bots.sort(key=lambda b: (b.seat, b.room))
+    delays = ramp_delays(len(bots), args.ramp, args.ramp_profile, args.ramp_steps)
+    deadline = time.monotonic() + args.ramp + args.duration
+    start = time.monotonic()
+    await asyncio.gather(*(bot.run(delay, deadline) for bot, delay in zip(bots, delays)))
+    return stats.report(time.monotonic() - start)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='ws://localhost:8080', help='server origin (ws:// or wss://)')
+    parser.add_argument('--base-path', default='', help='path prefix, e.g. /copilot/memory-game')
+    parser.add_argument('--rooms', type=int, default=10)
+    parser.add_argument('--players', type=int, default=2, help='players per room')
+    parser.add_argument('--spectators', type=int, default=0, help='spectators per room')
+    parser.add_argument('--ramp', type=float, default=10.0, help='seconds to open all connections')
+    parser.add_argument('--ramp-profile', choices=['linear', 'step', 'instant'], default='linear')
+    parser.add_argument('--ramp-steps', type=int, default=5)
+    parser.add_argument('--duration', type=float, default=60.0, help='seconds to play after ramp-up')
+    parser.add_argument('--think', type=float, default=0.2, help='max random think time per flip (s)')
+    parser.add_argument('--accuracy', type=float, default=0.8, help='chance a bot uses its memory')
+    parser.add_argument('--theme', default='emoji')
+    parser.add_argument('--timeout', type=float, default=10.0, help='connect timeout (s)')
+    parser.add_argument('--flip-timeout', type=float, default=5.0,
+                        help='give up on a flip with no update showing it after this long (s)')
+    parser.add_argument('--json', metavar='PATH', help='also write the report to this file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.json:
+        with open(args.json, 'w') as f:
+            f.write(text + '\n')
+    return 1 if report['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Admission control for game sockets.
+
+Every socket is checked before it joins a room: the pod's connection cap
+(``MAX_CONNECTIONS`` split evenly across the pod's ``WEB_WORKERS``, since each
+worker process only sees its own sockets), then live load signals (event-loop
+lag and messages waiting in the channel layer's local queues), then the
+room's player or spectator cap. While the pod is overloaded, actions that
+start new work (``SHED_ACTIONS``) are refused too, so games in progress keep
+their share of the loop. Rejected sockets get a ``rejected`` message with
+``retry_after`` seconds and a close code from ``CLOSE_CODES``.
+"""
+import math
+from django.conf import settings
+from . import metrics
+from .looplag import monitor
+
+# Application close codes (4000-4999): try another room, or retry later
+CLOSE_ROOM_FULL = 4009
+CLOSE_RETRY_LATER = 4029
+CLOSE_CODES = {
+    'room_full': CLOSE_ROOM_FULL,
+    'spectators_full': CLOSE_ROOM_FULL,
+    'pod_full': CLOSE_RETRY_LATER,
+    'loop_lag': CLOSE_RETRY_LATER,
+    'queue_depth': CLOSE_RETRY_LATER,
+}
+SHED_ACTIONS = ('start_game', 'quick_join')
+
+REJECTIONS = metrics.Counter(
+    'memory_game_admission_rejections_total',
+    'Sockets and actions turned away by admission control, by reason.',
+    ['reason'],
+)
+REJECTED = {reason: REJECTIONS.labels(reason) for reason in CLOSE_CODES}
+
+
+def loop_lag():
+    return monitor.last_lag if monitor.running else 0.0
+
+
+def queue_depth(layer):
+    """Messages delivered to this process's channels but not yet consumed"""
+    # channels_redis buffers per channel in receive_buffer; InMemoryChannelLayer in channels
+    queues = getattr(layer, 'receive_buffer', None)
+    if queues is None:
+        queues = getattr(layer, 'channels', {})
+    return sum(queue.qsize() for queue in list(queues.values()))
+
+
+def overloaded(layer):
+    """The load signal over its limit, or None"""
+    if loop_lag() > settings.ADMISSION_MAX_LOOP_LAG:
+        return 'loop_lag'
+    if queue_depth(layer) > settings.ADMISSION_MAX_QUEUE_DEPTH:
+        return 'queue_depth'
+    return None
+
+
+def connection_cap():
+    """This worker process's share of the pod's MAX_CONNECTIONS"""
+    return math.ceil(settings.MAX_CONNECTIONS / max(1, settings.WEB_WORKERS))
+
+
+def check_connection(connections, layer):
+    """Reason to turn a new socket away from this worker, or None"""
+    if connections >= connection_cap():
+        return 'pod_full'
+    return overloaded(layer)
+
+
+def check_action(action, layer):
+    """Reason to refuse `action` right now, or None"""
+    if action in SHED_ACTIONS:
+        return overloaded(layer)
+    return None
+
+
+def rejection(reason):
+    """Count a rejection; returns (message, close code)"""
+    REJECTED[reason].inc()
+    message = {'type': 'rejected', 'reason': reason, 'retry_after': settings.ADMISSION_RETRY_AFTER}
+    return message, CLOSE_CODES[reason]
@@ -0,0 +1,60 @@
+"""
+One event loop per WSGI process for the async /api/* views.
+
+Under gunicorn (split serving) Django runs each async view with
+``async_to_sync``, on a loop of its own that lives for one request. Per-loop
+state would then last one request too: the Redis client and its pool, the
+``API_CONCURRENCY`` semaphore and micro-cache refreshes. ``wsgi.py`` calls
+``enable()``, and from then on ``on_api_loop`` views run on a single loop
+owned by a daemon thread of the worker process, so those are shared by every
+request thread. It is started on first use, after gunicorn has forked. Under
+an ASGI server nothing is enabled and the views run on the server's loop.
+"""
+import asyncio
+import functools
+import os
+import threading
+
+_enabled = False
+_loop = None
+_pid = None
+_lock = threading.Lock()
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def get_loop():
+    """The process's API loop, started on first use; None unless enabled"""
+    global _loop, _pid
+    if not _enabled:
+        return None
+    if _loop is None or _pid != os.getpid():
+        with _lock:
+            if _loop is None or _pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='api-loop', daemon=True).start()
+                _loop, _pid = loop, os.getpid()
+    return _loop
+
+
+def stop():
+    """Stop the loop and disable it (for tests)"""
+    global _enabled, _loop
+    with _lock:
+        if _loop is not None:
+            _loop.call_soon_threadsafe(_loop.stop)
+        _enabled, _loop = False, None
+
+
+def on_api_loop(view):
+    """Run an async view on the process's API loop when there is one"""
+    @functools.wraps(view)
+    async def wrapper(*args, **kwargs):
+        loop = get_loop()
+        if loop is None or loop is asyncio.get_running_loop():
+            return await view(*args, **kwargs)
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(view(*args, **kwargs), loop))
+    return wrapper
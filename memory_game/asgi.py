@@ -1,13 +1,47 @@
 import os
 from django.core.asgi import get_asgi_application
-from channels.routing import ProtocolTypeRouter, URLRouter
-from . import routing
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'memory_game.settings')
 
-application = ProtocolTypeRouter({
-    'http': get_asgi_application(),
+django_application = get_asgi_application()
+
+# These import settings at module level, so load them after Django is set up
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+from django.conf import settings  # noqa: E402
+from . import metrics, routing  # noqa: E402
+from .looplag import monitor  # noqa: E402
+
+# Set by memory_game.launcher so it can scrape each worker separately
+if os.getenv('WORKER_METRICS_PORT'):
+    metrics.start_http_server(int(os.environ['WORKER_METRICS_PORT']))
+
+
+def http_only(paths, app):
+    """HTTP app serving only `paths`; the rest is gunicorn's in split mode"""
+    paths = frozenset(paths)
+
+    async def http(scope, receive, send):
+        if scope['path'] in paths:
+            return await app(scope, receive, send)
+        await send({
+            'type': 'http.response.start',
+            'status': 404,
+            'headers': [(b'content-type', b'text/plain')],
+        })
+        await send({'type': 'http.response.body', 'body': b'Not served by the WebSocket server\n'})
+
+    return http
+
+
+router = ProtocolTypeRouter({
+    'http': http_only(settings.ASGI_HTTP_PATHS, django_application) if settings.SPLIT_SERVING else django_application,
     'websocket': URLRouter(
         routing.websocket_urlpatterns
     ),
 })
+
+
+async def application(scope, receive, send):
+    # Start the loop-lag monitor on whichever loop the server runs us on
+    monitor.ensure_running()
+    await router(scope, receive, send)
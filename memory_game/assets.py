@@ -0,0 +1,268 @@
+"""
+Static asset pipeline: minify, fingerprint and precompress ``static/*``.
+
+    python -m memory_game.assets build [--source static] [--out static_build]
+
+writes ``<name>.<hash>.<ext>`` with ``.gz`` (and ``.br`` when the brotli
+package is installed) siblings plus ``manifest.json``; the Docker image runs
+it at build time. Each process loads the build into memory on first use and
+``static_asset`` serves it from there: fingerprinted names are cacheable for
+a year (``immutable``), bare names such as ``static/style.css`` are
+revalidated with their ETag. Without a build (development, tests) the same
+pipeline runs in memory over STATICFILES_DIRS.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import re
+import sys
+from pathlib import Path
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseNotModified
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always built
+    brotli = None
+
+# Route under the app root, shared with urls.py. Not STATIC_URL: Django
+# prefixes a relative STATIC_URL with the script prefix, not BASE_PATH.
+URL_PREFIX = 'static/'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, no-cache'
+# Preferred first when the client accepts several
+ENCODINGS = ('br', 'gzip')
+# File suffix of each variant in a build
+SUFFIXES = {'identity': '', 'gzip': '.gz', 'br': '.br'}
+
+CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+CSS_STRING = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')''')
+CSS_SPACE = re.compile(r'\s+')
+CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+
+
+def minify_css(text):
+    """Drop comments and insignificant whitespace, leaving quoted strings alone"""
+    parts = CSS_STRING.split(CSS_COMMENT.sub('', text))
+    for i in range(0, len(parts), 2):
+        code = CSS_SPACE.sub(' ', parts[i])
+        code = CSS_PUNCTUATION.sub(r'\1', code)
+        parts[i] = code.replace(': ', ':').replace(';}', '}')
+    return ''.join(parts).strip()
+
+
+def minify_js(text):
+    """Strip indentation, blank lines and whole-line ``//`` comments.
+
+    Line breaks are kept so automatic semicolon insertion is unaffected, and
+    lines inside multi-line template literals are copied verbatim.
+    """
+    lines = []
+    in_template = False
+    for line in text.splitlines():
+        if in_template:
+            lines.append(line)
+        else:
+            stripped = line.strip()
+            if stripped and not stripped.startswith('//'):
+                lines.append(stripped)
+        if (line.count('`') - line.count('\\`')) % 2:
+            in_template = not in_template
+    return '\n'.join(lines) + '\n'
+
+
+MINIFIERS = {
+    '.css': minify_css,
+    '.js': minify_js,
+}
+
+
+def fingerprint(name, content):
+    """``style.css`` -> ``style.<12 hex digits>.css``"""
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    stem, dot, ext = name.rpartition('.')
+    return f'{stem}.{digest}.{ext}' if dot else f'{name}.{digest}'
+
+
+class Asset:
+    """One static file with its precompressed variants, held in memory."""
+
+    def __init__(self, name, hashed_name, content_type, bodies):
+        self.name = name
+        self.hashed_name = hashed_name
+        self.content_type = content_type
+        # {'identity': bytes, 'gzip': bytes, 'br': bytes}
+        self.bodies = bodies
+        digest = hashed_name.split('.')[-2] if '.' in hashed_name else hashed_name
+        self.etags = {encoding: f'"{digest}-{encoding}"' for encoding in bodies}
+
+    def choose_encoding(self, accept_encoding):
+        accepted = set()
+        for part in accept_encoding.split(','):
+            coding, _, params = part.partition(';')
+            q = params.strip().removeprefix('q=')
+            try:
+                if q and float(q) == 0:
+                    continue
+            except ValueError:
+                continue
+            accepted.add(coding.strip().lower())
+        for encoding in ENCODINGS:
+            if encoding in self.bodies and (encoding in accepted or '*' in accepted):
+                return encoding
+        return 'identity'
+
+    def response(self, request, immutable):
+        encoding = self.choose_encoding(request.headers.get('Accept-Encoding', ''))
+        etag = self.etags[encoding]
+        if request.headers.get('If-None-Match') in (etag, '*'):
+            response = HttpResponseNotModified()
+        else:
+            body = self.bodies[encoding]
+            response = HttpResponse(body, content_type=self.content_type)
+            response['Content-Length'] = str(len(body))
+            if encoding != 'identity':
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Cache-Control'] = IMMUTABLE if immutable else REVALIDATE
+        response['Vary'] = 'Accept-Encoding'
+        return response
+
+
+def compress(content):
+    bodies = {'identity': content}
+    # mtime=0 keeps builds reproducible
+    gzipped = gzip.compress(content, compresslevel=9, mtime=0)
+    if len(gzipped) < len(content):
+        bodies['gzip'] = gzipped
+    if brotli is not None:
+        compressed = brotli.compress(content, quality=11)
+        if len(compressed) < len(content):
+            bodies['br'] = compressed
+    return bodies
+
+
+def content_type_for(name):
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    if content_type.startswith('text/') or content_type == 'application/javascript':
+        content_type += '; charset=utf-8'
+    return content_type
+
+
+def build_assets(source_dir):
+    """Minify, fingerprint and compress every file under `source_dir`; returns {name: Asset}"""
+    source_dir = Path(source_dir)
+    assets = {}
+    for path in sorted(p for p in source_dir.rglob('*') if p.is_file()):
+        name = path.relative_to(source_dir).as_posix()
+        content = path.read_bytes()
+        minify = MINIFIERS.get(path.suffix)
+        if minify is not None:
+            content = minify(content.decode('utf-8')).encode('utf-8')
+        assets[name] = Asset(name, fingerprint(name, content), content_type_for(name), compress(content))
+    return assets
+
+
+def write_build(assets, out_dir):
+    """Write fingerprinted files, their compressed variants and manifest.json"""
+    out_dir = Path(out_dir)
+    manifest = {}
+    for name, asset in assets.items():
+        target = out_dir / asset.hashed_name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        for encoding, body in asset.bodies.items():
+            target.with_name(target.name + SUFFIXES[encoding]).write_bytes(body)
+        manifest[name] = {
+            'file': asset.hashed_name,
+            'content_type': asset.content_type,
+            'encodings': sorted(asset.bodies),
+        }
+    (out_dir / 'manifest.json').write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    return manifest
+
+
+def load_build(out_dir):
+    """Read a build written by write_build back into memory; returns {name: Asset}"""
+    out_dir = Path(out_dir)
+    manifest = json.loads((out_dir / 'manifest.json').read_text())
+    assets = {}
+    for name, entry in manifest.items():
+        target = out_dir / entry['file']
+        bodies = {}
+        for encoding in entry['encodings']:
+            bodies[encoding] = target.with_name(target.name + SUFFIXES[encoding]).read_bytes()
+        assets[name] = Asset(name, entry['file'], entry['content_type'], bodies)
+    return assets
+
+
+class AssetStore:
+    """Assets by bare and fingerprinted name."""
+
+    def __init__(self, assets):
+        self.assets = assets
+        self.by_path = {}
+        for asset in assets.values():
+            self.by_path[asset.name] = (asset, False)
+            self.by_path[asset.hashed_name] = (asset, True)
+
+    def lookup(self, path):
+        """(asset, immutable) for a request path, or None"""
+        return self.by_path.get(path)
+
+    def hashed_name(self, name):
+        asset = self.assets.get(name)
+        return asset.hashed_name if asset is not None else name
+
+
+_store = None
+
+
+def get_store():
+    """The process's assets: the build if there is one, else built from source."""
+    global _store
+    if _store is None:
+        build_dir = Path(settings.STATIC_BUILD_DIR)
+        if (build_dir / 'manifest.json').exists():
+            assets = load_build(build_dir)
+        else:
+            assets = {}
+            for source_dir in reversed(settings.STATICFILES_DIRS):
+                assets.update(build_assets(source_dir))
+        _store = AssetStore(assets)
+    return _store
+
+
+@receiver(setting_changed)
+def reset_store(setting, **kwargs):
+    global _store
+    if setting in ('STATIC_BUILD_DIR', 'STATICFILES_DIRS'):
+        _store = None
+
+
+def asset_url(name):
+    """Public URL of the fingerprinted asset, under the BASE_PATH the ingress mounts us at"""
+    return f'{settings.BASE_PATH}/{URL_PREFIX}{get_store().hashed_name(name)}'
+
+
+def main(argv=None):
+    root = Path(__file__).resolve().parent.parent
+    parser = argparse.ArgumentParser(prog='python -m memory_game.assets', description=__doc__.split('\n\n')[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help='minify, fingerprint and precompress static files')
+    build.add_argument('--source', default=str(root / 'static'))
+    build.add_argument('--out', default=str(root / 'static_build'))
+    args = parser.parse_args(argv)
+    manifest = write_build(build_assets(args.source), args.out)
+    for name, entry in manifest.items():
+        print(f"{name} -> {entry['file']} ({', '.join(entry['encodings'])})")
+    if brotli is None:
+        print('brotli not installed; built gzip only', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
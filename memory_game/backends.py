@@ -0,0 +1,462 @@
+"""
+Room-state storage backends.
+
+``GameConsumer`` and the views talk to a ``StateBackend`` chosen by
+``settings.GAME_STATE_BACKEND``: ``'redis'`` (shared by every pod) or
+``'memory'`` (this process only; with ``InMemoryChannelLayer`` a single
+node needs no network hops at all). A dotted path selects a custom class.
+
+States are plain JSON-compatible dicts. Every write goes through
+``compare_and_set`` with the version returned by ``get``, so concurrent
+updates to a room from different sockets or pods can't overwrite each
+other; callers re-read and retry on conflict. A version of ``None`` means
+the room does not exist yet.
+
+Rooms that haven't started and have seats left are also kept in a per-theme
+open-seat index, rewritten in the same atomic step as each state write, so
+``claim_seat`` can send quick-join players to the fullest open room.
+"""
+import asyncio
+import heapq
+import json
+import time
+import weakref
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from . import metrics
+
+BACKENDS = {
+    'redis': 'memory_game.backends.RedisStateBackend',
+    'memory': 'memory_game.backends.MemoryStateBackend',
+}
+
+# Rooms of the in-process backend; exposed as GameConsumer.games
+MEMORY_ROOMS = {}
+
+STATE_CONFLICTS = metrics.Counter(
+    'memory_game_state_conflicts_total',
+    'Room-state writes retried after a compare-and-set conflict.',
+)
+
+
+def count_connected(state):
+    """Players in a room that are still connected"""
+    return sum(1 for p in state.get('players', {}).values() if p.get('connected', True))
+
+
+def open_seats(state):
+    """Seats quick-join may still fill; 0 or less once started or full"""
+    if state.get('started'):
+        return 0
+    return state.get('capacity', settings.ROOM_CAPACITY) - len(state.get('players', {}))
+
+
+class StateBackend:
+    """Interface for room-state storage."""
+
+    async def get(self, room):
+        """Return (state, version); (None, None) if the room doesn't exist."""
+        raise NotImplementedError
+
+    async def compare_and_set(self, room, state, version):
+        """Store state if the room is still at version. Returns True on success."""
+        raise NotImplementedError
+
+    async def delete(self, room, version=None):
+        """Delete a room; with a version, only if it hasn't changed since."""
+        raise NotImplementedError
+
+    async def list(self):
+        """Return {room: state} for every room."""
+        raise NotImplementedError
+
+    async def active(self):
+        """{room: state} for rooms with players, for read-only callers (not copied)."""
+        return {room: state for room, state in (await self.list()).items() if state.get('players')}
+
+    def snapshot(self):
+        """Synchronous {room: state} for sync views, pruning rooms with no players."""
+        raise NotImplementedError
+
+    async def presence_add(self, room, channel):
+        """Record a socket in the room; returns sockets now present."""
+        raise NotImplementedError
+
+    async def presence_remove(self, room, channel):
+        """Forget a socket; returns sockets still present."""
+        raise NotImplementedError
+
+    async def claim_seat(self, theme, new_room, capacity, ttl=30.0):
+        """Take a seat in the fullest open room of `theme`, or open `new_room`.
+
+        The claimed seat is held until the room's next state write recomputes
+        its open seats, so concurrent quick-joins don't all pick the last
+        seat. A room opened here that gets no state write within `ttl`
+        seconds (nobody connected) is dropped from the index by a later
+        claim. Returns (room, created).
+        """
+        raise NotImplementedError
+
+    async def leaderboard_add(self, boards, player, points, name):
+        """Add `points` to `player` on each (board, ttl seconds or None) and remember its name"""
+        raise NotImplementedError
+
+    async def leaderboard_top(self, board, count):
+        """The `count` highest [(player, name, score)] on `board`, best first"""
+        raise NotImplementedError
+
+    async def leaderboard_rank(self, board, player):
+        """(0-based rank, score) of `player` on `board`, or None if unranked"""
+        raise NotImplementedError
+
+    def ping(self, timeout=1.0):
+        """Synchronous reachability check for readiness probes."""
+        raise NotImplementedError
+
+
+class MemoryStateBackend(StateBackend):
+    """Rooms kept in this process. States are copied in and out, as with Redis."""
+
+    def __init__(self, rooms=None):
+        self.rooms = MEMORY_ROOMS if rooms is None else rooms
+        self.versions = {}
+        self.presence = {}
+        self.seat_index = {}  # theme -> {room: open seats}
+        self.indexed_theme = {}  # room -> theme it's indexed under
+        self.claims = {}  # room opened by claim_seat -> when its claim lapses
+        self.boards = {}  # board -> (expires or None, {player: score})
+        self.names = {}
+
+    @staticmethod
+    def _copy(state):
+        # A JSON round trip is faster than deepcopy and matches Redis semantics
+        return json.loads(json.dumps(state))
+
+    def _version(self, room):
+        return self.versions.get(room, 0) if room in self.rooms else None
+
+    async def get(self, room):
+        state = self.rooms.get(room)
+        if state is None:
+            return None, None
+        return self._copy(state), self._version(room)
+
+    def _unindex(self, room):
+        theme = self.indexed_theme.pop(room, None)
+        if theme is not None:
+            self.seat_index[theme].pop(room, None)
+
+    def _index(self, room, theme, seats):
+        self._unindex(room)
+        if seats > 0:
+            self.seat_index.setdefault(theme, {})[room] = seats
+            self.indexed_theme[room] = theme
+
+    async def compare_and_set(self, room, state, version):
+        if self._version(room) != version:
+            return False
+        self.rooms[room] = self._copy(state)
+        self.versions[room] = (version or 0) + 1
+        # The room exists now, so a quick-join claim on it has done its job
+        self.claims.pop(room, None)
+        self._index(room, state.get('theme', 'emoji'), open_seats(state))
+        return True
+
+    async def delete(self, room, version=None):
+        if version is not None and self._version(room) != version:
+            return False
+        self.rooms.pop(room, None)
+        self.versions.pop(room, None)
+        self.presence.pop(room, None)
+        self.claims.pop(room, None)
+        self._unindex(room)
+        return True
+
+    async def list(self):
+        return {room: self._copy(state) for room, state in list(self.rooms.items())}
+
+    async def active(self):
+        return {room: state for room, state in list(self.rooms.items()) if state.get('players')}
+
+    def snapshot(self):
+        rooms = {}
+        for room, state in list(self.rooms.items()):
+            if not state.get('players'):
+                self.rooms.pop(room, None)
+                self.versions.pop(room, None)
+                continue
+            rooms[room] = state
+        return rooms
+
+    async def presence_add(self, room, channel):
+        channels = self.presence.setdefault(room, set())
+        channels.add(channel)
+        return len(channels)
+
+    async def presence_remove(self, room, channel):
+        channels = self.presence.get(room, set())
+        channels.discard(channel)
+        if not channels:
+            self.presence.pop(room, None)
+        return len(channels)
+
+    def _board(self, board):
+        expires, scores = self.boards.get(board, (None, {}))
+        if expires is not None and expires <= time.time():
+            self.boards.pop(board, None)
+            return {}
+        return scores
+
+    async def leaderboard_add(self, boards, player, points, name):
+        for board, ttl in boards:
+            scores = self._board(board)
+            scores[player] = scores.get(player, 0) + points
+            self.boards[board] = (time.time() + ttl if ttl else None, scores)
+        self.names[player] = name
+
+    async def leaderboard_top(self, board, count):
+        # Ties go to the greater player id, as in a Redis ZREVRANGE
+        top = heapq.nlargest(count, self._board(board).items(), key=lambda item: (item[1], item[0]))
+        return [(player, self.names.get(player, player), score) for player, score in top]
+
+    async def leaderboard_rank(self, board, player):
+        scores = self._board(board)
+        if player not in scores:
+            return None
+        mine = (scores[player], player)
+        return sum(1 for item in scores.items() if (item[1], item[0]) > mine), scores[player]
+
+    async def claim_seat(self, theme, new_room, capacity, ttl=30.0):
+        rooms = self.seat_index.get(theme, {})
+        now = time.monotonic()
+        for room in sorted(rooms, key=rooms.get):
+            if room in self.rooms or self.claims.get(room, 0) > now:
+                self._index(room, theme, rooms[room] - 1)
+                return room, False
+            # Opened by a claim nobody followed up
+            self._unindex(room)
+            self.claims.pop(room, None)
+        self._index(new_room, theme, capacity - 1)
+        self.claims[new_room] = now + ttl
+        return new_room, True
+
+    def ping(self, timeout=1.0):
+        return True
+
+
+class RedisStateBackend(StateBackend):
+    """
+    Rooms in Redis: ``game:<room>`` holds the JSON state, ``gamever:<room>``
+    its version and ``presence:<room>`` the set of connected channels.
+    ``openseats:<theme>`` is a sorted set of joinable rooms scored by open
+    seats, and ``seats:<room>`` names the one a room is in. Leaderboards are
+    sorted sets of player scores, with names in ``leaderboard:names``.
+    """
+    LEADERBOARD_NAMES = 'leaderboard:names'
+    # KEYS: state, version, seats, theme's open-seat index.
+    # ARGV: expected version ('' = absent), new state, room, open seats
+    CAS_SCRIPT = """
+        if (redis.call('GET', KEYS[2]) or '') ~= ARGV[1] then return 0 end
+        redis.call('SET', KEYS[1], ARGV[2])
+        redis.call('INCR', KEYS[2])
+        local indexed = redis.call('GET', KEYS[3])
+        if indexed then
+            redis.call('ZREM', indexed, ARGV[3])
+            redis.call('DEL', KEYS[3])
+        end
+        if tonumber(ARGV[4]) > 0 then
+            redis.call('ZADD', KEYS[4], ARGV[4], ARGV[3])
+            redis.call('SET', KEYS[3], KEYS[4])
+        end
+        return 1
+    """
+    # KEYS: state, version, presence, seats. ARGV: expected version ('' = any), room
+    DELETE_SCRIPT = """
+        if ARGV[1] ~= '' and (redis.call('GET', KEYS[2]) or '') ~= ARGV[1] then return 0 end
+        local indexed = redis.call('GET', KEYS[4])
+        if indexed then redis.call('ZREM', indexed, ARGV[2]) end
+        redis.call('DEL', KEYS[1], KEYS[2], KEYS[3], KEYS[4])
+        return 1
+    """
+    # KEYS: theme's open-seat index, new room's seats.
+    # ARGV: new room, capacity, claim TTL in ms, seats key prefix.
+    # A new room's seats key expires unless a state write (CAS) replaces it,
+    # so an indexed room without one was opened by an abandoned claim.
+    CLAIM_SCRIPT = """
+        local found = redis.call('ZRANGEBYSCORE', KEYS[1], 1, '+inf', 'LIMIT', 0, 16)
+        for _, room in ipairs(found) do
+            if redis.call('EXISTS', ARGV[4] .. room) == 1 then
+                if tonumber(redis.call('ZINCRBY', KEYS[1], -1, room)) <= 0 then
+                    redis.call('ZREM', KEYS[1], room)
+                end
+                return {room, 0}
+            end
+            redis.call('ZREM', KEYS[1], room)
+        end
+        redis.call('ZADD', KEYS[1], tonumber(ARGV[2]) - 1, ARGV[1])
+        redis.call('SET', KEYS[2], KEYS[1], 'PX', ARGV[3])
+        return {ARGV[1], 1}
+    """
+
+    def __init__(self, host=None, port=None, db=None):
+        self.host = host or settings.REDIS_HOST
+        self.port = port or settings.REDIS_PORT
+        self.db = settings.REDIS_DB if db is None else db
+        self._clients = weakref.WeakKeyDictionary()
+        self._sync_client = None
+        self._cas = None
+        self._delete = None
+        self._claim = None
+
+    @property
+    def client(self):
+        """The async client (and its connection pool) for the running loop.
+
+        redis.asyncio connections belong to the loop that opened them. Under
+        an ASGI server that is one loop shared by consumers and async views;
+        async views under gunicorn each run on a loop of their own.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            import redis.asyncio
+            client = self._clients[loop] = redis.asyncio.Redis(
+                host=self.host, port=self.port, db=self.db, decode_responses=True,
+            )
+            if self._cas is None:
+                # Scripts are called with client=, so any client can register them
+                self._cas = client.register_script(self.CAS_SCRIPT)
+                self._delete = client.register_script(self.DELETE_SCRIPT)
+                self._claim = client.register_script(self.CLAIM_SCRIPT)
+        return client
+
+    @staticmethod
+    def _keys(room):
+        return f'game:{room}', f'gamever:{room}', f'presence:{room}', f'seats:{room}'
+
+    @staticmethod
+    def _index_key(theme):
+        return f'openseats:{theme}'
+
+    async def get(self, room):
+        state_key, version_key, _, _ = self._keys(room)
+        data, version = await self.client.mget(state_key, version_key)
+        if data is None:
+            return None, None
+        return json.loads(data), int(version or 0)
+
+    async def compare_and_set(self, room, state, version):
+        state_key, version_key, _, seats_key = self._keys(room)
+        client = self.client
+        # An existing room without a version key is at version 0
+        expected = '' if version in (None, 0) else str(version)
+        return bool(await self._cas(
+            keys=[state_key, version_key, seats_key, self._index_key(state.get('theme', 'emoji'))],
+            args=[expected, json.dumps(state), room, open_seats(state)],
+            client=client,
+        ))
+
+    async def delete(self, room, version=None):
+        client = self.client
+        expected = str(version) if version else ''
+        return bool(await self._delete(keys=list(self._keys(room)), args=[expected, room], client=client))
+
+    async def list(self):
+        keys = [key async for key in self.client.scan_iter(match='game:*', count=500)]
+        rooms = {}
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            for key, data in zip(batch, await self.client.mget(batch)):
+                if data:
+                    rooms[key[len('game:'):]] = json.loads(data)
+        return rooms
+
+    def snapshot(self):
+        import redis
+        r = redis.Redis(host=self.host, port=self.port, db=self.db, decode_responses=True)
+        rooms = {}
+        for key in r.keys('game:*'):
+            data = r.get(key)
+            if not data:
+                continue
+            state = json.loads(data)
+            # Clean up empty rooms
+            if not state.get('players'):
+                r.delete(key)
+                continue
+            rooms[key[len('game:'):]] = state
+        return rooms
+
+    async def presence_add(self, room, channel):
+        key = self._keys(room)[2]
+        async with self.client.pipeline(transaction=True) as pipe:
+            added, count = await pipe.sadd(key, channel).scard(key).execute()
+        return count
+
+    async def presence_remove(self, room, channel):
+        key = self._keys(room)[2]
+        async with self.client.pipeline(transaction=True) as pipe:
+            removed, count = await pipe.srem(key, channel).scard(key).execute()
+        return count
+
+    async def leaderboard_add(self, boards, player, points, name):
+        async with self.client.pipeline(transaction=True) as pipe:
+            for board, ttl in boards:
+                pipe.zincrby(board, points, player)
+                if ttl:
+                    pipe.expire(board, ttl)
+            pipe.hset(self.LEADERBOARD_NAMES, player, name)
+            await pipe.execute()
+
+    async def leaderboard_top(self, board, count):
+        client = self.client
+        top = await client.zrevrange(board, 0, count - 1, withscores=True)
+        if not top:
+            return []
+        names = await client.hmget(self.LEADERBOARD_NAMES, [player for player, _ in top])
+        return [(player, name or player, int(score)) for (player, score), name in zip(top, names)]
+
+    async def leaderboard_rank(self, board, player):
+        async with self.client.pipeline(transaction=False) as pipe:
+            rank, score = await pipe.zrevrank(board, player).zscore(board, player).execute()
+        return None if rank is None else (rank, int(score))
+
+    async def claim_seat(self, theme, new_room, capacity, ttl=30.0):
+        client = self.client
+        room, created = await self._claim(
+            keys=[self._index_key(theme), self._keys(new_room)[3]],
+            args=[new_room, capacity, max(1, int(ttl * 1000)), 'seats:'],
+            client=client,
+        )
+        return room, bool(created)
+
+    def ping(self, timeout=1.0):
+        # Sync client: probes are answered from sync views under any server
+        if self._sync_client is None:
+            import redis
+            self._sync_client = redis.Redis(
+                host=self.host, port=self.port, db=self.db,
+                socket_timeout=timeout, socket_connect_timeout=timeout,
+            )
+        return self._sync_client.ping()
+
+
+_backend = None
+
+
+def get_backend():
+    """The configured backend, created on first use."""
+    global _backend
+    if _backend is None:
+        path = BACKENDS.get(settings.GAME_STATE_BACKEND, settings.GAME_STATE_BACKEND)
+        _backend = import_string(path)()
+    return _backend
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    global _backend
+    if setting in ('GAME_STATE_BACKEND', 'REDIS_HOST', 'REDIS_PORT', 'REDIS_DB'):
+        _backend = None
@@ -1,48 +1,260 @@
+import asyncio
 import json
 import logging
-import redis.asyncio as redis
+import random
+import time
+from time import perf_counter
+from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
-from app import get_cards
+from channels.layers import get_channel_layer
+from django.conf import settings
+from app import deal_decks
+from . import admission, identity, metrics, ratelimit, turns
+from .backends import MEMORY_ROOMS, STATE_CONFLICTS, get_backend
+from .history import record_game
+from .leaderboard import record_finish, record_match
+from .matchmaking import normalize_theme, quick_join
+from .profiling import profiler
+from .turns import pass_turn, start_turn
+
+try:
+    from websockets.exceptions import ConnectionClosed
+    # uvicorn's websockets protocol raises on a send after the client has
+    # closed (daphne drops it); the consumer must survive to run disconnect()
+    SEND_CLOSED_ERRORS = (ConnectionClosed,)
+except ImportError:
+    SEND_CLOSED_ERRORS = ()
 
 logger = logging.getLogger(__name__)
 
+# Metric children are bound once here so the hot path never builds labels
+KNOWN_ACTIONS = ('start_game', 'flip_card', 'quick_join')
+MESSAGE_TYPES = ('game_update', 'match_found', 'no_match', 'player_joined', 'player_left', 'quick_join', 'rejected', 'turn_timeout')
+RECEIVE_TIME = {action: metrics.RECEIVE_SECONDS.labels(action) for action in KNOWN_ACTIONS}
+REDIS_GET_TIME = metrics.REDIS_SECONDS.labels('get_game')
+REDIS_SET_TIME = metrics.REDIS_SECONDS.labels('set_game')
+REDIS_DELETE_TIME = metrics.REDIS_SECONDS.labels('delete_game')
+GROUP_SEND_TIME = {t: metrics.GROUP_SEND_SECONDS.labels(t) for t in MESSAGE_TYPES}
+SENT_BYTES = {t: metrics.SENT_BYTES.labels(t) for t in MESSAGE_TYPES}
+SENT_MESSAGES = {t: metrics.SENT_MESSAGES.labels(t) for t in MESSAGE_TYPES}
+
+async def get_room(room_name):
+    """Get (game state, version) from the state backend"""
+    start = perf_counter()
+    game, version = await get_backend().get(room_name)
+    REDIS_GET_TIME.observe(perf_counter() - start)
+    return game, version
+
+
+async def update_room(room_name, mutate):
+    """
+    Apply mutate(game) to a room with compare-and-set, re-reading and
+    retrying on conflict. mutate gets None for a missing room and returns
+    the new state, or None to leave the room alone. A room left with no
+    players is deleted. Returns the stored state, or None.
+    """
+    backend = get_backend()
+    while True:
+        game, version = await get_room(room_name)
+        game = mutate(game)
+        if game is None:
+            return None
+        start = perf_counter()
+        if not game['players']:
+            done = await backend.delete(room_name, version)
+            REDIS_DELETE_TIME.observe(perf_counter() - start)
+        else:
+            done = await backend.compare_and_set(room_name, game, version)
+            REDIS_SET_TIME.observe(perf_counter() - start)
+        if done:
+            return game
+        STATE_CONFLICTS.inc()
+        logger.debug("ws.state_conflict room=%s", room_name)
+
+
+async def broadcast_room(layer, room_name, event, game=None):
+    """group_send to the room, recording latency and fan-out size"""
+    if game is not None:
+        metrics.GROUP_SEND_FANOUT.observe(len(game.get('channel_to_player', ())))
+    start = perf_counter()
+    await layer.group_send(f'game_{room_name}', event)
+    GROUP_SEND_TIME[event['type']].observe(perf_counter() - start)
+
+
+async def expire_turn(room_name, deadline):
+    """Pass the turn on once `deadline` has run out, unless the room moved on"""
+    expired = {}
+
+    def expire(game):
+        if not game or game.get('turn_deadline') != deadline or not game['players']:
+            return None
+        if time.time() < deadline:
+            # Called early, e.g. the wall clock stepped back since the timer was set
+            expired['early'] = True
+            return None
+        player = game['players'].get(game['current_player'])
+        expired['player'] = player['name'] if player else None
+        pass_turn(game)
+        return game
+
+    game = await update_room(room_name, expire)
+    if expired.get('early'):
+        turn_timers.arm(room_name, deadline)
+    if game is None:
+        return
+    turns.TURN_TIMEOUTS.inc()
+    logger.info("ws.turn_timeout room=%s player=%s", room_name, expired['player'])
+    turn_timers.watch(room_name, game)
+    layer = get_channel_layer()
+    await broadcast_room(layer, room_name, {'type': 'turn_timeout', 'player': expired['player']}, game)
+    await broadcast_room(layer, room_name, {'type': 'game_update'}, game)
+
+
+turn_timers = turns.RoomTimers(turns.wheel, expire_turn)
+
+
 class GameConsumer(AsyncWebsocketConsumer):
-    redis_client = None
+    games = MEMORY_ROOMS  # Room states when GAME_STATE_BACKEND = 'memory'
+    local_rooms = {}  # room_name -> connections on this process
+    connections = 0  # sockets admitted on this process
+    admitted = False
+    seen = None  # the last room state this socket read, for cheap pre-checks
     
-    @classmethod
-    async def get_redis(cls):
-        """Get or create Redis connection"""
-        if cls.redis_client is None:
-            cls.redis_client = redis.Redis(host='redis', port=6379, decode_responses=True)
-        return cls.redis_client
+    @property
+    def backend(self):
+        return get_backend()
     
     async def get_game(self, room_name):
-        """Get game state from Redis"""
-        r = await self.get_redis()
-        data = await r.get(f'game:{room_name}')
-        if data:
-            return json.loads(data)
-        return None
+        """Get (game state, version) from the state backend"""
+        return await get_room(room_name)
+    
+    async def update_game(self, mutate):
+        """update_room for this socket's room, keeping its view of the state current"""
+        game = await update_room(self.room_name, mutate)
+        if game is not None:
+            self.seen = game
+            turn_timers.watch(self.room_name, game if game['players'] else None)
+        return game
+    
+    async def broadcast(self, event, game=None):
+        await broadcast_room(self.channel_layer, self.room_name, event, game)
+    
+    async def send_message(self, message):
+        """Send a JSON message to this socket, counting outbound bytes"""
+        # json.dumps escapes non-ASCII by default, so len() is the byte count
+        payload = json.dumps(message)
+        SENT_BYTES[message['type']].inc(len(payload))
+        SENT_MESSAGES[message['type']].inc()
+        try:
+            await self.send(text_data=payload)
+        except SEND_CLOSED_ERRORS:
+            logger.debug("ws.send_after_close room=%s channel=%s", self.room_name, self.channel_name)
     
-    async def set_game(self, room_name, game_state):
-        """Save game state to Redis"""
-        r = await self.get_redis()
-        await r.set(f'game:{room_name}', json.dumps(game_state))
+    def track_connection(self, delta):
+        """Keep the per-process connection and room gauges up to date"""
+        if delta < 0 and not getattr(self, 'tracked', False):
+            return
+        self.tracked = delta > 0
+        count = self.local_rooms.get(self.room_name, 0) + delta
+        if count > 0:
+            self.local_rooms[self.room_name] = count
+        else:
+            self.local_rooms.pop(self.room_name, None)
+            # No sockets here to play on; pods that still have some keep the clock
+            turn_timers.forget(self.room_name)
+        GameConsumer.connections += delta
+        metrics.ACTIVE_CONNECTIONS.inc(delta)
+        metrics.ACTIVE_ROOMS.set(len(self.local_rooms))
+    
+    def admit(self):
+        self.admitted = True
+        self.bucket = ratelimit.socket_bucket()
+        self.room_bucket = ratelimit.room_bucket(self.room_name)
+        self.track_connection(1)
     
-    async def delete_game(self, room_name):
-        """Delete game from Redis"""
-        r = await self.get_redis()
-        await r.delete(f'game:{room_name}')
+    async def reject(self, reason):
+        """Accept only to say why, then close with the reason's close code"""
+        message, code = admission.rejection(reason)
+        logger.info("ws.rejected room=%s reason=%s", self.room_name, reason)
+        await self.accept()
+        await self.send_message(message)
+        await self.close(code)
     
     async def connect(self):
         self.room_name = self.scope['url_route']['kwargs']['room_name']
         self.room_group_name = f'game_{self.room_name}'
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        self.spectator = query.get('role', [''])[0] == 'spectator'
         
-        # Use session ID if available, otherwise fall back to channel_name
-        session_id = self.scope.get('session', {}).get('session_key')
-        self.player_id = session_id if session_id else self.channel_name
+        # The signed player cookie maps reconnects to the same player;
+        # without one the socket plays under its channel name
+        verified = None if self.spectator else identity.verify(identity.scope_token(self.scope))
+        self.player_id = None if self.spectator else verified or self.channel_name
         
-        logger.info(f"WebSocket connecting to room: {self.room_name}, player_id: {self.player_id}")
+        logger.debug("ws.connecting room=%s player_id=%s", self.room_name, self.player_id)
+        
+        reason = admission.check_connection(self.connections, self.channel_layer)
+        if reason:
+            await self.reject(reason)
+            return
+        if self.spectator:
+            await self.connect_spectator()
+            return
+        
+        joined = {}
+        # Quick join sends players to new rooms with ?theme= so the room is
+        # indexed under the theme they asked for
+        theme = normalize_theme(query.get('theme', ['emoji'])[0])
+        
+        def join(game):
+            if game is None:
+                game = {
+                    'players': {},
+                    'cards': [],
+                    'flipped': [],
+                    'matched': [],
+                    'current_player': None,
+                    'theme': theme,
+                    'started': False,
+                    'channel_to_player': {}  # Map channels to player IDs
+                }
+            
+            # Ensure channel_to_player mapping exists
+            if 'channel_to_player' not in game:
+                game['channel_to_player'] = {}
+            
+            # Only add player if not already in the game (prevent duplicates)
+            joined['new'] = self.player_id not in game['players']
+            if joined['new'] and len(game['players']) >= game.get('capacity', settings.ROOM_CAPACITY):
+                joined['full'] = True
+                return None
+            
+            # Map this channel to the player ID
+            game['channel_to_player'][self.channel_name] = self.player_id
+            
+            if joined['new']:
+                # Reassign player numbers based on current count
+                game['players'][self.player_id] = {
+                    'name': f'Player {len(game["players"]) + 1}',
+                    'score': 0,
+                    'connected': True,
+                    # Only players with a token can be credited on the leaderboard
+                    'identified': verified is not None,
+                }
+            else:
+                # Mark existing player as connected (reconnection)
+                game['players'][self.player_id]['connected'] = True
+            
+            if game['current_player'] is None or game['current_player'] not in game['players']:
+                game['current_player'] = self.player_id
+                start_turn(game)
+            return game
+        
+        # Join before accepting, so a full room turns the socket away untouched
+        game = await self.update_game(join)
+        if joined.get('full'):
+            await self.reject('room_full')
+            return
         
         await self.channel_layer.group_add(
             self.room_group_name,
@@ -50,288 +262,360 @@ class GameConsumer(AsyncWebsocketConsumer):
         )
         
         await self.accept()
-        logger.info(f"✅ WebSocket accepted for room: {self.room_name}, channel: {self.channel_name}")
-        
-        # Get or create game from Redis
-        game = await self.get_game(self.room_name)
-        if game is None:
-            game = {
-                'players': {},
-                'cards': [],
-                'flipped': [],
-                'matched': [],
-                'current_player': None,
-                'theme': 'emoji',
-                'started': False,
-                'channel_to_player': {}  # Map channels to player IDs
-            }
+        self.admit()
+        logger.info("ws.accept room=%s channel=%s", self.room_name, self.channel_name)
         
-        # Ensure channel_to_player mapping exists
-        if 'channel_to_player' not in game:
-            game['channel_to_player'] = {}
-        
-        # Map this channel to the player ID
-        game['channel_to_player'][self.channel_name] = self.player_id
-        
-        # Only add player if not already in the game (prevent duplicates)
-        if self.player_id not in game['players']:
-            # Reassign player numbers based on current count
-            player_number = len(game['players']) + 1
-            game['players'][self.player_id] = {
-                'name': f'Player {player_number}',
-                'score': 0,
-                'connected': True
-            }
-            logger.info(f"➕ Added new player: Player {player_number} (player_id: {self.player_id})")
+        sockets = await self.backend.presence_add(self.room_name, self.channel_name)
+        if joined['new']:
+            logger.info("ws.player_added room=%s player_number=%d player_id=%s sockets=%d", self.room_name, len(game['players']), self.player_id, sockets)
         else:
-            # Mark existing player as connected (reconnection)
-            game['players'][self.player_id]['connected'] = True
-            logger.info(f"🔄 Reconnected player: {game['players'][self.player_id]['name']} (player_id: {self.player_id})")
-        
-        if game['current_player'] is None or game['current_player'] not in game['players']:
-            game['current_player'] = self.player_id
-        
-        # Save to Redis
-        await self.set_game(self.room_name, game)
+            logger.info("ws.player_reconnected room=%s player_id=%s sockets=%d", self.room_name, self.player_id, sockets)
         
         player_name = game['players'][self.player_id]['name']
-        logger.info(f"👥 Room {self.room_name} now has {len(game['players'])} players: {[p['name'] for p in game['players'].values()]}")
+        if logger.isEnabledFor(logging.DEBUG):
+            names = ', '.join(p['name'] for p in game['players'].values())
+            logger.debug("ws.room_players room=%s count=%d players=%s", self.room_name, len(game['players']), names)
         
         # Notify all players about player joined/reconnected
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'player_joined',
-                'player_name': player_name
-            }
-        )
+        await self.broadcast({
+            'type': 'player_joined',
+            'player_name': player_name
+        }, game)
         
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'game_update'
-            }
-        )
+        await self.broadcast({
+            'type': 'game_update'
+        }, game)
+    
+    async def connect_spectator(self):
+        """Watch a room without joining it, up to MAX_SPECTATORS per room"""
+        key = self.spectator_key
+        if await self.backend.presence_add(key, self.channel_name) > settings.MAX_SPECTATORS:
+            await self.backend.presence_remove(key, self.channel_name)
+            await self.reject('spectators_full')
+            return
+        await self.channel_layer.group_add(self.room_group_name, self.channel_name)
+        await self.accept()
+        self.admit()
+        logger.info("ws.spectate room=%s channel=%s", self.room_name, self.channel_name)
+        await self.game_update({'type': 'game_update'})
+    
+    @property
+    def spectator_key(self):
+        # Room names are [\w-]+, so this can't collide with a room's presence
+        return f'{self.room_name}/spectators'
     
     async def disconnect(self, close_code):
-        logger.info(f"🔌 WebSocket disconnecting from room: {self.room_name}, channel: {self.channel_name}, close_code: {close_code}")
+        if not self.admitted:
+            return
+        logger.info("ws.disconnect room=%s channel=%s close_code=%s", self.room_name, self.channel_name, close_code)
+        if self.spectator:
+            await self.backend.presence_remove(self.spectator_key, self.channel_name)
+            await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+            self.track_connection(-1)
+            return
         
-        game = await self.get_game(self.room_name)
-        if game:
+        left = {}
+        
+        def leave(game):
+            if game is None:
+                left['missing'] = 'game'
+                return None
             # Get channel_to_player mapping
-            channel_to_player = game.get('channel_to_player', {})
-            player_id = channel_to_player.get(self.channel_name, self.channel_name)
+            channel_to_player = game.setdefault('channel_to_player', {})
+            player_id = channel_to_player.pop(self.channel_name, self.channel_name)
+            left['player_id'] = player_id
+            if player_id not in game['players']:
+                left['missing'] = 'player'
+                return None
+            left['player_name'] = game['players'][player_id]['name']
             
-            # Remove channel mapping
-            if self.channel_name in channel_to_player:
-                del channel_to_player[self.channel_name]
+            # Only remove player if they have no other active channels
+            left['removed'] = player_id not in channel_to_player.values()
+            if left['removed']:
+                del game['players'][player_id]
+                
+                # Update current player if needed
+                if game['current_player'] == player_id:
+                    connected_players = list(game['players'].keys())
+                    game['current_player'] = connected_players[0] if connected_players else None
+                    start_turn(game)
+            return game
+        
+        game = await self.update_game(leave)
+        await self.backend.presence_remove(self.room_name, self.channel_name)
+        player_id = left.get('player_id')
+        if left.get('missing') == 'game':
+            logger.warning("ws.game_missing room=%s during=disconnect", self.room_name)
+        elif left.get('missing') == 'player':
+            logger.warning("ws.player_missing room=%s player_id=%s", self.room_name, player_id)
+        elif not game['players']:
+            # update_game deletes rooms with no players left
+            logger.info("ws.room_deleted room=%s", self.room_name)
+        elif left['removed']:
+            logger.info("ws.player_removed room=%s player_id=%s remaining=%d", self.room_name, player_id, len(game['players']))
             
-            # Check if this player has other active channels
-            player_has_other_channels = player_id in channel_to_player.values()
+            # Notify about player leaving
+            await self.broadcast({
+                'type': 'player_left',
+                'player_name': left['player_name']
+            }, game)
             
-            if player_id in game['players']:
-                player_name = game['players'][player_id]['name']
-                
-                # Only remove player if they have no other active channels
-                if not player_has_other_channels:
-                    del game['players'][player_id]
-                    logger.info(f"👋 Player {player_name} (player_id: {player_id}) removed from room {self.room_name}")
-                    logger.info(f"📊 Remaining players in room {self.room_name}: {len(game['players'])}")
-                    
-                    # Update current player if needed
-                    if game['current_player'] == player_id:
-                        connected_players = list(game['players'].keys())
-                        game['current_player'] = connected_players[0] if connected_players else None
-                        logger.info(f"🔄 Current player updated to: {game['current_player']}")
-                    
-                    should_notify = True
-                else:
-                    logger.info(f"🔗 Player {player_name} still has other active connections, not removing")
-                    should_notify = False
-                
-                # If no players left, delete the game from Redis completely
-                if len(game['players']) == 0:
-                    await self.delete_game(self.room_name)
-                    logger.info(f"🧹 Room {self.room_name} deleted from Redis (no players remaining)")
-                else:
-                    # Save updated game state
-                    await self.set_game(self.room_name, game)
-                    logger.info(f"💾 Game state saved for room {self.room_name}")
-                    
-                    if should_notify:
-                        # Notify about player leaving
-                        await self.channel_layer.group_send(
-                            self.room_group_name,
-                            {
-                                'type': 'player_left',
-                                'player_name': player_name
-                            }
-                        )
-                        
-                        # Broadcast update to all remaining players
-                        await self.channel_layer.group_send(
-                            self.room_group_name,
-                            {
-                                'type': 'game_update'
-                            }
-                        )
-            else:
-                logger.warning(f"⚠️ Player ID {player_id} not found in game players for room {self.room_name}")
+            # Broadcast update to all remaining players
+            await self.broadcast({
+                'type': 'game_update'
+            }, game)
         else:
-            logger.warning(f"⚠️ No game found for room {self.room_name} during disconnect")
+            logger.debug("ws.player_still_connected room=%s player_id=%s", self.room_name, player_id)
         
         await self.channel_layer.group_discard(
             self.room_group_name,
             self.channel_name
         )
-        logger.info(f"✅ Cleanup complete for channel {self.channel_name}")
+        self.track_connection(-1)
+        logger.debug("ws.cleanup_done channel=%s", self.channel_name)
+    
+    async def within_limits(self):
+        """Spend this frame's tokens, applying WS_LIMIT_RESPONSE if there are none"""
+        if self.bucket.take() and self.room_bucket.take():
+            return True
+        response = settings.WS_LIMIT_RESPONSE
+        if response == 'throttle':
+            wait = max(self.bucket.wait(), self.room_bucket.wait())
+            if wait <= settings.WS_THROTTLE_MAX_WAIT:
+                await asyncio.sleep(wait)
+                if self.bucket.take() and self.room_bucket.take():
+                    return True
+        ratelimit.DROPPED['rate_limited'].inc()
+        if response == 'disconnect':
+            logger.info("ws.rate_limited room=%s channel=%s", self.room_name, self.channel_name)
+            await self.close(ratelimit.CLOSE_POLICY_VIOLATION)
+        return False
     
-    async def receive(self, text_data):
-        data = json.loads(text_data)
+    def prevalidate(self, text_data):
+        """(data, None) for a frame worth handling, else (None, reason); no backend access"""
+        try:
+            data = json.loads(text_data)
+        except (TypeError, ValueError):
+            return None, 'bad_json'
+        if not isinstance(data, dict):
+            return None, 'bad_json'
         action = data.get('action')
-        game = await self.get_game(self.room_name)
-        
-        if not game:
+        if action not in KNOWN_ACTIONS or (self.spectator and action != 'quick_join'):
+            return None, 'unknown_action'
+        # The same checks flip() makes, against the last state this socket saw;
+        # the turn only changes through a game_update, which refreshes it first
+        game = self.seen
+        if action == 'flip_card' and game is not None:
+            index = data.get('index')
+            if game['current_player'] != self.player_id or index in game['matched'] or index in game['flipped']:
+                return None, 'invalid_move'
+            if not isinstance(index, int) or not 0 <= index < len(game['cards']):
+                return None, 'invalid_move'
+        return data, None
+    
+    async def receive(self, text_data=None, bytes_data=None):
+        if not self.admitted:
             return
-        
+        start = perf_counter()
+        if text_data is not None and len(text_data) > settings.WS_MAX_MESSAGE_BYTES:
+            ratelimit.DROPPED['too_large'].inc()
+            if settings.WS_LIMIT_RESPONSE == 'disconnect':
+                await self.close(ratelimit.CLOSE_POLICY_VIOLATION)
+            return
+        if not await self.within_limits():
+            return
+        data, reason = self.prevalidate(text_data)
+        if reason:
+            ratelimit.DROPPED[reason].inc()
+            return
+        action = data['action']
+        reason = admission.check_action(action, self.channel_layer)
+        if reason:
+            message, _ = admission.rejection(reason)
+            await self.send_message(message)
+            return
+        try:
+            with profiler.profile('ws', action):
+                await self.handle_action(action, data)
+        finally:
+            RECEIVE_TIME[action].observe(perf_counter() - start)
+    
+    async def handle_action(self, action, data):
         if action == 'start_game':
             theme = data.get('theme', 'emoji')
-            game['theme'] = theme
-            game['cards'] = get_cards(theme)
-            game['matched'] = []
-            game['flipped'] = []
-            game['started'] = True
-            
-            for player in game['players'].values():
-                player['score'] = 0
+            # Dealt from a recorded seed, so the history can replay the deck
+            seed = random.getrandbits(63)
+            cards = deal_decks(theme, 1, seed=seed)[0]
             
-            # Save to Redis
-            await self.set_game(self.room_name, game)
+            def start(game):
+                if not game:
+                    return None
+                game['theme'] = theme
+                game['cards'] = cards
+                game['seed'] = seed
+                game['matched'] = []
+                game['flipped'] = []
+                game['started'] = True
+                game['started_at'] = time.time()
+                game['moves'] = 0
+                # [card, player number, ms since the start] per flip, for the
+                # game record; numbers index flip_players
+                game['flips'] = []
+                game['flip_players'] = []
+                
+                for player in game['players'].values():
+                    player['score'] = 0
+                start_turn(game)
+                return game
             
-            # Broadcast game state to all players
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
+            game = await self.update_game(start)
+            if game:
+                # Broadcast game state to all players
+                await self.broadcast({
                     'type': 'game_update'
-                }
-            )
+                }, game)
         
         elif action == 'flip_card':
-            if game['current_player'] != self.player_id:
-                return
-            
             index = data.get('index')
-            if index in game['matched'] or index in game['flipped']:
-                return
             
-            game['flipped'].append(index)
+            def flip(game):
+                if not game or game['current_player'] != self.player_id:
+                    return None
+                if index in game['matched'] or index in game['flipped']:
+                    return None
+                # Also keeps the flip encodable in the game record
+                if not isinstance(index, int) or not 0 <= index < len(game['cards']):
+                    return None
+                game['flipped'].append(index)
+                game['moves'] = game.get('moves', 0) + 1
+                flip_players = game.setdefault('flip_players', [])
+                if self.player_id not in flip_players:
+                    flip_players.append(self.player_id)
+                started_at = game.get('started_at') or time.time()
+                game.setdefault('flips', []).append([
+                    # Clamped: started_at may come from a pod whose clock is ahead
+                    index, flip_players.index(self.player_id), max(0, int((time.time() - started_at) * 1000)),
+                ])
+                return game
             
-            # Save to Redis
-            await self.set_game(self.room_name, game)
+            game = await self.update_game(flip)
+            if not game:
+                return
             
             # Broadcast the flip immediately to all players
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    'type': 'game_update'
-                }
-            )
+            await self.broadcast({
+                'type': 'game_update'
+            }, game)
             
             # Check for match if two cards are flipped
             if len(game['flipped']) == 2:
                 # Don't block here - let client handle the delay
-                idx1, idx2 = game['flipped']
+                pair = game['flipped']
+                idx1, idx2 = pair
                 if game['cards'][idx1] == game['cards'][idx2]:
-                    game['matched'].extend(game['flipped'])
-                    game['players'][self.player_id]['score'] += 1
-                    
-                    await self.channel_layer.group_send(
-                        self.room_group_name,
-                        {
-                            'type': 'match_found',
-                            'indices': [idx1, idx2],
-                            'player': game['players'][self.player_id]['name']
-                        }
-                    )
+                    await self.broadcast({
+                        'type': 'match_found',
+                        'indices': [idx1, idx2],
+                        'player': game['players'][self.player_id]['name']
+                    }, game)
                     
-                    # Clear flipped after notifying
-                    game['flipped'] = []
+                    def score(game):
+                        if not game or game['flipped'] != pair:
+                            return None
+                        game['matched'].extend(pair)
+                        if self.player_id in game['players']:
+                            game['players'][self.player_id]['score'] += 1
+                        # Clear flipped after notifying
+                        game['flipped'] = []
+                        # A match earns another go, on a fresh clock
+                        start_turn(game)
+                        return game
                     
-                    # Save to Redis
-                    await self.set_game(self.room_name, game)
-                    
-                    # Send updated state
-                    await self.channel_layer.group_send(
-                        self.room_group_name,
-                        {
-                            'type': 'game_update'
-                        }
-                    )
+                    game = await self.update_game(score)
+                    if game and self.player_id in game['players']:
+                        record_match(game, self.player_id)
+                    # Only the socket whose score landed the last pair records the game
+                    if game and len(game['matched']) == len(game['cards']):
+                        record_game(self.room_name, game)
+                        record_finish(game)
                 else:
-                    await self.channel_layer.group_send(
-                        self.room_group_name,
-                        {
-                            'type': 'no_match',
-                            'indices': [idx1, idx2]
-                        }
-                    )
+                    await self.broadcast({
+                        'type': 'no_match',
+                        'indices': [idx1, idx2]
+                    }, game)
                     
                     # Wait for client-side delay before clearing flipped cards
-                    import asyncio
                     await asyncio.sleep(2.0)
                     
-                    player_ids = list(game['players'].keys())
-                    current_idx = player_ids.index(game['current_player'])
-                    game['current_player'] = player_ids[(current_idx + 1) % len(player_ids)]
-                    game['flipped'] = []
+                    def next_turn(game):
+                        if not game or game['flipped'] != pair:
+                            return None
+                        pass_turn(game)
+                        return game
                     
-                    # Save to Redis
-                    await self.set_game(self.room_name, game)
+                    game = await self.update_game(next_turn)
                 
-                    await self.channel_layer.group_send(
-                        self.room_group_name,
-                        {
-                            'type': 'game_update'
-                        }
-                    )
+                if game:
+                    # Send updated state
+                    await self.broadcast({
+                        'type': 'game_update'
+                    }, game)
+        
+        elif action == 'quick_join':
+            # Only this socket hears back; it reconnects to the room it's given
+            room, theme, created = await quick_join(data.get('theme', 'emoji'))
+            logger.info("ws.quick_join room=%s theme=%s created=%s", room, theme, created)
+            await self.send_message({
+                'type': 'quick_join',
+                'room': room,
+                'theme': theme
+            })
     
     async def game_update(self, event):
         """Send game update with personalized is_you and is_your_turn flags"""
-        game = await self.get_game(self.room_name)
+        game, _ = await self.get_game(self.room_name)
+        self.seen = game
+        turn_timers.watch(self.room_name, game)
         if game:
             # Serialize with this player's perspective
             personalized_game = self.serialize_game(game, self.player_id)
-            await self.send(text_data=json.dumps({
+            await self.send_message({
                 'type': 'game_update',
                 'game': personalized_game
-            }))
+            })
         else:
-            logger.warning(f"No game found in Redis for room {self.room_name}")
+            logger.warning("ws.game_missing room=%s during=game_update", self.room_name)
     
     async def match_found(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send_message({
             'type': 'match_found',
             'indices': event['indices'],
             'player': event['player']
-        }))
+        })
     
     async def no_match(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send_message({
             'type': 'no_match',
             'indices': event['indices']
-        }))
+        })
     
     async def player_joined(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send_message({
             'type': 'player_joined',
             'player_name': event['player_name']
-        }))
+        })
+    
+    async def turn_timeout(self, event):
+        await self.send_message({
+            'type': 'turn_timeout',
+            'player': event['player']
+        })
     
     async def player_left(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send_message({
             'type': 'player_left',
             'player_name': event['player_name']
-        }))
+        })
     
     def serialize_game(self, game, current_player_id=None):
         """Serialize game state. If current_player_id is None, don't set is_you flags."""
@@ -353,5 +637,6 @@ class GameConsumer(AsyncWebsocketConsumer):
             'current_player': game['players'][game['current_player']]['name'] if game['current_player'] and game['current_player'] in game['players'] else 'Player 1',
             'theme': game['theme'],
             'started': game['started'],
+            'turn_time_left': max(0.0, round(game['turn_deadline'] - time.time(), 1)) if game.get('turn_deadline') else None,
             'is_your_turn': game['current_player'] == current_player_id if current_player_id else False
         }
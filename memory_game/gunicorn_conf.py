@@ -0,0 +1,18 @@
+"""
+gunicorn settings for the pages/API half of split serving (SPLIT_SERVING=1).
+
+    gunicorn -c python:memory_game.gunicorn_conf memory_game.wsgi:application
+
+Threaded workers: pages are sync views, and each thread hands the async
+``/api/*`` views to its worker's API loop (``memory_game/apiloop.py``), where
+they share one Redis pool and the ``API_CONCURRENCY`` cap.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv('HTTP_WORKERS', '2'))
+worker_class = 'gthread'
+threads = int(os.getenv('HTTP_THREADS', '4'))
+keepalive = 5
+graceful_timeout = 30
+accesslog = None
@@ -0,0 +1,122 @@
+"""
+Liveness and readiness checks for the k8s probes.
+
+``/healthz`` only proves the process can answer a request. ``/readyz`` runs
+the checks below and caches the result for READY_CACHE_SECONDS, so however
+many probes and load balancers ask, Redis and the channel layer see at most
+one check per window; concurrent requests wait for the check in flight
+rather than starting their own.
+"""
+import asyncio
+import logging
+import threading
+import time
+import app
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from .backends import get_backend
+from .looplag import monitor
+
+logger = logging.getLogger(__name__)
+
+# Themes fetched from external APIs on first use; see app.get_cards
+REMOTE_THEMES = ('starwars', 'pokemon')
+
+
+def check_redis():
+    return get_backend().ping(timeout=settings.READY_TIMEOUT)
+
+
+async def channel_round_trip():
+    layer = get_channel_layer()
+    channel = await layer.new_channel()
+    await layer.send(channel, {'type': 'health.ping'})
+    message = await asyncio.wait_for(layer.receive(channel), settings.READY_TIMEOUT)
+    return message.get('type') == 'health.ping'
+
+
+def check_channel_layer():
+    return async_to_sync(channel_round_trip)()
+
+
+_warming = threading.Lock()
+_warmed = threading.Event()
+
+
+def warm_themes():
+    with _warming:
+        try:
+            for theme in REMOTE_THEMES:
+                app.get_cards(theme)
+        finally:
+            _warmed.set()
+
+
+def check_themes():
+    """True once the remote themes are loaded; starts loading them otherwise.
+
+    A finished attempt also counts, so an unreachable API can't keep the pod
+    out of rotation; get_cards retries on the next game.
+    """
+    if _warmed.is_set() or all(app.THEMES.get(theme) for theme in REMOTE_THEMES):
+        return True
+    if not _warming.locked():
+        threading.Thread(target=warm_themes, name='theme-warmup', daemon=True).start()
+    return False
+
+
+def check_loop_lag():
+    # The monitor wasn't started on this process's ASGI loop, or is disabled:
+    # nothing to hold readiness on
+    if not monitor.running:
+        return True
+    return monitor.last_lag < settings.READY_MAX_LOOP_LAG
+
+
+CHECKS = {
+    'redis': check_redis,
+    'channel_layer': check_channel_layer,
+    'themes': check_themes,
+    'loop_lag': check_loop_lag,
+}
+
+
+class Readiness:
+    """Readiness result, recomputed at most once per `ttl` seconds."""
+
+    def __init__(self, checks, ttl):
+        self.checks = checks
+        self.ttl = ttl
+        self.result = None
+        self.checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def run_checks(self):
+        results = {}
+        for name, check in self.checks.items():
+            start = time.perf_counter()
+            try:
+                ok = bool(check())
+                error = None
+            except Exception as e:
+                ok, error = False, f'{type(e).__name__}: {e}'
+            results[name] = {'ok': ok, 'ms': round((time.perf_counter() - start) * 1000, 2)}
+            if error:
+                results[name]['error'] = error
+        ready = all(check['ok'] for check in results.values())
+        if not ready:
+            failed = ','.join(name for name, check in results.items() if not check['ok'])
+            logger.warning("health.not_ready failed=%s", failed)
+        return {'ready': ready, 'checks': results}
+
+    def get(self):
+        """Returns (result, age in seconds)"""
+        with self._lock:
+            if self.result is None or time.monotonic() - self.checked_at >= self.ttl:
+                self.result = self.run_checks()
+                self.checked_at = time.monotonic()
+            return self.result, time.monotonic() - self.checked_at
+
+
+readiness = Readiness(CHECKS, settings.READY_CACHE_SECONDS)
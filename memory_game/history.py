@@ -0,0 +1,198 @@
+"""
+Write-behind history of finished games.
+
+``record_game`` only builds a row and puts it on a bounded in-process queue;
+a writer thread drains the queue and inserts rows in batches of up to
+HISTORY_BATCH_SIZE, one transaction each, into the SQLite file at
+GAME_HISTORY_DB (WAL mode, so readers never block it and several worker
+processes can share the file). Each row carries the game's binary record
+(``memory_game.records``) with its deck and flips, for export. The event
+loop never waits on the disk: if the queue is full the record is dropped and
+counted. Rows still queued at exit are flushed by an atexit hook.
+"""
+import atexit
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from . import metrics, records
+
+logger = logging.getLogger(__name__)
+
+GAMES_RECORDED = metrics.Counter(
+    'memory_game_history_records_total',
+    'Finished games sent to the history database, by result.',
+    ['result'],
+)
+RECORDED_WRITTEN = GAMES_RECORDED.labels('written')
+RECORDED_DROPPED = GAMES_RECORDED.labels('dropped')
+RECORDED_FAILED = GAMES_RECORDED.labels('failed')
+FLUSH_SECONDS = metrics.Histogram(
+    'memory_game_history_flush_seconds',
+    'Time to write one batch of finished games.',
+)
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS games (
+        id INTEGER PRIMARY KEY,
+        room TEXT NOT NULL,
+        theme TEXT NOT NULL,
+        seed INTEGER,
+        players TEXT NOT NULL,
+        moves INTEGER NOT NULL,
+        started_at REAL,
+        finished_at REAL NOT NULL,
+        duration REAL,
+        record BLOB
+    );
+    CREATE INDEX IF NOT EXISTS games_finished_at ON games (finished_at);
+"""
+INSERT = """
+    INSERT INTO games (room, theme, seed, players, moves, started_at, finished_at, duration, record)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def connect(path):
+    if path != ':memory:':
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(path, timeout=5, check_same_thread=False)
+    db.execute('PRAGMA journal_mode=WAL')
+    # WAL is safe against corruption at NORMAL; a crash only loses the last batches
+    db.execute('PRAGMA synchronous=NORMAL')
+    db.executescript(SCHEMA)
+    # Files from before game records were kept lack the column
+    if 'record' not in {column[1] for column in db.execute('PRAGMA table_info(games)')}:
+        db.execute('ALTER TABLE games ADD COLUMN record BLOB')
+    return db
+
+
+def game_row(room, game, finished_at=None):
+    """The history row for a finished game state"""
+    finished_at = time.time() if finished_at is None else finished_at
+    started_at = game.get('started_at')
+    players = [{'name': p['name'], 'score': p['score']} for p in game['players'].values()]
+    return (
+        room,
+        game.get('theme', 'emoji'),
+        game.get('seed'),
+        json.dumps(players),
+        game.get('moves', 0),
+        started_at,
+        finished_at,
+        finished_at - started_at if started_at else None,
+        records.encode(records.game_record(room, game, finished_at)),
+    )
+
+
+class HistoryWriter:
+    """Queue of finished-game rows and the thread writing them in batches"""
+
+    _STOP = object()
+
+    def __init__(self, path, batch_size=100, flush_interval=1.0, maxsize=10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize)
+        self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+        self._thread.start()
+
+    def put(self, row):
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            RECORDED_DROPPED.inc()
+
+    def stop(self, timeout=5.0):
+        """Flush what's queued and stop the thread"""
+        if self._thread.is_alive():
+            try:
+                self.queue.put(self._STOP, timeout=timeout)
+            except queue.Full:
+                return
+            self._thread.join(timeout)
+
+    def _run(self):
+        db = connect(self.path)
+        try:
+            while True:
+                batch = [self.queue.get()]
+                # Wait a little for more rows, so a busy pod writes few, larger batches
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size and batch[-1] is not self._STOP:
+                    try:
+                        batch.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                    except queue.Empty:
+                        break
+                stop = batch[-1] is self._STOP
+                rows = [row for row in batch if row is not self._STOP]
+                if rows:
+                    self._write(db, rows)
+                if stop:
+                    return
+        finally:
+            db.close()
+
+    def _write(self, db, rows):
+        start = time.perf_counter()
+        try:
+            with db:
+                db.executemany(INSERT, rows)
+        except sqlite3.Error as e:
+            RECORDED_FAILED.inc(len(rows))
+            logger.error("history.write_failed rows=%d error=%s", len(rows), e)
+            return
+        FLUSH_SECONDS.observe(time.perf_counter() - start)
+        RECORDED_WRITTEN.inc(len(rows))
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """The process's writer, started on first use; None when GAME_HISTORY_DB is empty"""
+    global _writer
+    if _writer is None and settings.GAME_HISTORY_DB:
+        with _writer_lock:
+            if _writer is None:
+                _writer = HistoryWriter(
+                    settings.GAME_HISTORY_DB,
+                    batch_size=settings.HISTORY_BATCH_SIZE,
+                    flush_interval=settings.HISTORY_FLUSH_INTERVAL,
+                    maxsize=settings.HISTORY_QUEUE_SIZE,
+                )
+                atexit.register(_writer.stop)
+    return _writer
+
+
+def record_game(room, game):
+    """Queue a finished game for the history database; never blocks or raises"""
+    writer = get_writer()
+    if writer is None:
+        return
+    try:
+        row = game_row(room, game)
+    except Exception:
+        RECORDED_FAILED.inc()
+        logger.exception("history.record_failed room=%s", room)
+        return
+    writer.put(row)
+
+
+@receiver(setting_changed)
+def reset_writer(setting, **kwargs):
+    global _writer
+    if setting in ('GAME_HISTORY_DB', 'HISTORY_BATCH_SIZE', 'HISTORY_FLUSH_INTERVAL', 'HISTORY_QUEUE_SIZE'):
+        with _writer_lock:
+            if _writer is not None:
+                _writer.stop()
+                atexit.unregister(_writer.stop)
+            _writer = None
@@ -0,0 +1,62 @@
+"""
+Signed player tokens.
+
+``POST /api/player`` gives each browser a random player id, signed and
+timestamped with SECRET_KEY (``django.core.signing.TimestampSigner``) and
+kept in the PLAYER_COOKIE cookie; a valid cookie keeps its id and has its
+expiry pushed back. Sockets send the cookie with their handshake and the
+consumer checks it in-process (an HMAC, no database or Redis read), so a
+reconnecting browser comes back as the same player instead of a new one.
+Sockets with no valid token play under their channel name, as before.
+"""
+import secrets
+from django.conf import settings
+from django.core import signing
+from django.http import parse_cookie
+from . import metrics
+
+SALT = 'memory_game.player'
+
+TOKEN_CHECKS = metrics.Counter(
+    'memory_game_player_tokens_total',
+    'Player tokens checked on page loads and connects, by result.',
+    ['result'],
+)
+TOKEN_VALID = TOKEN_CHECKS.labels('valid')
+TOKEN_EXPIRED = TOKEN_CHECKS.labels('expired')
+TOKEN_INVALID = TOKEN_CHECKS.labels('invalid')
+TOKEN_MISSING = TOKEN_CHECKS.labels('missing')
+
+
+def new_player_id():
+    return secrets.token_urlsafe(12)
+
+
+def issue(player=None):
+    """A token for `player`, or for a new player id"""
+    return signing.TimestampSigner(salt=SALT).sign(player or new_player_id())
+
+
+def verify(token):
+    """The player id in `token`, or None if it is missing, forged or older than PLAYER_TOKEN_MAX_AGE"""
+    if not token:
+        TOKEN_MISSING.inc()
+        return None
+    try:
+        player = signing.TimestampSigner(salt=SALT).unsign(token, max_age=settings.PLAYER_TOKEN_MAX_AGE)
+    except signing.SignatureExpired:
+        TOKEN_EXPIRED.inc()
+        return None
+    except signing.BadSignature:
+        TOKEN_INVALID.inc()
+        return None
+    TOKEN_VALID.inc()
+    return player
+
+
+def scope_token(scope):
+    """The player token cookie sent with a socket's handshake"""
+    for name, value in scope.get('headers', ()):
+        if name == b'cookie':
+            return parse_cookie(value.decode('latin-1')).get(settings.PLAYER_COOKIE)
+    return None
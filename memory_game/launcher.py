@@ -0,0 +1,352 @@
+"""
+Multi-worker launcher: N ASGI worker processes per container.
+
+    python -m memory_game.launcher --workers 4 --port 8080
+
+The master binds the public socket and starts each worker on it with
+``daphne --fd``, or ``uvicorn --fd`` on uvloop with the httptools and
+websockets protocol implementations when ``--server uvicorn``
+(``ASGI_SERVER=uvicorn``). By default every worker accepts from the one shared
+socket (prefork); with ``--reuse-port`` each worker gets its own
+SO_REUSEPORT socket on the same port and the kernel spreads connections
+evenly between them. Rooms span workers through the Redis state backend
+and channel layer, so the in-memory ones are refused with more than one
+worker.
+
+Each worker also serves its metrics on a private loopback port
+(``WORKER_METRICS_PORT``, see memory_game/asgi.py). The master serves
+``/metrics`` on ``--metrics-port``, merging every worker's metrics with a
+``worker`` label, so a pod is still one scrape target.
+
+Signals to the master:
+
+- ``HUP``: graceful reload. Workers are replaced one at a time; a new
+  worker is started and ready before the old one gets SIGTERM.
+- ``TERM`` / ``INT``: graceful stop; workers still running after
+  ``--graceful-timeout`` are killed.
+
+Workers that exit on their own are restarted.
+
+With ``--split`` (``SPLIT_SERVING=1``) the workers serve only WebSockets
+on ``--ws-port`` and the launcher also supervises gunicorn on ``--port``
+for pages, static files and ``/api/*`` (see memory_game/gunicorn_conf.py).
+HUP is passed on to gunicorn, which reloads its own workers.
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+WORKERS = metrics.Gauge(
+    'memory_game_launcher_workers',
+    'Worker processes running under the launcher.',
+)
+WORKER_RESTARTS = metrics.Counter(
+    'memory_game_launcher_worker_restarts_total',
+    'Workers restarted after exiting unexpectedly.',
+)
+RELOADS = metrics.Counter(
+    'memory_game_launcher_reloads_total',
+    'Graceful reloads triggered with SIGHUP.',
+)
+
+
+def label_sample(line, worker):
+    """Add worker="<n>" to one sample line of the text exposition format"""
+    if worker is None:
+        return line
+    name, sep, rest = line.partition('{')
+    if sep:
+        return f'{name}{{worker="{worker}",{rest}'
+    name, _, value = line.partition(' ')
+    return f'{name}{{worker="{worker}"}} {value}'
+
+
+def merge_metrics(outputs):
+    """
+    Merge (worker, exposition text) pairs into one, keeping families grouped.
+    Samples from a worker of None are left unlabelled.
+    """
+    families = {}
+    for worker, text in outputs:
+        family = families.setdefault('', {'headers': [], 'samples': []})
+        for line in text.splitlines():
+            if line.startswith('# '):
+                family = families.setdefault(line.split()[2], {'headers': [], 'samples': []})
+                if line not in family['headers']:
+                    family['headers'].append(line)
+            elif line:
+                family['samples'].append(label_sample(line, worker))
+    lines = []
+    for family in families.values():
+        lines.extend(family['headers'])
+        lines.extend(family['samples'])
+    return '\n'.join(lines) + '\n'
+
+
+def worker_command(args, fd):
+    """argv for one worker process"""
+    if args.server == 'uvicorn':
+        return [
+            sys.executable, '-m', 'uvicorn',
+            '--fd', str(fd),
+            '--loop', 'uvloop',
+            '--http', 'httptools',
+            '--ws', 'websockets',
+            # Django's ASGI handler doesn't implement lifespan
+            '--lifespan', 'off',
+            '--no-access-log',
+            args.app,
+        ]
+    return [sys.executable, '-m', 'daphne', '--fd', str(fd), args.app]
+
+
+def worker_env(args, slot, port, environ=os.environ):
+    """Environment for one worker process"""
+    return dict(
+        environ,
+        WORKER_ID=str(slot),
+        WORKER_METRICS_PORT=str(port),
+        # asgi.py reads this, so --split must reach the workers as well
+        SPLIT_SERVING='1' if args.split else '0',
+        # admission.py splits MAX_CONNECTIONS across the workers
+        WEB_WORKERS=str(args.workers),
+    )
+
+
+def http_command(args):
+    """argv for gunicorn in split mode"""
+    return [
+        sys.executable, '-m', 'gunicorn',
+        '-c', 'python:memory_game.gunicorn_conf',
+        '--bind', f'{args.bind}:{args.port}',
+        args.http_app,
+    ]
+
+
+def check_shared_backends(workers, split=False, environ=os.environ):
+    """Refuse in-process backends when rooms would be split across processes"""
+    if environ.get('GAME_STATE_BACKEND') == 'memory' and (workers > 1 or split):
+        raise SystemExit('GAME_STATE_BACKEND=memory keeps rooms inside one process; use redis')
+    if environ.get('CHANNEL_LAYER') == 'memory' and workers > 1:
+        raise SystemExit(f'CHANNEL_LAYER=memory keeps rooms inside one process; use redis with --workers {workers}')
+
+
+class Worker:
+    def __init__(self, slot, process, private_port, sock):
+        self.slot = slot
+        self.process = process
+        self.private_port = private_port
+        self.sock = sock  # Own socket with --reuse-port, else None
+        self.started = time.monotonic()
+
+
+class Launcher:
+    def __init__(self, args):
+        self.args = args
+        self.workers = {}
+        self.http = None
+        self.generation = 0
+        self.listener = None
+        self.stopping = False
+        self.reload_requested = False
+
+    @property
+    def asgi_port(self):
+        return self.args.ws_port if self.args.split else self.args.port
+
+    def bind(self, reuse_port=False):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind((self.args.bind, self.asgi_port))
+        sock.listen(self.args.backlog)
+        sock.set_inheritable(True)
+        return sock
+
+    def private_port(self, slot):
+        # Old and new workers of a slot overlap during reload, so take whichever
+        # of the slot's two ports the running worker isn't holding. A failed
+        # reload keeps the old worker, so a count of reloads can't tell which.
+        port = self.args.worker_port_base + 2 * slot
+        running = self.workers.get(slot)
+        return port + 1 if running is not None and running.private_port == port else port
+
+    def spawn(self, slot):
+        sock = self.bind(reuse_port=True) if self.args.reuse_port else None
+        fd = (sock or self.listener).fileno()
+        port = self.private_port(slot)
+        process = subprocess.Popen(worker_command(self.args, fd), pass_fds=(fd,), env=worker_env(self.args, slot, port))
+        logger.info("launcher.spawn worker=%d pid=%d port=%d", slot, process.pid, port)
+        return Worker(slot, process, port, sock)
+
+    def spawn_http(self):
+        self.http = subprocess.Popen(http_command(self.args))
+        logger.info("launcher.spawn_http pid=%d port=%d", self.http.pid, self.args.port)
+
+    def wait_ready(self, worker, timeout):
+        """Wait until the worker has loaded the app and serves its metrics"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and worker.process.poll() is None:
+            try:
+                with socket.create_connection(('127.0.0.1', worker.private_port), timeout=0.5):
+                    return True
+            except OSError:
+                time.sleep(0.1)
+        return False
+
+    def retire(self, worker, timeout):
+        """SIGTERM a worker, SIGKILL it if it outlives the timeout"""
+        if worker.process.poll() is None:
+            worker.process.terminate()
+            try:
+                worker.process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                logger.warning("launcher.kill worker=%d pid=%d", worker.slot, worker.process.pid)
+                worker.process.kill()
+                worker.process.wait()
+        if worker.sock is not None:
+            worker.sock.close()
+
+    def reload(self):
+        RELOADS.inc()
+        self.generation += 1
+        logger.info("launcher.reload generation=%d", self.generation)
+        if self.http is not None:
+            self.http.send_signal(signal.SIGHUP)
+        for slot in sorted(self.workers):
+            old = self.workers[slot]
+            new = self.spawn(slot)
+            if not self.wait_ready(new, self.args.graceful_timeout):
+                logger.warning("launcher.reload_failed worker=%d", slot)
+                self.retire(new, self.args.graceful_timeout)
+                continue
+            self.workers[slot] = new
+            self.retire(old, self.args.graceful_timeout)
+
+    def reap(self):
+        """Restart workers that exited while they should be running"""
+        for slot, worker in list(self.workers.items()):
+            code = worker.process.poll()
+            if code is None:
+                continue
+            logger.warning("launcher.worker_exit worker=%d pid=%d code=%s", slot, worker.process.pid, code)
+            if worker.sock is not None:
+                worker.sock.close()
+            # Don't spin when a worker dies right after starting
+            if time.monotonic() - worker.started < 1:
+                time.sleep(1)
+            WORKER_RESTARTS.inc()
+            self.workers[slot] = self.spawn(slot)
+        if self.http is not None and self.http.poll() is not None:
+            logger.warning("launcher.http_exit pid=%d code=%s", self.http.pid, self.http.returncode)
+            WORKER_RESTARTS.inc()
+            self.spawn_http()
+
+    def scrape(self):
+        own = [line for metric in (WORKERS, WORKER_RESTARTS, RELOADS) for line in metric.render()]
+        outputs = [(None, '\n'.join(own))]
+        for slot, worker in sorted(self.workers.items()):
+            try:
+                url = f'http://127.0.0.1:{worker.private_port}/metrics'
+                with urllib.request.urlopen(url, timeout=2) as response:
+                    outputs.append((slot, response.read().decode()))
+            except OSError as e:
+                logger.warning("launcher.scrape_failed worker=%d error=%s", slot, e)
+        return merge_metrics(outputs)
+
+    def handle_signal(self, signum, frame):
+        if signum == signal.SIGHUP:
+            self.reload_requested = True
+        else:
+            self.stopping = True
+
+    def run(self):
+        if not self.args.reuse_port:
+            self.listener = self.bind()
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self.handle_signal)
+        metrics_server = None
+        if self.args.metrics_port:
+            metrics_server = metrics.start_http_server(self.args.metrics_port, self.args.bind, self.scrape)
+        for slot in range(self.args.workers):
+            self.workers[slot] = self.spawn(slot)
+        if self.args.split:
+            self.spawn_http()
+        logger.info("launcher.ready workers=%d port=%d reuse_port=%s split=%s", self.args.workers, self.asgi_port, self.args.reuse_port, self.args.split)
+        while not self.stopping:
+            if self.reload_requested:
+                self.reload_requested = False
+                self.reload()
+            self.reap()
+            WORKERS.set(sum(1 for w in self.workers.values() if w.process.poll() is None))
+            time.sleep(0.2)
+        logger.info("launcher.stop workers=%d", len(self.workers))
+        for worker in self.workers.values():
+            if worker.process.poll() is None:
+                worker.process.terminate()
+        if self.http is not None and self.http.poll() is None:
+            self.http.terminate()
+        deadline = time.monotonic() + self.args.graceful_timeout
+        for worker in self.workers.values():
+            self.retire(worker, max(0, deadline - time.monotonic()))
+        if self.http is not None:
+            try:
+                self.http.wait(max(0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                self.http.kill()
+                self.http.wait()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        if self.listener is not None:
+            self.listener.close()
+        return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_WORKERS', '1')),
+                        help='worker processes (env WEB_WORKERS, default 1)')
+    parser.add_argument('--bind', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.getenv('PORT', '8080')))
+    parser.add_argument('--app', default='memory_game.asgi:application')
+    parser.add_argument('--server', choices=['daphne', 'uvicorn'], default=os.getenv('ASGI_SERVER', 'daphne'),
+                        help='ASGI server for the workers (env ASGI_SERVER)')
+    parser.add_argument('--split', action='store_true', default=os.getenv('SPLIT_SERVING') == '1',
+                        help='serve HTTP with gunicorn on --port and WebSockets on --ws-port')
+    parser.add_argument('--ws-port', type=int, default=int(os.getenv('WS_PORT', '8081')))
+    parser.add_argument('--http-app', default='memory_game.wsgi:application')
+    parser.add_argument('--reuse-port', action='store_true', default=os.getenv('WEB_REUSE_PORT') == '1',
+                        help='one SO_REUSEPORT socket per worker instead of a shared one')
+    parser.add_argument('--backlog', type=int, default=2048)
+    parser.add_argument('--metrics-port', type=int, default=int(os.getenv('METRICS_PORT', '9100')),
+                        help='merged per-worker /metrics (0 to disable)')
+    parser.add_argument('--worker-port-base', type=int, default=9200,
+                        help='first private loopback port used by workers')
+    parser.add_argument('--graceful-timeout', type=float, default=30.0,
+                        help='seconds a worker gets to finish after SIGTERM')
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    return args
+
+
+def main(argv=None):
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'), format='%(asctime)s %(levelname)s %(message)s')
+    args = parse_args(argv)
+    check_shared_backends(args.workers, args.split)
+    return Launcher(args).run()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
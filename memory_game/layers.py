@@ -0,0 +1,37 @@
+"""
+Channel-layer configuration.
+
+``settings.CHANNEL_LAYER`` picks the layer behind ``group_send``:
+
+- ``redis``: ``channels_redis.core.RedisChannelLayer``. group_send runs a
+  Lua script that pushes the message onto one Redis list per member, so its
+  cost grows with room size, but messages wait in Redis (up to ``expiry``)
+  if a consumer is briefly slow.
+- ``pubsub``: ``channels_redis.pubsub.RedisPubSubChannelLayer``. group_send
+  is a single PUBLISH whatever the room size; delivery is at-most-once and
+  the layer has no capacity, expiry or group_expiry.
+- ``memory``: ``channels.layers.InMemoryChannelLayer``, for single-pod mode.
+
+Kept free of Django imports so settings.py can use it.
+"""
+
+CHANNEL_LAYER_BACKENDS = {
+    'redis': 'channels_redis.core.RedisChannelLayer',
+    'pubsub': 'channels_redis.pubsub.RedisPubSubChannelLayer',
+    'memory': 'channels.layers.InMemoryChannelLayer',
+}
+
+
+def channel_layer_config(kind, host='localhost', port=6379, db=0, prefix='asgi',
+                         capacity=100, expiry=60, group_expiry=86400):
+    """Build a CHANNEL_LAYERS entry for one of CHANNEL_LAYER_BACKENDS"""
+    if kind not in CHANNEL_LAYER_BACKENDS:
+        raise ValueError(f'Unknown channel layer {kind!r}; expected one of {", ".join(CHANNEL_LAYER_BACKENDS)}')
+    limits = {'capacity': capacity, 'expiry': expiry, 'group_expiry': group_expiry}
+    if kind == 'memory':
+        config = limits
+    elif kind == 'pubsub':
+        config = {'hosts': [f'redis://{host}:{port}/{db}'], 'prefix': prefix}
+    else:
+        config = dict(limits, hosts=[f'redis://{host}:{port}/{db}'], prefix=prefix)
+    return {'BACKEND': CHANNEL_LAYER_BACKENDS[kind], 'CONFIG': config}
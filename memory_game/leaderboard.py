@@ -0,0 +1,139 @@
+"""
+Cross-game leaderboard.
+
+Every match is worth a point and winning a game LEADERBOARD_WIN_BONUS more,
+added in the background as they happen to a daily, a weekly and an all-time
+board (Redis sorted sets with the redis backend; dated boards expire). The
+lobby reads the top of each board through a per-process MicroCache, so
+however many lobbies are open a board is read at most once per
+LEADERBOARD_TTL; a player's rank comes from that cached top when they're in
+it, and from one ZREVRANK otherwise, itself cached per player for the same
+TTL. Only players with a verified token (``identity``) are credited, so
+throwaway channel-name ids never reach the boards. Nothing here scans game
+state.
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from . import metrics
+from .backends import get_backend
+from .microcache import MicroCache
+
+logger = logging.getLogger(__name__)
+
+WINDOWS = ('day', 'week', 'all')
+DAY = 24 * 3600
+
+UPDATE_FAILURES = metrics.Counter(
+    'memory_game_leaderboard_update_failures_total',
+    'Leaderboard updates that failed and were dropped.',
+)
+
+
+def board(window, now=None):
+    """(key, ttl) of the board for `window` covering `now`"""
+    now = datetime.now(timezone.utc) if now is None else now
+    if window == 'day':
+        return f'leaderboard:day:{now:%Y-%m-%d}', 2 * DAY
+    if window == 'week':
+        year, week, _ = now.isocalendar()
+        return f'leaderboard:week:{year}-W{week:02d}', 8 * DAY
+    if window == 'all':
+        return 'leaderboard:all', None
+    raise ValueError(f'unknown leaderboard window: {window}')
+
+
+async def add_points(player, name, points):
+    """Credit `player` on every window; failures are logged, never raised into a game"""
+    now = datetime.now(timezone.utc)
+    try:
+        await get_backend().leaderboard_add([board(window, now) for window in WINDOWS], player, points, name)
+    except Exception as e:
+        UPDATE_FAILURES.inc()
+        logger.warning("leaderboard.update_failed player=%s error=%s", player, e)
+
+
+# Updates run beside the game rather than in front of its next broadcast
+_updates = set()
+
+
+def _spawn(coro):
+    task = asyncio.get_running_loop().create_task(coro)
+    _updates.add(task)
+    task.add_done_callback(_updates.discard)
+
+
+def record_match(game, player):
+    """Credit a match to an identified player; never raises into the game"""
+    try:
+        info = game['players'][player]
+        # Sockets without a player token play under throwaway channel names
+        if info.get('identified'):
+            _spawn(add_points(player, info['name'], 1))
+    except Exception:
+        UPDATE_FAILURES.inc()
+        logger.exception("leaderboard.record_failed player=%s", player)
+
+
+def record_finish(game):
+    """Give the win bonus to the identified top scorers of a finished game; never raises into the game"""
+    if not settings.LEADERBOARD_WIN_BONUS or not game['players']:
+        return
+    try:
+        best = max(p['score'] for p in game['players'].values())
+        for player, info in game['players'].items():
+            if info['score'] == best and info.get('identified'):
+                _spawn(add_points(player, info['name'], settings.LEADERBOARD_WIN_BONUS))
+    except Exception:
+        UPDATE_FAILURES.inc()
+        logger.exception("leaderboard.record_failed during=finish")
+
+
+caches = {window: MicroCache(f'leaderboard_{window}', settings.LEADERBOARD_TTL) for window in WINDOWS}
+# (window, player) -> MicroCache of that player's rank; every lobby poll asks
+RANK_CACHE_SIZE = 10000
+rank_caches = {}
+
+
+@receiver(setting_changed)
+def reset_caches(setting, **kwargs):
+    if setting in ('LEADERBOARD_TTL', 'LEADERBOARD_SIZE', 'GAME_STATE_BACKEND', 'REDIS_HOST', 'REDIS_PORT', 'REDIS_DB'):
+        for cache in caches.values():
+            cache.ttl = settings.LEADERBOARD_TTL
+            cache.clear()
+        rank_caches.clear()
+
+
+async def top(window, count):
+    """The best `count` (at most LEADERBOARD_SIZE) as dicts, at most LEADERBOARD_TTL old"""
+    async def load():
+        entries = await get_backend().leaderboard_top(board(window)[0], settings.LEADERBOARD_SIZE)
+        return [
+            {'rank': rank + 1, 'player': player, 'name': name, 'score': score}
+            for rank, (player, name, score) in enumerate(entries)
+        ]
+
+    return (await caches[window].get(load))[:count]
+
+
+async def rank(window, player):
+    """{'rank', 'score'} for `player` (1-based), or None if they haven't scored; at most LEADERBOARD_TTL old"""
+    cache = rank_caches.get((window, player))
+    if cache is None:
+        if len(rank_caches) >= RANK_CACHE_SIZE:
+            rank_caches.clear()
+        cache = rank_caches[window, player] = MicroCache('leaderboard_rank', settings.LEADERBOARD_TTL)
+    return await cache.get(lambda: _rank(window, player))
+
+
+async def _rank(window, player):
+    for entry in await top(window, settings.LEADERBOARD_SIZE):
+        if entry['player'] == player:
+            return {'rank': entry['rank'], 'score': entry['score']}
+    found = await get_backend().leaderboard_rank(board(window)[0], player)
+    if found is None:
+        return None
+    return {'rank': found[0] + 1, 'score': found[1]}
@@ -0,0 +1,119 @@
+"""
+Structured, sampled, non-blocking logging.
+
+Hot-path log calls use %-style templates whose first word is the event
+name and whose ``key=%s`` pairs become structured fields::
+
+    logger.info("ws.accept room=%s channel=%s", room, channel)
+
+Nothing is formatted in the calling thread: ``QueueHandler`` enqueues the
+raw record on a bounded queue (dropping when full rather than blocking
+the event loop) and a listener thread formats and writes it.
+``SamplingFilter`` keeps a configured fraction of each event and caps
+every event at a per-second rate; warnings and errors are never sampled.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import time
+from . import metrics
+
+LOG_DROPPED = metrics.Counter(
+    'memory_game_log_records_dropped_total',
+    'Log records dropped before being written, by reason.',
+    ['reason'],
+)
+DROPPED_SAMPLED = LOG_DROPPED.labels('sampled')
+DROPPED_RATE_LIMITED = LOG_DROPPED.labels('rate_limited')
+DROPPED_QUEUE_FULL = LOG_DROPPED.labels('queue_full')
+
+FIELD_RE = re.compile(r'(\w+)=%[-#0 +]*\d*(?:\.\d+)?[sdrfi]')
+
+
+def parse_rates(value):
+    """Parse 'event=rate,event=rate' into a dict of floats."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        event, _, rate = item.partition('=')
+        rates[event.strip()] = float(rate)
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, rates=None, rate_limit=0):
+        super().__init__()
+        self.rates = parse_rates(rates) if isinstance(rates, str) else dict(rates or {})
+        self.rate_limit = rate_limit
+        self._events = {}  # msg template -> event name
+        self._buckets = {}  # event name -> [tokens, last refill]
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        event = self._events.get(record.msg)
+        if event is None:
+            event = self._events[record.msg] = str(record.msg).split(' ', 1)[0]
+        rate = self.rates.get(event)
+        if rate is not None and random.random() >= rate:
+            DROPPED_SAMPLED.inc()
+            return False
+        if self.rate_limit:
+            now = time.monotonic()
+            bucket = self._buckets.get(event)
+            if bucket is None:
+                bucket = self._buckets[event] = [self.rate_limit, now]
+            bucket[0] = min(self.rate_limit, bucket[0] + (now - bucket[1]) * self.rate_limit)
+            bucket[1] = now
+            if bucket[0] < 1:
+                DROPPED_RATE_LIMITED.inc()
+                return False
+            bucket[0] -= 1
+        return True
+
+
+class StructuredFormatter(logging.Formatter):
+    """Render records as one JSON object per line."""
+
+    def format(self, record):
+        template = str(record.msg)
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': template.split(' ', 1)[0],
+            'message': record.getMessage(),
+        }
+        if isinstance(record.args, tuple):
+            entry.update(zip(FIELD_RE.findall(template), map(str, record.args)))
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """Enqueue unformatted records; a listener thread does the I/O."""
+
+    def __init__(self, maxsize=10000, fmt='json'):
+        super().__init__(queue.Queue(maxsize))
+        target = logging.StreamHandler()
+        if fmt == 'json':
+            target.setFormatter(StructuredFormatter())
+        else:
+            target.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s %(message)s'))
+        self.listener = logging.handlers.QueueListener(self.queue, target)
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+    def prepare(self, record):
+        # Skip the base class's eager self.format(); the listener formats
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DROPPED_QUEUE_FULL.inc()
@@ -0,0 +1,132 @@
+"""
+Event-loop lag monitor.
+
+A sampler task sleeps for ``interval`` seconds and records how late it
+wakes up; that scheduling delay is exported as a histogram. A watchdog
+thread checks the sampler's heartbeat and, when the loop has not ticked
+for longer than ``threshold``, captures the stack of the loop thread (the
+frame that is blocking it) into a ring buffer and logs it once per stall.
+
+The monitor is started lazily by the ASGI entry point and can be toggled
+at runtime with SIGUSR2 or ``monitor.enable()`` / ``monitor.disable()``.
+"""
+import asyncio
+import logging
+import signal
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from django.conf import settings
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG = metrics.Histogram(
+    'memory_game_event_loop_lag_seconds',
+    'Scheduling delay of a periodic event-loop callback.',
+)
+LOOP_STALLS = metrics.Counter(
+    'memory_game_event_loop_stalls_total',
+    'Times the event loop was blocked for longer than the stall threshold.',
+)
+
+
+class LoopLagMonitor:
+    def __init__(self, interval=0.25, threshold=0.1, buffer_size=50, enabled=True):
+        self.interval = interval
+        self.threshold = threshold
+        self.enabled = enabled
+        self.stalls = deque(maxlen=buffer_size)
+        self.last_lag = 0.0
+        self._loop = None
+        self._task = None
+        self._watchdog = None
+        self._stop = threading.Event()
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id = None
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def ensure_running(self):
+        """Start on the current loop if enabled and not already running."""
+        if not self.enabled or (self.running and self._loop is asyncio.get_running_loop()):
+            return
+        self.start()
+
+    def start(self):
+        self.stop()
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop = threading.Event()
+        self._task = self._loop.create_task(self._sample())
+        self._watchdog = threading.Thread(
+            target=self._watch, args=(self._stop,), name='loop-lag-watchdog', daemon=True
+        )
+        self._watchdog.start()
+        self._install_signal_handler()
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def enable(self):
+        self.enabled = True
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.ensure_running)
+
+    def disable(self):
+        self.enabled = False
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.stop)
+
+    def toggle(self):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+        logger.warning("loop.monitor enabled=%s", self.enabled)
+
+    def _install_signal_handler(self):
+        try:
+            self._loop.add_signal_handler(signal.SIGUSR2, self.toggle)
+        except (AttributeError, NotImplementedError, RuntimeError, ValueError):
+            pass  # Not the main thread, or no POSIX signals on this platform
+
+    async def _sample(self):
+        loop = self._loop
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self.last_lag = lag
+            self._heartbeat = time.monotonic()
+            LOOP_LAG.observe(lag)
+
+    def _watch(self, stop):
+        reported = None
+        while not stop.wait(self.threshold / 2):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval
+            if blocked < self.threshold or reported == heartbeat:
+                continue
+            reported = heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = ''.join(traceback.format_stack(frame)) if frame else ''
+            self.stalls.append({'time': time.time(), 'blocked': blocked, 'stack': stack})
+            LOOP_STALLS.inc()
+            logger.warning("loop.stall blocked=%.3f stack=%s", blocked, stack)
+
+
+monitor = LoopLagMonitor(
+    interval=settings.LOOP_LAG_INTERVAL,
+    threshold=settings.LOOP_LAG_THRESHOLD,
+    buffer_size=settings.LOOP_LAG_BUFFER_SIZE,
+    enabled=settings.LOOP_LAG_MONITOR,
+)
@@ -0,0 +1,29 @@
+"""
+Quick join: put a player in the fullest open room of a theme, or a new one.
+
+The pick and the seat it takes are one atomic backend step (``claim_seat``),
+so players quick-joining at once on different pods fill a room together
+instead of each opening their own. The player actually joins when their
+socket connects to the returned room.
+"""
+import secrets
+from django.conf import settings
+from app import THEMES
+from .backends import get_backend
+
+
+def new_room_name():
+    return f'quick-{secrets.token_hex(4)}'
+
+
+def normalize_theme(theme):
+    return theme if theme in THEMES else 'emoji'
+
+
+async def quick_join(theme):
+    """Returns (room, theme, created)"""
+    theme = normalize_theme(theme)
+    room, created = await get_backend().claim_seat(
+        theme, new_room_name(), settings.ROOM_CAPACITY, settings.QUICK_JOIN_CLAIM_TTL,
+    )
+    return room, theme, created
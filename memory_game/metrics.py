@@ -0,0 +1,237 @@
+"""
+Lightweight Prometheus metrics for the game server.
+
+Metrics are module-level singletons rendered in the Prometheus text
+exposition format by the ``/metrics`` view. Label values are bound once
+(``RECEIVE_SECONDS.labels('flip_card')``) and the returned child is kept
+by the caller, so recording an event is a bisect and a couple of adds.
+Updates are not locked: under the GIL a lost increment is possible when
+thread-offloaded views race, which is acceptable for monitoring data.
+"""
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+FANOUT_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+REGISTRY = []
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else repr(value)
+    return str(value)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _CounterChild:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # One slot per bucket plus a final +Inf slot; rendered cumulatively.
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metric:
+    """Base class holding label children and rendering them."""
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        if not self.labelnames:
+            self._default = self._children[()] = self._new_child()
+        REGISTRY.append(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Return the child for these label values, creating it once."""
+        values = tuple(str(v) for v in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}')
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def render(self):
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+        for values, child in list(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values, child):
+        labels = _format_labels(self.labelnames, values)
+        return [f'{self.name}{labels} {_format_value(child.value)}']
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def dec(self, amount=1):
+        self._default.dec(amount)
+
+    def set(self, value):
+        self._default.set(value)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def _render_child(self, values, child):
+        lines = []
+        cumulative = 0
+        bounds = [_format_value(float(b)) for b in self.buckets] + ['+Inf']
+        for bound, count in zip(bounds, child.counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, values, f'le="{bound}"')
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f'{self.name}_sum{labels} {_format_value(child.sum)}')
+        lines.append(f'{self.name}_count{labels} {child.count}')
+        return lines
+
+
+def render():
+    """Render every registered metric in Prometheus text format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def start_http_server(port, addr='127.0.0.1', source=render):
+    """Serve source() on every path from a daemon thread; returns the server."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = source().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((addr, port), Handler)
+    threading.Thread(target=server.serve_forever, name=f'metrics-{port}', daemon=True).start()
+    return server
+
+
+RECEIVE_SECONDS = Histogram(
+    'memory_game_receive_seconds',
+    'Time spent handling an inbound WebSocket frame, by action.',
+    ['action'],
+)
+REDIS_SECONDS = Histogram(
+    'memory_game_redis_seconds',
+    'Latency of Redis calls, by operation.',
+    ['operation'],
+)
+GROUP_SEND_SECONDS = Histogram(
+    'memory_game_group_send_seconds',
+    'Latency of channel layer group_send, by message type.',
+    ['type'],
+)
+GROUP_SEND_FANOUT = Histogram(
+    'memory_game_group_send_fanout',
+    'Number of channels in the room group at broadcast time.',
+    buckets=FANOUT_BUCKETS,
+)
+ACTIVE_CONNECTIONS = Gauge(
+    'memory_game_active_connections',
+    'WebSocket connections open on this process.',
+)
+ACTIVE_ROOMS = Gauge(
+    'memory_game_active_rooms',
+    'Rooms with at least one WebSocket connection on this process.',
+)
+SENT_BYTES = Counter(
+    'memory_game_sent_bytes_total',
+    'Outbound WebSocket payload bytes, by message type.',
+    ['type'],
+)
+SENT_MESSAGES = Counter(
+    'memory_game_sent_messages_total',
+    'Outbound WebSocket messages, by message type.',
+    ['type'],
+)
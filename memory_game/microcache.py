@@ -0,0 +1,59 @@
+"""
+Per-process micro-cache for hot, slightly stale-tolerant reads.
+
+A ``MicroCache`` holds one value for ``ttl`` seconds. When it expires, the
+first caller reloads it and every request arriving meanwhile awaits that same
+load (single flight), so the backend sees at most one read per TTL per
+process, however many clients poll.
+"""
+import asyncio
+import time
+import weakref
+from . import metrics
+
+CACHE_REQUESTS = metrics.Counter(
+    'memory_game_microcache_requests_total',
+    'Micro-cache lookups, by cache and result (hit, miss, shared).',
+    ['cache', 'result'],
+)
+
+
+class MicroCache:
+    def __init__(self, name, ttl):
+        self.name = name
+        self.ttl = ttl
+        self.value = None
+        self.expires = 0.0
+        # One refresh per event loop; under gunicorn each async view has its own
+        self._refreshing = weakref.WeakKeyDictionary()
+        self._hit = CACHE_REQUESTS.labels(name, 'hit')
+        self._miss = CACHE_REQUESTS.labels(name, 'miss')
+        self._shared = CACHE_REQUESTS.labels(name, 'shared')
+
+    def clear(self):
+        self.value = None
+        self.expires = 0.0
+
+    async def get(self, load):
+        """The cached value, calling ``await load()`` if it has expired."""
+        if time.monotonic() < self.expires:
+            self._hit.inc()
+            return self.value
+        loop = asyncio.get_running_loop()
+        task = self._refreshing.get(loop)
+        if task is None:
+            self._miss.inc()
+            task = self._refreshing[loop] = loop.create_task(self._refresh(load, loop))
+        else:
+            self._shared.inc()
+        # Shielded: a client hanging up mustn't cancel the load others await
+        return await asyncio.shield(task)
+
+    async def _refresh(self, load, loop):
+        try:
+            value = await load()
+            self.value = value
+            self.expires = time.monotonic() + self.ttl
+            return value
+        finally:
+            self._refreshing.pop(loop, None)
@@ -0,0 +1,64 @@
+"""
+Pre-rendered lobby and game pages.
+
+The lobby's context is constant and the game page only differs by room name,
+so each template is rendered once per process and reused: the game page is
+rendered around a placeholder and the escaped room name is joined in per
+request. ETag and Last-Modified let browsers and the ingress revalidate with
+a 304 instead of downloading the page again.
+"""
+import hashlib
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.template.loader import get_template
+from django.utils.html import escape
+
+# Contains nothing escape() would change, so it survives autoescaping intact
+ROOM_PLACEHOLDER = 'ROOMNAMEPLACEHOLDER7f3a'
+
+
+class RenderedPage:
+    """A template rendered once, with room_name as the only variable part."""
+
+    def __init__(self, template_name, context):
+        template = get_template(template_name)
+        body = template.render(dict(context, room_name=ROOM_PLACEHOLDER))
+        self.parts = body.split(ROOM_PLACEHOLDER)
+        self.digest = hashlib.sha256(body.encode()).hexdigest()[:16]
+        mtimes = [os.path.getmtime(template.origin.name)]
+        for static_dir in settings.STATICFILES_DIRS:
+            mtimes.extend(path.stat().st_mtime for path in Path(static_dir).rglob('*') if path.is_file())
+        # Whole seconds, as HTTP dates have no fractions
+        self.last_modified = datetime.fromtimestamp(int(max(mtimes)), timezone.utc)
+
+    def render(self, room_name=''):
+        return escape(room_name).join(self.parts)
+
+    def etag(self, room_name=''):
+        if len(self.parts) == 1:
+            return self.digest
+        return f'{self.digest}-{hashlib.sha256(room_name.encode()).hexdigest()[:12]}'
+
+
+_pages = {}
+
+
+def get_page(template_name):
+    """The process's rendering of `template_name`, created on first use."""
+    page = _pages.get(template_name)
+    if page is None:
+        page = _pages[template_name] = RenderedPage(template_name, {
+            'base_path': settings.BASE_PATH + '/',
+            'ws_base_path': settings.BASE_PATH,
+        })
+    return page
+
+
+@receiver(setting_changed)
+def reset_pages(setting, **kwargs):
+    if setting in ('BASE_PATH', 'TEMPLATES', 'STATIC_BUILD_DIR', 'STATICFILES_DIRS'):
+        _pages.clear()
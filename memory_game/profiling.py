@@ -0,0 +1,143 @@
+"""
+Opt-in sampled profiling of HTTP views and WebSocket actions.
+
+Set ``PROFILE_SAMPLE_RATE`` (0..1) to profile that fraction of requests
+and actions with cProfile. Each sample is written to ``PROFILE_DIR`` as a
+``.pstats`` file named after the kind (``http``/``ws``) and view or
+action, e.g. ``ws-flip_card-1700000000123-42.pstats``; open them with
+``python -m pstats`` or snakeviz. ``PROFILE_CLOCK`` picks wall-clock or
+CPU time. Old files are pruned to stay under ``PROFILE_MAX_FILES`` and
+``PROFILE_MAX_BYTES``.
+
+cProfile hooks the whole thread, so a WebSocket sample also records other
+coroutines that run while the sampled action is awaiting. Only one sample
+is taken per thread at a time.
+"""
+import cProfile
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import nullcontext
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CLOCKS = {
+    'wall': time.perf_counter,
+    'cpu': time.process_time,
+}
+
+_NOT_SAMPLED = nullcontext()
+
+
+class _Sample:
+    def __init__(self, profiler, kind, name):
+        self.profiler = profiler
+        self.kind = kind
+        self.name = name
+        self.profile = cProfile.Profile(profiler.timer)
+
+    def __enter__(self):
+        self.profiler._local.active = True
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profile.disable()
+        self.profiler._local.active = False
+        self.profiler.dump(self.profile, self.kind, self.name)
+        return False
+
+
+class Profiler:
+    def __init__(self, sample_rate=0.0, directory='profiles', clock='wall',
+                 max_files=200, max_bytes=50 * 1024 * 1024):
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self.timer = CLOCKS.get(clock, time.perf_counter)
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0
+
+    def profile(self, kind, name):
+        """Context manager profiling the block if this call is sampled."""
+        if (self.sample_rate <= 0 or random.random() >= self.sample_rate
+                or getattr(self._local, 'active', False)):
+            return _NOT_SAMPLED
+        return _Sample(self, kind, name)
+
+    def dump(self, profile, kind, name):
+        filename = f'{kind}-{name}-{int(time.time() * 1000)}-{os.getpid()}.pstats'
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            profile.dump_stats(os.path.join(self.directory, filename))
+            self.rotate()
+        except OSError as e:
+            logger.warning("profile.write_failed file=%s error=%s", filename, e)
+
+    def rotate(self):
+        """Delete the oldest profiles beyond the file-count and size caps."""
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.pstats'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            entries.sort(reverse=True)
+            kept = total = 0
+            for _, size, path in entries:
+                if kept < self.max_files and total + size <= self.max_bytes:
+                    kept += 1
+                    total += size
+                else:
+                    os.remove(path)
+
+
+class ProfilingMiddleware:
+    """Profile a sample of HTTP requests, named after the resolved view."""
+
+    # Async under ASGI so async views aren't pushed onto a thread
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with profiler.profile('http', 'request') as sample:
+            response = self.get_response(request)
+            self.name_sample(sample, request)
+        return response
+
+    async def __acall__(self, request):
+        with profiler.profile('http', 'request') as sample:
+            response = await self.get_response(request)
+            self.name_sample(sample, request)
+        return response
+
+    @staticmethod
+    def name_sample(sample, request):
+        if sample is not None and request.resolver_match is not None:
+            # The view is only known after URL resolution
+            sample.name = request.resolver_match.url_name or 'unnamed'
+
+
+profiler = Profiler(
+    sample_rate=settings.PROFILE_SAMPLE_RATE,
+    directory=settings.PROFILE_DIR,
+    clock=settings.PROFILE_CLOCK,
+    max_files=settings.PROFILE_MAX_FILES,
+    max_bytes=settings.PROFILE_MAX_BYTES,
+)
@@ -0,0 +1,68 @@
+"""
+Inbound rate limits for game sockets.
+
+Each socket has a token bucket (WS_RATE frames a second, bursts of WS_BURST)
+and each room one shared by its sockets on this process (WS_ROOM_RATE,
+WS_ROOM_BURST), so a noisy room can't starve the rest of the pod. What a
+socket over its limit gets is WS_LIMIT_RESPONSE: 'drop' the frame,
+'throttle' (wait up to WS_THROTTLE_MAX_WAIT for a token, holding back the
+socket's later frames meanwhile) or 'disconnect'.
+"""
+import time
+import weakref
+from django.conf import settings
+from . import metrics
+
+RESPONSES = ('drop', 'throttle', 'disconnect')
+CLOSE_POLICY_VIOLATION = 1008
+
+DROPPED_FRAMES = metrics.Counter(
+    'memory_game_ws_dropped_frames_total',
+    'Inbound frames dropped before reaching the state backend, by reason.',
+    ['reason'],
+)
+DROPPED = {
+    reason: DROPPED_FRAMES.labels(reason)
+    for reason in ('too_large', 'bad_json', 'unknown_action', 'invalid_move', 'rate_limited')
+}
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self):
+        """Spend a token if there is one"""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait(self):
+        """Seconds until take() would succeed"""
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+# Held by each socket in the room, so a bucket goes when the room's last one does
+_room_buckets = weakref.WeakValueDictionary()
+
+
+def socket_bucket():
+    return TokenBucket(settings.WS_RATE, settings.WS_BURST)
+
+
+def room_bucket(room):
+    bucket = _room_buckets.get(room)
+    if bucket is None:
+        bucket = _room_buckets[room] = TokenBucket(settings.WS_ROOM_RATE, settings.WS_ROOM_BURST)
+    return bucket
@@ -0,0 +1,286 @@
+"""
+Compact binary game records, for analytics and replay.
+
+A record holds one finished game: room, theme, seed, start and finish
+times, the dealt deck, the players and every flip in order, with the
+flipping player and milliseconds since the start. Card faces are stored
+once each and the deck as one byte per card, so a game comes to a few
+hundred bytes. Each record starts with its format version (``VERSION``),
+and ``decode`` rejects versions it doesn't know.
+
+Record files are ``MAGIC`` followed by records, each prefixed with its
+length, so they can be written and read as a stream (``RecordWriter``,
+``read_records``) or walked lazily through a memory map (``RecordFile``).
+The history database keeps each game's record, and
+
+    python -m memory_game.records export --out exports/
+
+writes the ones finished since the last export into files of at most
+``--max-bytes`` each.
+"""
+import argparse
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+import time
+from pathlib import Path
+
+VERSION = 1
+MAGIC = b'MGRC\x01'
+SUFFIX = '.mgr'
+
+LENGTH = struct.Struct('<I')
+# version, seed (-1 = none), started_at (0 = unknown), finished_at
+FIXED = struct.Struct('<Bqdd')
+STR_LEN = struct.Struct('<H')
+COUNT = struct.Struct('<B')
+SCORE = struct.Struct('<i')
+FLIP_COUNT = struct.Struct('<I')
+# card index, player number, milliseconds since the start
+FLIP = struct.Struct('<BBI')
+
+
+def game_record(room, game, finished_at=None):
+    """The record of a finished game state, as a dict ``encode`` takes"""
+    finished_at = time.time() if finished_at is None else finished_at
+    started_at = game.get('started_at')
+    # Players who flipped keep their numbers; the rest are added after them.
+    # Anyone who left before the end is no longer in `players`, so has no name.
+    ids = list(game.get('flip_players', []))
+    ids.extend(player for player in game['players'] if player not in ids)
+    return {
+        'room': room,
+        'theme': game.get('theme', 'emoji'),
+        'seed': game.get('seed'),
+        'started_at': started_at,
+        'finished_at': finished_at,
+        'deck': list(game['cards']),
+        'players': [
+            {
+                'id': player,
+                'name': game['players'].get(player, {}).get('name', ''),
+                'score': game['players'].get(player, {}).get('score', 0),
+            }
+            for player in ids
+        ],
+        'flips': [(index, player, max(0, ms)) for index, player, ms in game.get('flips', [])],
+    }
+
+
+def _pack_str(parts, text):
+    data = text.encode()
+    parts.append(STR_LEN.pack(len(data)))
+    parts.append(data)
+
+
+def encode(record):
+    """The bytes of one record, without the length prefix"""
+    faces = list(dict.fromkeys(record['deck']))
+    face_index = {face: i for i, face in enumerate(faces)}
+    seed = record['seed']
+    parts = [FIXED.pack(VERSION, -1 if seed is None else seed, record['started_at'] or 0.0, record['finished_at'])]
+    _pack_str(parts, record['room'])
+    _pack_str(parts, record['theme'])
+    parts.append(COUNT.pack(len(faces)))
+    for face in faces:
+        _pack_str(parts, face)
+    parts.append(COUNT.pack(len(record['deck'])))
+    parts.append(bytes(face_index[face] for face in record['deck']))
+    parts.append(COUNT.pack(len(record['players'])))
+    for player in record['players']:
+        _pack_str(parts, player['id'])
+        _pack_str(parts, player['name'])
+        parts.append(SCORE.pack(player['score']))
+    parts.append(FLIP_COUNT.pack(len(record['flips'])))
+    parts.extend(FLIP.pack(index, player, ms) for index, player, ms in record['flips'])
+    return b''.join(parts)
+
+
+def decode(buffer, offset=0):
+    """The record encoded in `buffer` at `offset`; any object struct can unpack from"""
+    version = buffer[offset]
+    if version != VERSION:
+        raise ValueError(f'unsupported game record version {version}')
+    _, seed, started_at, finished_at = FIXED.unpack_from(buffer, offset)
+    offset += FIXED.size
+
+    def unpack(fmt):
+        nonlocal offset
+        values = fmt.unpack_from(buffer, offset)
+        offset += fmt.size
+        return values[0] if len(values) == 1 else values
+
+    def string():
+        nonlocal offset
+        length = unpack(STR_LEN)
+        offset += length
+        return bytes(buffer[offset - length:offset]).decode()
+
+    room = string()
+    theme = string()
+    faces = [string() for _ in range(unpack(COUNT))]
+    size = unpack(COUNT)
+    deck = [faces[i] for i in bytes(buffer[offset:offset + size])]
+    offset += size
+    players = [{'id': string(), 'name': string(), 'score': unpack(SCORE)} for _ in range(unpack(COUNT))]
+    flips = [unpack(FLIP) for _ in range(unpack(FLIP_COUNT))]
+    return {
+        'room': room,
+        'theme': theme,
+        'seed': None if seed == -1 else seed,
+        'started_at': started_at or None,
+        'finished_at': finished_at,
+        'deck': deck,
+        'players': players,
+        'flips': flips,
+    }
+
+
+class RecordWriter:
+    """Writes a record file to an open binary file object"""
+
+    def __init__(self, file):
+        self.file = file
+        self.file.write(MAGIC)
+        self.bytes = len(MAGIC)
+        self.count = 0
+
+    def write(self, record):
+        self.write_encoded(encode(record))
+
+    def write_encoded(self, data):
+        """Append a record that is already encoded, e.g. from the history database"""
+        self.file.write(LENGTH.pack(len(data)))
+        self.file.write(data)
+        self.bytes += LENGTH.size + len(data)
+        self.count += 1
+
+
+def _check_magic(magic):
+    if magic != MAGIC:
+        raise ValueError('not a game record file, or an unsupported file version')
+
+
+def read_records(file):
+    """Decode records one at a time from an open binary file object"""
+    _check_magic(file.read(len(MAGIC)))
+    while True:
+        prefix = file.read(LENGTH.size)
+        if not prefix:
+            return
+        length, = LENGTH.unpack(prefix)
+        data = file.read(length)
+        if len(data) < length:
+            raise ValueError('truncated game record')
+        yield decode(data)
+
+
+class RecordFile:
+    """
+    A record file mapped into memory. Iterating decodes one record at a
+    time straight from the map, so a file far larger than memory can be
+    scanned and only the pages touched are read in.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        _check_magic(self._map[:len(MAGIC)])
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def offsets(self):
+        """(offset, length) of each record, walking only the length prefixes"""
+        offset, end = len(MAGIC), len(self._map)
+        while offset < end:
+            length, = LENGTH.unpack_from(self._map, offset)
+            offset += LENGTH.size
+            if offset + length > end:
+                raise ValueError('truncated game record')
+            yield offset, length
+            offset += length
+
+    def __iter__(self):
+        for offset, _ in self.offsets():
+            yield decode(self._map, offset)
+
+
+def export(db_path, out_dir, after_id=0, max_bytes=64 << 20, prefix='games'):
+    """
+    Write the records of games with ids above `after_id` into files in
+    `out_dir`. A file is started whenever the current one would grow past
+    `max_bytes`, and is named after its first game id. Each file is written
+    under a temporary name and renamed once complete. Returns
+    (files written, records exported, last id exported).
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    files, count, last_id = [], 0, after_id
+    file = writer = None
+
+    def finish():
+        file.close()
+        os.replace(file.name, file.name[:-len('.tmp')])
+
+    try:
+        rows = db.execute('SELECT id, record FROM games WHERE id > ? AND record IS NOT NULL ORDER BY id', (after_id,))
+        for game_id, data in rows:
+            if writer is not None and writer.bytes + LENGTH.size + len(data) > max_bytes:
+                finish()
+                writer = None
+            if writer is None:
+                path = out_dir / f'{prefix}-{game_id:010d}{SUFFIX}'
+                file = open(f'{path}.tmp', 'wb')
+                writer = RecordWriter(file)
+                files.append(path)
+            writer.write_encoded(data)
+            count += 1
+            last_id = game_id
+        if writer is not None:
+            finish()
+    finally:
+        if file is not None and not file.closed:
+            file.close()
+            os.unlink(file.name)
+        db.close()
+    return files, count, last_id
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m memory_game.records', description=__doc__.split('\n\n')[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    out = sub.add_parser('export', help='write finished games from the history database to record files')
+    out.add_argument('--db', default=os.getenv('GAME_HISTORY_DB') or str(Path(__file__).resolve().parent.parent / 'game_history.sqlite3'))
+    out.add_argument('--out', required=True, help='directory for the record files')
+    out.add_argument('--after-id', type=int, default=0,
+                     help='export only games with a greater id; pass the last id of the previous export')
+    out.add_argument('--max-bytes', type=int, default=64 << 20, help='size at which to start a new file')
+    dump = sub.add_parser('dump', help='print the records in record files as JSON lines')
+    dump.add_argument('files', nargs='+')
+    args = parser.parse_args(argv)
+    if args.command == 'export':
+        files, count, last_id = export(args.db, args.out, args.after_id, args.max_bytes)
+        for path in files:
+            print(path)
+        print(f'exported {count} games, last id {last_id}', file=sys.stderr)
+    else:
+        for path in args.files:
+            with RecordFile(path) as records:
+                for record in records:
+                    print(json.dumps(record, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
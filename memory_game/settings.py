@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from .layers import channel_layer_config
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -19,6 +20,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'memory_game.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'memory_game.urls'
@@ -27,12 +29,18 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
             ],
+            # Compile each template once per process
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -40,19 +48,150 @@ TEMPLATES = [
 WSGI_APPLICATION = 'memory_game.wsgi.application'
 ASGI_APPLICATION = 'memory_game.asgi.application'
 
+# Split serving: gunicorn (WSGI) serves pages, static files and /api/*, the
+# ASGI app only WebSockets plus the HTTP paths below. See memory_game/launcher.py.
+SPLIT_SERVING = os.getenv('SPLIT_SERVING', '0') == '1'
+ASGI_HTTP_PATHS = ['/metrics', '/healthz', '/readyz']
+
+REDIS_HOST = os.getenv('REDIS_HOST', 'redis')
+REDIS_PORT = int(os.getenv('REDIS_PORT', '6379'))
+REDIS_DB = int(os.getenv('REDIS_DB', '0'))
+
+# Concurrent state-backend reads by the async /api/* views per event loop;
+# requests beyond this wait for a slot
+API_CONCURRENCY = int(os.getenv('API_CONCURRENCY', '32'))
+# Seconds each process reuses the /api/rooms listing; requests arriving while
+# it's refreshed share the one backend read
+ROOM_LIST_TTL = float(os.getenv('ROOM_LIST_TTL', '1'))
+# /api/decks: decks per response when ?count= is omitted, and the most allowed
+DECK_BATCH_DEFAULT = int(os.getenv('DECK_BATCH_DEFAULT', '5'))
+DECK_BATCH_MAX = int(os.getenv('DECK_BATCH_MAX', '20'))
+# Players a room holds; more are turned away and quick join skips it
+ROOM_CAPACITY = int(os.getenv('ROOM_CAPACITY', '4'))
+# Seconds a room opened by quick join stays joinable before anyone connects
+QUICK_JOIN_CLAIM_TTL = float(os.getenv('QUICK_JOIN_CLAIM_TTL', '30'))
+# Admission control (memory_game/admission.py): sockets per pod (each of the
+# WEB_WORKERS processes admits its share), spectators per room, and the loop
+# lag (seconds) and channel-layer backlog (buffered messages) past which new
+# sockets and new games are refused; rejected clients are told to retry after
+# ADMISSION_RETRY_AFTER seconds
+MAX_CONNECTIONS = int(os.getenv('MAX_CONNECTIONS', '5000'))
+MAX_SPECTATORS = int(os.getenv('MAX_SPECTATORS', '50'))
+ADMISSION_MAX_LOOP_LAG = float(os.getenv('ADMISSION_MAX_LOOP_LAG', '0.25'))
+ADMISSION_MAX_QUEUE_DEPTH = int(os.getenv('ADMISSION_MAX_QUEUE_DEPTH', '1000'))
+ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', '5'))
+# Worker processes serving sockets in the pod; memory_game/launcher.py sets it
+# from --workers
+WEB_WORKERS = int(os.getenv('WEB_WORKERS', '1'))
+# Inbound frames (memory_game/ratelimit.py): largest accepted frame in bytes,
+# token buckets per socket and per room (frames a second and burst), and what
+# happens past them: 'drop', 'throttle' (wait up to WS_THROTTLE_MAX_WAIT
+# seconds for a token) or 'disconnect'
+WS_MAX_MESSAGE_BYTES = int(os.getenv('WS_MAX_MESSAGE_BYTES', '1024'))
+WS_RATE = float(os.getenv('WS_RATE', '10'))
+WS_BURST = int(os.getenv('WS_BURST', '20'))
+WS_ROOM_RATE = float(os.getenv('WS_ROOM_RATE', '50'))
+WS_ROOM_BURST = int(os.getenv('WS_ROOM_BURST', '100'))
+WS_LIMIT_RESPONSE = os.getenv('WS_LIMIT_RESPONSE', 'drop')
+WS_THROTTLE_MAX_WAIT = float(os.getenv('WS_THROTTLE_MAX_WAIT', '1'))
+# Seconds a player has per turn before it passes on (0 = no limit), and the
+# resolution of the per-process timer wheel enforcing it
+TURN_TIME_LIMIT = float(os.getenv('TURN_TIME_LIMIT', '30'))
+TURN_TIMER_TICK = float(os.getenv('TURN_TIMER_TICK', '0.25'))
+# Leaderboard (memory_game/leaderboard.py): bonus points for winning a game
+# (a match is 1), players cached per board, and seconds the cache is reused
+LEADERBOARD_WIN_BONUS = int(os.getenv('LEADERBOARD_WIN_BONUS', '3'))
+LEADERBOARD_SIZE = int(os.getenv('LEADERBOARD_SIZE', '100'))
+LEADERBOARD_TTL = float(os.getenv('LEADERBOARD_TTL', '5'))
+# Player tokens (memory_game/identity.py): the cookie holding them and the
+# seconds one stays valid; each page load renews it
+PLAYER_COOKIE = os.getenv('PLAYER_COOKIE', 'player')
+PLAYER_TOKEN_MAX_AGE = int(os.getenv('PLAYER_TOKEN_MAX_AGE', str(30 * 24 * 3600)))
+
+# Where room state lives: 'redis' (shared across pods) or 'memory' (this process only)
+GAME_STATE_BACKEND = os.getenv('GAME_STATE_BACKEND', 'redis')
+
+# Channel layer: 'redis' (per-member Redis lists), 'pubsub' (one PUBLISH per
+# group_send) or 'memory' (single pod). See memory_game/layers.py.
+CHANNEL_LAYER = os.getenv('CHANNEL_LAYER', 'redis')
+# Messages per channel before ChannelFull; a 500-seat room broadcasting ~4
+# messages per action needs headroom over the default 100 for slow sockets
+CHANNEL_CAPACITY = int(os.getenv('CHANNEL_CAPACITY', '200'))
+# Game updates older than a few seconds are superseded; don't keep them 60s
+CHANNEL_EXPIRY = int(os.getenv('CHANNEL_EXPIRY', '10'))
+# Drop group members of crashed pods after 2h rather than a day; must exceed
+# the longest expected WebSocket session
+CHANNEL_GROUP_EXPIRY = int(os.getenv('CHANNEL_GROUP_EXPIRY', '7200'))
+
 CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels_redis.core.RedisChannelLayer',
-        'CONFIG': {
-            'hosts': [('redis', 6379)],
+    'default': channel_layer_config(
+        CHANNEL_LAYER, REDIS_HOST, REDIS_PORT,
+        capacity=CHANNEL_CAPACITY,
+        expiry=CHANNEL_EXPIRY,
+        group_expiry=CHANNEL_GROUP_EXPIRY,
+    ),
+}
+
+# Event-loop lag monitor; toggle at runtime by sending SIGUSR2 to the process
+LOOP_LAG_MONITOR = os.getenv('LOOP_LAG_MONITOR', '1') == '1'
+LOOP_LAG_INTERVAL = float(os.getenv('LOOP_LAG_INTERVAL', '0.25'))
+LOOP_LAG_THRESHOLD = float(os.getenv('LOOP_LAG_THRESHOLD', '0.1'))
+LOOP_LAG_BUFFER_SIZE = int(os.getenv('LOOP_LAG_BUFFER_SIZE', '50'))
+
+# /readyz: checks are rerun at most once per READY_CACHE_SECONDS; Redis ping
+# and channel-layer round trip time out after READY_TIMEOUT; the pod is taken
+# out of rotation while event-loop lag exceeds READY_MAX_LOOP_LAG
+READY_CACHE_SECONDS = float(os.getenv('READY_CACHE_SECONDS', '2'))
+READY_TIMEOUT = float(os.getenv('READY_TIMEOUT', '1'))
+READY_MAX_LOOP_LAG = float(os.getenv('READY_MAX_LOOP_LAG', '0.5'))
+
+# Sampled cProfile of views and WebSocket actions; 0 disables
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_DIR = os.getenv('PROFILE_DIR', '/tmp/memory-game-profiles')
+PROFILE_CLOCK = os.getenv('PROFILE_CLOCK', 'wall')  # 'wall' or 'cpu'
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', '200'))
+PROFILE_MAX_BYTES = int(os.getenv('PROFILE_MAX_BYTES', str(50 * 1024 * 1024)))
+
+# Logging: records are queued and written by a background thread. LOG_SAMPLING
+# keeps a fraction of chatty events ("ws.accept=0.1,ws.disconnect=0.1") and
+# LOG_RATE_LIMIT caps each event at that many records per second (0 = no cap).
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'sampling': {
+            '()': 'memory_game.logs.SamplingFilter',
+            'rates': os.getenv('LOG_SAMPLING', ''),
+            'rate_limit': float(os.getenv('LOG_RATE_LIMIT', '50')),
         },
     },
+    'handlers': {
+        'queue': {
+            '()': 'memory_game.logs.QueueHandler',
+            'maxsize': int(os.getenv('LOG_QUEUE_SIZE', '10000')),
+            'fmt': os.getenv('LOG_FORMAT', 'json'),
+            'filters': ['sampling'],
+        },
+    },
+    'root': {
+        'handlers': ['queue'],
+        'level': os.getenv('LOG_LEVEL', 'INFO'),
+    },
 }
 
+# Finished games are written here in the background (memory_game/history.py);
+# empty to keep no history. Also Django's database, so `manage.py dbshell` opens it
+GAME_HISTORY_DB = os.getenv('GAME_HISTORY_DB', str(BASE_DIR / 'game_history.sqlite3'))
+# Rows per transaction, seconds the writer waits to fill a batch, and rows
+# queued before new ones are dropped
+HISTORY_BATCH_SIZE = int(os.getenv('HISTORY_BATCH_SIZE', '100'))
+HISTORY_FLUSH_INTERVAL = float(os.getenv('HISTORY_FLUSH_INTERVAL', '1'))
+HISTORY_QUEUE_SIZE = int(os.getenv('HISTORY_QUEUE_SIZE', '10000'))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': ':memory:',
+        'NAME': GAME_HISTORY_DB or ':memory:',
     }
 }
 
@@ -63,7 +202,15 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+# Output of `python -m memory_game.assets build`; see memory_game/assets.py
+STATIC_BUILD_DIR = os.getenv('STATIC_BUILD_DIR', str(BASE_DIR / 'static_build'))
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 FORCE_SCRIPT_NAME = os.getenv('FORCE_SCRIPT_NAME', '')
+# Public prefix the ingress mounts the app under, for <base href> and asset
+# URLs. FORCE_SCRIPT_NAME is also Django's script prefix, so it wins when set.
+BASE_PATH = (FORCE_SCRIPT_NAME or os.getenv('BASE_PATH', '/copilot/memory-game')).rstrip('/')
+# Seconds browsers and the ingress may reuse the lobby/game pages before
+# revalidating them with ETag / Last-Modified; see memory_game/pages.py
+PAGE_MAX_AGE = int(os.getenv('PAGE_MAX_AGE', '60'))
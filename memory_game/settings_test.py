@@ -0,0 +1,22 @@
+"""
+Settings for the test suite: room state and channel layer stay in-process,
+so no Redis is needed.
+"""
+from .layers import channel_layer_config
+from .settings import *  # noqa: F401,F403
+
+GAME_STATE_BACKEND = 'memory'
+
+CHANNEL_LAYER = 'memory'
+CHANNEL_LAYERS = {
+    'default': channel_layer_config('memory'),
+}
+
+LOOP_LAG_MONITOR = False
+
+# Tests that need game history point this at a temporary file
+GAME_HISTORY_DB = ''
+
+# Tests change rooms between requests and expect to see it at once
+ROOM_LIST_TTL = 0
+LEADERBOARD_TTL = 0
@@ -0,0 +1,10 @@
+from django import template
+from ..assets import asset_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def asset(name):
+    """Fingerprinted URL of a static file: {% asset 'style.css' %}"""
+    return asset_url(name)
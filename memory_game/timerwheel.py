@@ -0,0 +1,146 @@
+"""
+Hierarchical timer wheel.
+
+Timers are kept in ``levels`` wheels of ``slots`` buckets each; level L
+buckets span ``slots ** L`` ticks. A timer goes into the lowest level whose
+range covers it, and as time reaches a higher-level bucket its timers are
+cascaded down. Scheduling, cancelling and rescheduling are O(1) (a dict
+insert or delete per bucket), and each tick only touches the buckets due,
+so one wheel per process can hold hundreds of thousands of pending timers
+driven by a single task.
+"""
+import asyncio
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Timer:
+    __slots__ = ('expires', 'callback', 'slot')
+
+    def __init__(self, expires, callback):
+        self.expires = expires  # in ticks
+        self.callback = callback
+        self.slot = None  # the bucket holding it, None once fired or cancelled
+
+    @property
+    def pending(self):
+        return self.slot is not None
+
+
+class TimerWheel:
+    def __init__(self, tick=0.1, slots=64, levels=4, clock=time.monotonic):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.clock = clock
+        self.wheels = [[{} for _ in range(slots)] for _ in range(levels)]
+        self.now = int(clock() / tick)
+        self.pending = 0
+        self._loop = None
+        self._task = None
+
+    @property
+    def horizon(self):
+        """Furthest a timer can be set, in ticks; later ones are clamped"""
+        return self.slots ** self.levels - 1
+
+    def _insert(self, timer):
+        remaining = timer.expires - self.now
+        level, span = 0, 1
+        while level < self.levels - 1 and remaining >= span * self.slots:
+            level += 1
+            span *= self.slots
+        slot = self.wheels[level][(timer.expires // span) % self.slots]
+        slot[timer] = None
+        timer.slot = slot
+
+    def _ticks(self, delay):
+        return min(self.horizon, max(1, math.ceil(delay / self.tick)))
+
+    def schedule(self, delay, callback):
+        """Call `callback()` after `delay` seconds (rounded up to a tick)"""
+        self._catch_up()
+        timer = Timer(self.now + self._ticks(delay), callback)
+        self._insert(timer)
+        self.pending += 1
+        self.ensure_running()
+        return timer
+
+    def cancel(self, timer):
+        if timer.slot is not None:
+            del timer.slot[timer]
+            timer.slot = None
+            self.pending -= 1
+
+    def reschedule(self, timer, delay):
+        """Move a pending timer, or re-arm a fired or cancelled one"""
+        if timer.slot is not None:
+            del timer.slot[timer]
+        else:
+            self._catch_up()
+            self.pending += 1
+        timer.expires = self.now + self._ticks(delay)
+        self._insert(timer)
+        self.ensure_running()
+
+    def _catch_up(self):
+        # An empty wheel may not have been advanced lately; nothing can be due
+        if not self.pending:
+            self.now = max(self.now, int(self.clock() / self.tick))
+
+    def advance(self, now=None):
+        """Run every timer due by `now` (seconds on the wheel's clock)"""
+        target = int((self.clock() if now is None else now) / self.tick)
+        if not self.pending:
+            self.now = max(self.now, target)
+            return
+        while self.now < target and self.pending:
+            self.now += 1
+            self._cascade()
+            slot = self.wheels[0][self.now % self.slots]
+            if slot:
+                self._fire(slot)
+        self.now = max(self.now, target)
+
+    def _cascade(self):
+        # Top level first, so timers moving down can land in a bucket due now
+        for level in range(self.levels - 1, 0, -1):
+            span = self.slots ** level
+            if self.now % span:
+                continue
+            bucket = self.wheels[level][(self.now // span) % self.slots]
+            if bucket:
+                timers = list(bucket)
+                bucket.clear()
+                for timer in timers:
+                    self._insert(timer)
+
+    def _fire(self, slot):
+        timers = list(slot)
+        slot.clear()
+        self.pending -= len(timers)
+        for timer in timers:
+            timer.slot = None
+            try:
+                timer.callback()
+            except Exception:
+                logger.exception("timer.callback_failed")
+
+    def ensure_running(self):
+        """Drive the wheel from a task on the current loop, if there is one"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            self.advance()
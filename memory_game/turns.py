@@ -0,0 +1,88 @@
+"""
+Server-side turn time limits.
+
+A started game carries ``turn_deadline`` (epoch seconds), restarted whenever
+the turn changes hands or the player scores, and cleared once every pair is
+matched. Each process keeps one timer per room it has sockets in, on the
+process's timer wheel rather than a task per room, and moves it whenever it
+sees a new deadline. When one runs out the turn passes to the next player.
+Every pod with sockets in the room may fire, but the expiry only applies
+while the state still holds the deadline it was set for, so one
+compare-and-set wins and the rest are no-ops. Deadlines are wall-clock
+times, so pods need synchronised clocks; a timer that comes due before its
+deadline (the wheel runs on the monotonic clock) is re-armed for the rest.
+"""
+import asyncio
+import time
+from django.conf import settings
+from . import metrics
+from .timerwheel import TimerWheel
+
+TURN_TIMEOUTS = metrics.Counter(
+    'memory_game_turn_timeouts_total',
+    'Turns passed on because the player ran out of time.',
+)
+
+wheel = TimerWheel(tick=settings.TURN_TIMER_TICK)
+
+
+def start_turn(game):
+    """Restart the turn clock; none before the start, after the end, or when disabled"""
+    limit = settings.TURN_TIME_LIMIT
+    running = limit > 0 and game.get('started') and len(game['matched']) < len(game['cards'])
+    game['turn_deadline'] = time.time() + limit if running else None
+
+
+def pass_turn(game):
+    """Give the turn to the next player and restart the clock"""
+    player_ids = list(game['players'])
+    if game['current_player'] in player_ids:
+        current_idx = player_ids.index(game['current_player'])
+        game['current_player'] = player_ids[(current_idx + 1) % len(player_ids)]
+    game['flipped'] = []
+    start_turn(game)
+
+
+class RoomTimers:
+    """This process's turn timer per room; `expire(room, deadline)` runs when one is due"""
+
+    def __init__(self, wheel, expire):
+        self.wheel = wheel
+        self.expire = expire
+        self.timers = {}  # room -> [deadline, Timer]
+        self._tasks = set()
+
+    def watch(self, room, game):
+        """Arm, move or cancel the room's timer to match `game` (None for a gone room)"""
+        deadline = game.get('turn_deadline') if game else None
+        entry = self.timers.get(room)
+        if entry is not None and entry[0] == deadline:
+            return
+        if deadline is None:
+            self.forget(room)
+            return
+        self.arm(room, deadline)
+
+    def arm(self, room, deadline):
+        """Set the room's timer for `deadline`, moving any it already has"""
+        delay = deadline - time.time()
+        entry = self.timers.get(room)
+        if entry is None:
+            self.timers[room] = [deadline, self.wheel.schedule(delay, lambda: self._fire(room))]
+        else:
+            entry[0] = deadline
+            self.wheel.reschedule(entry[1], delay)
+
+    def forget(self, room):
+        entry = self.timers.pop(room, None)
+        if entry is not None:
+            self.wheel.cancel(entry[1])
+
+    def _fire(self, room):
+        deadline, _ = self.timers.pop(room)
+        if time.time() < deadline:
+            self.arm(room, deadline)
+            return
+        task = asyncio.get_running_loop().create_task(self.expire(room, deadline))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
@@ -1,12 +1,18 @@
 from django.urls import path, re_path
-from django.conf import settings
-from django.views.static import serve
 from . import views
+from .assets import URL_PREFIX
 
 urlpatterns = [
     path('', views.lobby, name='lobby'),
     path('game/<str:room_name>/', views.game_room, name='game_room'),
     path('api/rooms', views.list_rooms, name='list_rooms'),
     path('api/new-game', views.new_game, name='new_game'),
-    re_path(r'^static/(?P<path>.*)$', serve, {'document_root': settings.STATICFILES_DIRS[0]}),
+    path('api/decks', views.decks, name='decks'),
+    path('api/quick-join', views.quick_join, name='quick_join'),
+    path('api/leaderboard', views.leaderboard, name='leaderboard'),
+    path('api/player', views.player, name='player'),
+    path('metrics', views.metrics_view, name='metrics'),
+    path('healthz', views.healthz, name='healthz'),
+    path('readyz', views.readyz, name='readyz'),
+    re_path(rf'^{URL_PREFIX}(?P<path>.*)$', views.static_asset, name='static_asset'),
 ]
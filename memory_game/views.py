@@ -1,54 +1,215 @@
-from django.shortcuts import render
-from django.http import JsonResponse
-from app import get_cards
-import redis
+import asyncio
+import hashlib
 import json
+import weakref
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import condition
+from time import perf_counter
+from app import THEMES, deal_decks, get_cards, theme_items
+from . import identity, metrics
+from .apiloop import on_api_loop
+from .assets import get_store
+from .backends import count_connected, get_backend
+from .health import REMOTE_THEMES, readiness
+from .leaderboard import WINDOWS as LEADERBOARD_WINDOWS, rank as leaderboard_rank, top as leaderboard_top
+from .matchmaking import quick_join as claim_quick_join
+from .microcache import MicroCache
+from .pages import get_page
 
+LIST_ROOMS_TIME = metrics.REDIS_SECONDS.labels('list_rooms')
+
+# asyncio.Semaphore binds to one loop; gunicorn runs each async view on its own
+_api_slots = weakref.WeakKeyDictionary()
+
+
+def api_slot():
+    """Semaphore capping concurrent backend reads by /api/* on this loop"""
+    loop = asyncio.get_running_loop()
+    slot = _api_slots.get(loop)
+    if slot is None:
+        slot = _api_slots[loop] = asyncio.Semaphore(settings.API_CONCURRENCY)
+    return slot
+
+# Serialized /api/rooms body and ETag; every lobby tab polls it
+room_list = MicroCache('room_list', settings.ROOM_LIST_TTL)
+
+
+@receiver(setting_changed)
+def reset_room_list(setting, **kwargs):
+    if setting in ('ROOM_LIST_TTL', 'GAME_STATE_BACKEND', 'REDIS_HOST', 'REDIS_PORT', 'REDIS_DB'):
+        room_list.ttl = settings.ROOM_LIST_TTL
+        room_list.clear()
+
+def page_response(page, room_name=''):
+    response = HttpResponse(page.render(room_name))
+    patch_cache_control(response, public=True, max_age=settings.PAGE_MAX_AGE)
+    return response
+
+@condition(
+    etag_func=lambda request: get_page('lobby.html').etag(),
+    last_modified_func=lambda request: get_page('lobby.html').last_modified,
+)
 def lobby(request):
-    return render(request, 'lobby.html', {
-        'base_path': '/copilot/memory-game/'
-    })
+    return page_response(get_page('lobby.html'))
 
+@condition(
+    etag_func=lambda request, room_name: get_page('game.html').etag(room_name),
+    last_modified_func=lambda request, room_name: get_page('game.html').last_modified,
+)
 def game_room(request, room_name):
-    return render(request, 'game.html', {
-        'room_name': room_name,
-        'base_path': '/copilot/memory-game/',
-        'ws_base_path': '/copilot/memory-game'
-    })
+    return page_response(get_page('game.html'), room_name)
+
+async def load_room_list():
+    """Read active rooms from the state backend; returns (JSON body, ETag)"""
+    start = perf_counter()
+    async with api_slot():
+        states = await get_backend().active()
+    rooms = [
+        {
+            'name': room_name,
+            'players': count_connected(game_data),
+            'started': game_data.get('started', False),
+            'theme': game_data.get('theme', 'emoji')
+        }
+        for room_name, game_data in states.items()
+    ]
+    LIST_ROOMS_TIME.observe(perf_counter() - start)
+    body = json.dumps({'rooms': rooms}).encode()
+    return body, f'"{hashlib.sha1(body).hexdigest()[:16]}"'
 
-def list_rooms(request):
-    """API endpoint to list active game rooms from Redis"""
+@on_api_loop
+async def list_rooms(request):
+    """API endpoint to list active game rooms, at most ROOM_LIST_TTL seconds old"""
     try:
-        r = redis.Redis(host='redis', port=6379, decode_responses=True)
-        
-        # Get all game keys from Redis
-        game_keys = r.keys('game:*')
-        rooms = []
-        
-        for key in game_keys:
-            room_name = key.replace('game:', '')
-            game_data_str = r.get(key)
-            if game_data_str:
-                game_data = json.loads(game_data_str)
-                player_count = len(game_data.get('players', {}))
-                
-                # Clean up empty rooms
-                if player_count == 0:
-                    r.delete(key)
-                    continue
-                    
-                rooms.append({
-                    'name': room_name,
-                    'players': player_count,
-                    'started': game_data.get('started', False),
-                    'theme': game_data.get('theme', 'emoji')
-                })
-        
-        return JsonResponse({'rooms': rooms})
+        body, etag = await room_list.get(load_room_list)
     except Exception as e:
         return JsonResponse({'rooms': [], 'error': str(e)})
+    response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    # An unchanged lobby costs a 304 with no body
+    return get_conditional_response(request, etag=etag, response=response)
 
-def new_game(request):
+async def load_theme(theme):
+    """Fetch an API-backed theme on first use without blocking the loop"""
+    if theme in REMOTE_THEMES and not THEMES[theme]:
+        await sync_to_async(theme_items, thread_sensitive=False)(theme)
+
+def int_param(request, name, default, low, high):
+    value = request.GET.get(name, '')
+    if value == '':
+        return default
+    value = int(value)
+    if not low <= value <= high:
+        raise ValueError(f'{name} must be between {low} and {high}')
+    return value
+
+@on_api_loop
+async def new_game(request):
     theme = request.GET.get('theme', 'emoji')
+    await load_theme(theme)
     cards = get_cards(theme)
     return JsonResponse({'cards': cards, 'theme': theme})
+
+@on_api_loop
+async def decks(request):
+    """K shuffled decks in one response, so clients can prefetch their next games.
+
+    ?theme=&count=K&pairs=N&seed=S; with a seed the same batch comes back every time.
+    """
+    theme = request.GET.get('theme', 'emoji')
+    await load_theme(theme)
+    faces = len(theme_items(theme))
+    try:
+        count = int_param(request, 'count', settings.DECK_BATCH_DEFAULT, 1, settings.DECK_BATCH_MAX)
+        pairs = int_param(request, 'pairs', faces, 2, faces)
+        seed = int_param(request, 'seed', None, 0, 2 ** 63 - 1)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    response = JsonResponse({
+        'theme': theme,
+        'pairs': pairs,
+        'seed': seed,
+        'decks': deal_decks(theme, count, pairs, seed),
+    })
+    if seed is None:
+        response['Cache-Control'] = 'no-store'
+    return response
+
+@on_api_loop
+async def quick_join(request):
+    """POST ?theme=: the fullest open room for the theme, or a new one"""
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    async with api_slot():
+        room, theme, created = await claim_quick_join(request.GET.get('theme', 'emoji'))
+    response = JsonResponse({'room': room, 'theme': theme, 'created': created})
+    response['Cache-Control'] = 'no-store'
+    return response
+
+def player(request):
+    """POST: sign this browser's player id into its cookie, renewing it; new browsers get a new id"""
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    player_id = identity.verify(request.COOKIES.get(settings.PLAYER_COOKIE)) or identity.new_player_id()
+    response = JsonResponse({'player': player_id})
+    response.set_cookie(
+        settings.PLAYER_COOKIE,
+        identity.issue(player_id),
+        max_age=settings.PLAYER_TOKEN_MAX_AGE,
+        secure=request.is_secure(),
+        httponly=True,
+        samesite='Lax',
+    )
+    response['Cache-Control'] = 'no-store'
+    return response
+
+@on_api_loop
+async def leaderboard(request):
+    """Top players for ?window=day|week|all; ?player= adds that player's rank"""
+    window = request.GET.get('window', 'all')
+    if window not in LEADERBOARD_WINDOWS:
+        return JsonResponse({'error': f'window must be one of {", ".join(LEADERBOARD_WINDOWS)}'}, status=400)
+    try:
+        count = int_param(request, 'count', 10, 1, settings.LEADERBOARD_SIZE)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    player = request.GET.get('player')
+    try:
+        async with api_slot():
+            top = await leaderboard_top(window, count)
+            me = await leaderboard_rank(window, player) if player else None
+    except Exception as e:
+        return JsonResponse({'window': window, 'top': [], 'me': None, 'error': str(e)})
+    response = JsonResponse({'window': window, 'top': top, 'me': me})
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+def healthz(request):
+    """Liveness: the process answers. No I/O."""
+    return HttpResponse('ok', content_type='text/plain')
+
+async def readyz(request):
+    """Readiness: Redis, channel layer, themes and loop lag; cached briefly"""
+    # The checks block for up to READY_TIMEOUT each; keep them off the thread sync views share
+    result, age = await sync_to_async(readiness.get, thread_sensitive=False)()
+    response = JsonResponse(dict(result, age=round(age, 3)), status=200 if result['ready'] else 503)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+def metrics_view(request):
+    """Prometheus scrape endpoint"""
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def static_asset(request, path):
+    """Minified, precompressed static files from memory; see memory_game/assets.py"""
+    found = get_store().lookup(path)
+    if found is None:
+        raise Http404(path)
+    asset, immutable = found
+    return asset.response(request, immutable)
@@ -4,3 +4,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'memory_game.settings')
 
 application = get_wsgi_application()
+
+# Async API views share one loop (and so one Redis pool) per worker process
+from .apiloop import enable  # noqa: E402
+enable()
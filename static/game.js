@@ -5,13 +5,42 @@ let moves = 0;
 let canFlip = true;
 let currentTheme = 'emoji';
 
+// Decks fetched a batch at a time per theme; the next batch is requested in
+// the background when the last prefetched deck is dealt
+const DECK_BATCH = 5;
+const deckQueue = {};
+const refilling = {};
+
+function refillDecks(theme) {
+    if (!refilling[theme]) {
+        refilling[theme] = fetch(`api/decks?theme=${theme}&count=${DECK_BATCH}`)
+            .then(response => response.json())
+            .then(data => {
+                deckQueue[theme] = (deckQueue[theme] || []).concat(data.decks);
+            })
+            .finally(() => {
+                delete refilling[theme];
+            });
+    }
+    return refilling[theme];
+}
+
+async function nextDeck(theme) {
+    if (!deckQueue[theme] || deckQueue[theme].length === 0) {
+        await refillDecks(theme);
+    }
+    const deck = deckQueue[theme].shift();
+    if (deckQueue[theme].length === 0) {
+        refillDecks(theme).catch(error => console.error('Deck prefetch failed:', error));
+    }
+    return deck;
+}
+
 async function initGame() {
     const themeSelect = document.getElementById('theme-select');
     currentTheme = themeSelect.value;
     
-    const response = await fetch(`api/new-game?theme=${currentTheme}`);
-    const data = await response.json();
-    cards = data.cards;
+    cards = await nextDeck(currentTheme);
     matchedPairs = 0;
     moves = 0;
     flippedCards = [];
@@ -1,20 +1,25 @@
 #!/usr/bin/env python3
 """
 Test multiplayer functionality by simulating two players
+
+Usage: python test_multiplayer.py [ws://localhost:8080]
+For sustained load and latency reports use loadgen.py.
 """
 import asyncio
 import websockets
 import json
 import sys
 
+BASE_URL = sys.argv[1].rstrip('/') if len(sys.argv) > 1 else "ws://localhost:8080"
+
 async def player_client(player_name, room_name, delay=0):
     """Simulate a player connecting to a game room"""
-    url = f"wss://www.pipeline-dev-k8s.com/copilot/memory-game/ws/game/{room_name}/"
+    url = f"{BASE_URL}/ws/game/{room_name}/"
     print(f"{player_name}: Connecting to {url}")
     
     try:
         await asyncio.sleep(delay)
-        async with websockets.connect(url, ssl=True) as websocket:
+        async with websockets.connect(url) as websocket:
             print(f"{player_name}: ✅ Connected!")
             
             # Listen for messages
@@ -0,0 +1,99 @@
+"""
+Unit tests for admission control and load shedding
+"""
+import unittest
+from unittest.mock import patch
+from channels.layers import InMemoryChannelLayer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.test import override_settings
+from memory_game import admission
+from memory_game.consumers import GameConsumer
+from memory_game.routing import websocket_urlpatterns
+
+
+class TestLoadSignals(unittest.IsolatedAsyncioTestCase):
+    """Test the checks behind admission decisions"""
+
+    async def test_queue_depth_counts_buffered_messages(self):
+        """Test messages waiting in the in-memory layer are counted"""
+        layer = InMemoryChannelLayer()
+        channel = await layer.new_channel()
+        for _ in range(3):
+            await layer.send(channel, {'type': 'x'})
+        self.assertEqual(admission.queue_depth(layer), 3)
+
+    async def test_connection_checks(self):
+        """Test the connection cap (per worker) comes first, then loop lag and queue depth"""
+        layer = InMemoryChannelLayer()
+        with override_settings(MAX_CONNECTIONS=2, WEB_WORKERS=1):
+            self.assertIsNone(admission.check_connection(1, layer))
+            self.assertEqual(admission.check_connection(2, layer), 'pod_full')
+        with override_settings(MAX_CONNECTIONS=5, WEB_WORKERS=2):
+            self.assertIsNone(admission.check_connection(2, layer))
+            self.assertEqual(admission.check_connection(3, layer), 'pod_full')
+        with patch('memory_game.admission.loop_lag', return_value=1.0):
+            self.assertEqual(admission.check_connection(0, layer), 'loop_lag')
+            self.assertEqual(admission.check_action('start_game', layer), 'loop_lag')
+            self.assertIsNone(admission.check_action('flip_card', layer))
+        with override_settings(ADMISSION_MAX_QUEUE_DEPTH=0):
+            channel = await layer.new_channel()
+            await layer.send(channel, {'type': 'x'})
+            self.assertEqual(admission.check_connection(0, layer), 'queue_depth')
+
+
+class TestConsumerAdmission(unittest.IsolatedAsyncioTestCase):
+    """Test sockets are turned away with a close code and a retry hint"""
+
+    def setUp(self):
+        GameConsumer.games.clear()
+        self.app = URLRouter(websocket_urlpatterns)
+        self.sockets = []
+
+    async def asyncTearDown(self):
+        for socket in self.sockets:
+            await socket.disconnect()
+
+    async def open(self, path):
+        socket = WebsocketCommunicator(self.app, path)
+        connected, _ = await socket.connect()
+        self.assertTrue(connected)
+        self.sockets.append(socket)
+        return socket
+
+    async def assert_rejected(self, socket, reason, code):
+        message = await socket.receive_json_from()
+        self.assertEqual((message['type'], message['reason']), ('rejected', reason))
+        self.assertEqual(message['retry_after'], 5)
+        self.assertEqual(await socket.receive_output(), {'type': 'websocket.close', 'code': code})
+
+    async def test_full_room(self):
+        """Test players past ROOM_CAPACITY get the room-full close code"""
+        with override_settings(ROOM_CAPACITY=1):
+            await self.open('/ws/game/admit_full/')
+            socket = await self.open('/ws/game/admit_full/')
+            await self.assert_rejected(socket, 'room_full', admission.CLOSE_ROOM_FULL)
+        self.assertEqual(len(GameConsumer.games['admit_full']['players']), 1)
+
+    async def test_spectators(self):
+        """Test spectators watch without joining, up to MAX_SPECTATORS"""
+        player = await self.open('/ws/game/admit_watch/')
+        await player.receive_json_from()
+        with override_settings(MAX_SPECTATORS=1):
+            watcher = await self.open('/ws/game/admit_watch/?role=spectator')
+            update = await watcher.receive_json_from()
+            self.assertEqual(len(update['game']['players']), 1)
+            self.assertFalse(update['game']['is_your_turn'])
+            extra = await self.open('/ws/game/admit_watch/?role=spectator')
+            await self.assert_rejected(extra, 'spectators_full', admission.CLOSE_ROOM_FULL)
+
+    async def test_overloaded_pod(self):
+        """Test new sockets are told to retry later while the loop lags"""
+        with patch('memory_game.admission.loop_lag', return_value=1.0):
+            socket = await self.open('/ws/game/admit_busy/')
+            await self.assert_rejected(socket, 'loop_lag', admission.CLOSE_RETRY_LATER)
+        self.assertNotIn('admit_busy', GameConsumer.games)
+
+
+if __name__ == '__main__':
+    unittest.main()
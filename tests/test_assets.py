@@ -0,0 +1,100 @@
+"""
+Unit tests for the static asset pipeline
+"""
+import gzip
+import tempfile
+import unittest
+from pathlib import Path
+from django.test import Client, TestCase, override_settings
+from memory_game.assets import (
+    build_assets, fingerprint, get_store, load_build, minify_css, minify_js, write_build,
+)
+
+
+class TestMinify(unittest.TestCase):
+    """Test the CSS and JS minifiers"""
+
+    def test_css(self):
+        """Test comments and whitespace go, strings and descendant selectors stay"""
+        css = "/* title */\n.a  > .b ,\n.c :hover {\n    font-family: 'Segoe  UI', Arial;\n    margin: 0 auto;\n}\n"
+        self.assertEqual(minify_css(css), ".a>.b,.c :hover{font-family:'Segoe  UI',Arial;margin:0 auto}")
+
+    def test_js_keeps_template_literals(self):
+        """Test indentation is stripped except inside multi-line template literals"""
+        js = "// setup\nfunction f() {\n    el.innerHTML = `\n        <b>x</b>\n    `;\n\n    return 1;\n}\n"
+        self.assertEqual(minify_js(js), "function f() {\nel.innerHTML = `\n        <b>x</b>\n    `;\nreturn 1;\n}\n")
+
+    def test_fingerprint(self):
+        """Test the hash goes before the extension and follows the content"""
+        self.assertRegex(fingerprint('style.css', b'a'), r'^style\.[0-9a-f]{12}\.css$')
+        self.assertNotEqual(fingerprint('style.css', b'a'), fingerprint('style.css', b'b'))
+
+
+class TestBuild(unittest.TestCase):
+    """Test building to disk and loading back"""
+
+    def test_round_trip(self):
+        """Test a written build loads back with the same names and bodies"""
+        with tempfile.TemporaryDirectory() as source, tempfile.TemporaryDirectory() as out:
+            Path(source, 'style.css').write_text('body {\n    color: red;\n}\n' * 50)
+            built = build_assets(source)
+            write_build(built, out)
+            loaded = load_build(out)
+        asset = loaded['style.css']
+        self.assertEqual(asset.hashed_name, built['style.css'].hashed_name)
+        self.assertEqual(gzip.decompress(asset.bodies['gzip']), asset.bodies['identity'])
+        self.assertTrue(asset.content_type.startswith('text/css'))
+
+
+@override_settings(STATIC_BUILD_DIR='/nonexistent')
+class TestStaticView(TestCase):
+    """Test serving assets with encoding negotiation and cache headers"""
+
+    def setUp(self):
+        self.client = Client()
+        self.asset = get_store().assets['style.css']
+
+    def test_fingerprinted_name_is_immutable(self):
+        """Test hashed URLs get a year-long immutable cache"""
+        response = self.client.get(f'/static/{self.asset.hashed_name}')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_bare_name_revalidates(self):
+        """Test unhashed URLs are revalidated and answered 304 on a match"""
+        response = self.client.get('/static/style.css')
+        self.assertEqual(response['Cache-Control'], 'public, no-cache')
+        response = self.client.get('/static/style.css', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_encoding_negotiation(self):
+        """Test brotli is preferred, gzip next, q=0 refuses a coding"""
+        response = self.client.get('/static/style.css', HTTP_ACCEPT_ENCODING='gzip, br')
+        expected = 'br' if 'br' in self.asset.bodies else 'gzip'
+        self.assertEqual(response['Content-Encoding'], expected)
+        response = self.client.get('/static/style.css', HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.asset.bodies['identity'])
+        response = self.client.get('/static/style.css')
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_missing_file(self):
+        """Test unknown paths are 404"""
+        self.assertEqual(self.client.get('/static/nope.css').status_code, 404)
+
+    def test_pages_link_fingerprinted_css(self):
+        """Test pages reference the hashed file under BASE_PATH"""
+        response = self.client.get('/')
+        self.assertContains(response, f'href="/copilot/memory-game/static/{self.asset.hashed_name}"')
+
+    @override_settings(BASE_PATH='/games/memory')
+    def test_base_path(self):
+        """Test asset URLs follow the configured mount prefix"""
+        response = self.client.get('/game/room1/')
+        self.assertContains(response, '<base href="/games/memory/">')
+        self.assertContains(response, f'href="/games/memory/static/{self.asset.hashed_name}"')
+
+
+if __name__ == '__main__':
+    unittest.main()
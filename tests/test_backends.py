@@ -0,0 +1,280 @@
+"""
+Unit tests for room-state backends
+"""
+import asyncio
+import json
+import os
+import time
+import unittest
+from unittest.mock import patch
+import redis
+from django.test import override_settings
+from memory_game import backends
+from memory_game.backends import MemoryStateBackend, RedisStateBackend, count_connected, get_backend, open_seats
+
+TEST_REDIS_HOST = os.getenv('TEST_REDIS_HOST', 'localhost')
+TEST_REDIS_PORT = int(os.getenv('TEST_REDIS_PORT', '6379'))
+TEST_REDIS_DB = 15
+
+
+def make_state(players=1):
+    return {
+        'players': {f'p{i}': {'name': f'Player {i + 1}', 'score': 0, 'connected': True} for i in range(players)},
+        'cards': [],
+        'flipped': [],
+        'matched': [],
+        'current_player': 'p0' if players else None,
+        'theme': 'emoji',
+        'started': False,
+    }
+
+
+class BackendContract:
+    """Behaviour every backend must share; mixed into the concrete test cases"""
+
+    async def test_missing_room(self):
+        """Test a missing room has no state and no version"""
+        self.assertEqual(await self.backend.get('nope'), (None, None))
+
+    async def test_create_and_update(self):
+        """Test versions advance on every successful write"""
+        self.assertTrue(await self.backend.compare_and_set('r', make_state(), None))
+        state, version = await self.backend.get('r')
+        self.assertEqual(state['players']['p0']['name'], 'Player 1')
+        state['started'] = True
+        self.assertTrue(await self.backend.compare_and_set('r', state, version))
+        state, new_version = await self.backend.get('r')
+        self.assertTrue(state['started'])
+        self.assertGreater(new_version, version)
+
+    async def test_stale_version_rejected(self):
+        """Test a write based on an old read loses"""
+        await self.backend.compare_and_set('r', make_state(), None)
+        _, version = await self.backend.get('r')
+        self.assertTrue(await self.backend.compare_and_set('r', make_state(2), version))
+        self.assertFalse(await self.backend.compare_and_set('r', make_state(3), version))
+        self.assertFalse(await self.backend.compare_and_set('r', make_state(3), None))
+        state, _ = await self.backend.get('r')
+        self.assertEqual(len(state['players']), 2)
+
+    async def test_returned_state_is_a_copy(self):
+        """Test mutating a read state does not change the stored one"""
+        await self.backend.compare_and_set('r', make_state(), None)
+        state, _ = await self.backend.get('r')
+        state['players'].clear()
+        state, _ = await self.backend.get('r')
+        self.assertEqual(len(state['players']), 1)
+
+    async def test_versioned_delete(self):
+        """Test delete with a stale version keeps the room"""
+        await self.backend.compare_and_set('r', make_state(), None)
+        _, version = await self.backend.get('r')
+        await self.backend.compare_and_set('r', make_state(2), version)
+        self.assertFalse(await self.backend.delete('r', version))
+        self.assertTrue(await self.backend.delete('r', version + 1))
+        self.assertEqual(await self.backend.get('r'), (None, None))
+
+    async def test_list_and_snapshot(self):
+        """Test listing rooms and pruning empty ones from snapshots"""
+        await self.backend.compare_and_set('a', make_state(2), None)
+        await self.backend.compare_and_set('empty', make_state(0), None)
+        self.assertEqual(set(await self.backend.list()), {'a', 'empty'})
+        snapshot = await asyncio.to_thread(self.backend.snapshot)
+        self.assertEqual(list(snapshot), ['a'])
+        self.assertEqual(set(await self.backend.list()), {'a'})
+
+    async def test_active_skips_empty_rooms(self):
+        """Test the read-only listing leaves out rooms with no players"""
+        await self.backend.compare_and_set('a', make_state(2), None)
+        await self.backend.compare_and_set('empty', make_state(0), None)
+        self.assertEqual(list(await self.backend.active()), ['a'])
+
+    async def test_presence(self):
+        """Test presence counts distinct sockets"""
+        self.assertEqual(await self.backend.presence_add('r', 'c1'), 1)
+        self.assertEqual(await self.backend.presence_add('r', 'c1'), 1)
+        self.assertEqual(await self.backend.presence_add('r', 'c2'), 2)
+        self.assertEqual(await self.backend.presence_remove('r', 'c1'), 1)
+        self.assertEqual(await self.backend.presence_remove('r', 'c2'), 0)
+
+    async def test_claim_seat_prefers_fullest_room(self):
+        """Test quick join fills the open room with the fewest seats left"""
+        await self.backend.compare_and_set('one', make_state(1), None)
+        await self.backend.compare_and_set('three', make_state(3), None)
+        other = make_state(3)
+        other['theme'] = 'food'
+        await self.backend.compare_and_set('food', other, None)
+        self.assertEqual(await self.backend.claim_seat('emoji', 'new', 4), ('three', False))
+        # 'three' is now reserved full, so the next player goes to 'one'
+        self.assertEqual(await self.backend.claim_seat('emoji', 'new', 4), ('one', False))
+
+    async def test_claim_seat_opens_room(self):
+        """Test quick join creates a room when none is open, and reuses it"""
+        started = make_state(1)
+        started['started'] = True
+        await self.backend.compare_and_set('started', started, None)
+        await self.backend.compare_and_set('full', make_state(4), None)
+        self.assertEqual(await self.backend.claim_seat('emoji', 'new', 4), ('new', True))
+        self.assertEqual(await self.backend.claim_seat('emoji', 'other', 4), ('new', False))
+
+    async def test_abandoned_claim_expires(self):
+        """Test a room opened by quick join that nobody connects to stops being offered"""
+        self.assertEqual(await self.backend.claim_seat('emoji', 'ghost', 4, ttl=0.05), ('ghost', True))
+        self.assertEqual(await self.backend.claim_seat('emoji', 'x', 4, ttl=0.05), ('ghost', False))
+        await self.backend.compare_and_set('kept', make_state(3), None)
+        await asyncio.sleep(0.1)
+        # 'ghost' is pruned; 'kept' had a state write, so it stays
+        self.assertEqual(await self.backend.claim_seat('emoji', 'y', 4), ('kept', False))
+        self.assertEqual(await self.backend.claim_seat('emoji', 'z', 4), ('z', True))
+
+    async def test_state_writes_maintain_seat_index(self):
+        """Test starting or deleting a room takes it out of quick join"""
+        await self.backend.compare_and_set('r', make_state(1), None)
+        state, version = await self.backend.get('r')
+        state['started'] = True
+        await self.backend.compare_and_set('r', state, version)
+        self.assertEqual(await self.backend.claim_seat('emoji', 'a', 4), ('a', True))
+        await self.backend.compare_and_set('a', make_state(1), None)
+        _, version = await self.backend.get('a')
+        self.assertTrue(await self.backend.delete('a', version))
+        self.assertEqual(await self.backend.claim_seat('emoji', 'b', 4), ('b', True))
+
+    async def test_leaderboard_top(self):
+        """Test points accumulate per board and the top comes back best first, named"""
+        boards = [('lb:a', None), ('lb:b', 60)]
+        await self.backend.leaderboard_add(boards, 'p1', 2, 'Ann')
+        await self.backend.leaderboard_add(boards[:1], 'p2', 5, 'Bob')
+        await self.backend.leaderboard_add(boards, 'p1', 1, 'Ann')
+        self.assertEqual(await self.backend.leaderboard_top('lb:a', 10), [('p2', 'Bob', 5), ('p1', 'Ann', 3)])
+        self.assertEqual(await self.backend.leaderboard_top('lb:a', 1), [('p2', 'Bob', 5)])
+        self.assertEqual(await self.backend.leaderboard_top('lb:b', 10), [('p1', 'Ann', 3)])
+        self.assertEqual(await self.backend.leaderboard_top('lb:none', 10), [])
+
+    async def test_leaderboard_rank(self):
+        """Test ranks are 0-based, ties go to the greater id and unranked players get None"""
+        for player, points in (('a', 1), ('b', 4), ('c', 4)):
+            await self.backend.leaderboard_add([('lb', None)], player, points, player.upper())
+        self.assertEqual(await self.backend.leaderboard_rank('lb', 'c'), (0, 4))
+        self.assertEqual(await self.backend.leaderboard_rank('lb', 'b'), (1, 4))
+        self.assertEqual(await self.backend.leaderboard_rank('lb', 'a'), (2, 1))
+        self.assertIsNone(await self.backend.leaderboard_rank('lb', 'z'))
+        self.assertEqual([p for p, _, _ in await self.backend.leaderboard_top('lb', 3)], ['c', 'b', 'a'])
+
+
+class TestMemoryStateBackend(BackendContract, unittest.IsolatedAsyncioTestCase):
+    """Test the in-process backend"""
+
+    async def asyncSetUp(self):
+        self.backend = MemoryStateBackend(rooms={})
+
+    async def test_dated_boards_expire(self):
+        """Test a board with a TTL is empty once it has passed"""
+        await self.backend.leaderboard_add([('lb', 60)], 'p1', 1, 'Ann')
+        with patch('memory_game.backends.time.time', return_value=time.time() + 61):
+            self.assertEqual(await self.backend.leaderboard_top('lb', 10), [])
+            self.assertIsNone(await self.backend.leaderboard_rank('lb', 'p1'))
+
+    async def test_claims_released(self):
+        """Test a claimed room's claim is dropped once the room is created, and by delete"""
+        self.assertEqual(await self.backend.claim_seat('emoji', 'a', 4), ('a', True))
+        await self.backend.compare_and_set('a', make_state(1), None)
+        self.assertEqual(self.backend.claims, {})
+        self.assertTrue(await self.backend.delete('a'))
+        self.assertEqual(await self.backend.claim_seat('emoji', 'b', 4), ('b', True))
+        self.assertTrue(await self.backend.delete('b'))
+        self.assertEqual(self.backend.claims, {})
+
+
+class TestRedisStateBackend(BackendContract, unittest.IsolatedAsyncioTestCase):
+    """Test the Redis backend against TEST_REDIS_HOST (db 15), skipped when unreachable"""
+
+    async def asyncSetUp(self):
+        self.backend = RedisStateBackend(TEST_REDIS_HOST, TEST_REDIS_PORT, TEST_REDIS_DB)
+        try:
+            await self.backend.client.flushdb()
+        except redis.exceptions.ConnectionError:
+            await self.backend.client.aclose()
+            self.skipTest(f'Redis unavailable at {TEST_REDIS_HOST}:{TEST_REDIS_PORT}')
+
+    async def asyncTearDown(self):
+        await self.backend.client.flushdb()
+        await self.backend.client.aclose()
+
+
+class TestUpdateGame(unittest.IsolatedAsyncioTestCase):
+    """Test GameConsumer's compare-and-set loop"""
+
+    async def asyncSetUp(self):
+        from memory_game.consumers import GameConsumer
+        self.backend = MemoryStateBackend(rooms={})
+        await self.backend.compare_and_set('r', make_state(2), None)
+        self.consumer = GameConsumer()
+        self.consumer.room_name = 'r'
+        patcher = patch('memory_game.consumers.get_backend', return_value=self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_conflict_is_retried_on_fresh_state(self):
+        """Test a concurrent write is re-read, not overwritten"""
+        calls = []
+        real_get = self.backend.get
+
+        async def racing_get(room):
+            state, version = await real_get(room)
+            if not calls:
+                # Another socket scores between our read and our write
+                other = json.loads(json.dumps(state))
+                other['players']['p1']['score'] = 5
+                await self.backend.compare_and_set(room, other, version)
+            return state, version
+
+        def mutate(game):
+            calls.append(game['players']['p1']['score'])
+            game['started'] = True
+            return game
+
+        self.backend.get = racing_get
+        game = await self.consumer.update_game(mutate)
+        self.assertEqual(calls, [0, 5])
+        self.assertTrue(game['started'])
+        self.assertEqual(game['players']['p1']['score'], 5)
+
+    async def test_room_without_players_is_deleted(self):
+        """Test removing the last player deletes the room"""
+        def clear(game):
+            game['players'] = {}
+            return game
+
+        await self.consumer.update_game(clear)
+        self.assertEqual(await self.backend.get('r'), (None, None))
+
+
+class TestBackendSelection(unittest.TestCase):
+    """Test backend configuration"""
+
+    def test_configured_backend(self):
+        """Test GAME_STATE_BACKEND picks the implementation"""
+        with override_settings(GAME_STATE_BACKEND='memory'):
+            self.assertIsInstance(get_backend(), MemoryStateBackend)
+            self.assertIs(get_backend().rooms, backends.MEMORY_ROOMS)
+        with override_settings(GAME_STATE_BACKEND='redis'):
+            self.assertIsInstance(get_backend(), RedisStateBackend)
+        with override_settings(GAME_STATE_BACKEND='memory_game.backends.MemoryStateBackend'):
+            self.assertIsInstance(get_backend(), MemoryStateBackend)
+
+    def test_count_connected(self):
+        """Test disconnected players are not counted"""
+        state = make_state(3)
+        state['players']['p1']['connected'] = False
+        self.assertEqual(count_connected(state), 2)
+
+    def test_open_seats(self):
+        """Test started rooms have no open seats"""
+        state = make_state(3)
+        self.assertEqual(open_seats(state), 1)
+        state['started'] = True
+        self.assertEqual(open_seats(state), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+"""
+Unit tests for the benchmark harness
+"""
+import asyncio
+import unittest
+from benchmarks.harness import compare, measure
+
+
+def result(median):
+    return {'median': median, 'min': median, 'mean': median, 'number': 1, 'repeat': 1}
+
+
+class TestHarness(unittest.TestCase):
+    """Test timing and regression comparison"""
+
+    def test_measure_sync_and_async(self):
+        """Test both sync and async operations are timed per op"""
+        async def async_op():
+            await asyncio.sleep(0)
+
+        sync_stats = asyncio.run(measure(lambda: sum(range(100)), min_batch_time=0.001, repeat=3))
+        async_stats = asyncio.run(measure(async_op, min_batch_time=0.001, repeat=3))
+        for stats in (sync_stats, async_stats):
+            self.assertGreater(stats['median'], 0)
+            self.assertGreaterEqual(stats['number'], 1)
+            self.assertEqual(stats['repeat'], 3)
+
+    def test_compare_flags_regressions_over_threshold(self):
+        """Test only slowdowns beyond the threshold are regressions"""
+        baseline = {'results': {'a': result(1.0), 'b': result(1.0), 'c': result(1.0)}}
+        current = {'results': {'a': result(1.1), 'b': result(1.3), 'c': result(0.5), 'd': result(1.0)}}
+        rows, regressions, missing = compare(baseline, current, threshold=0.15)
+        self.assertEqual(regressions, ['b'])
+        self.assertEqual(missing, [])
+        self.assertIn(('d', None, 1.0, None), rows)
+
+    def test_compare_reports_missing_benchmarks(self):
+        """Test baseline benchmarks absent from a run are missing, unless filtered out"""
+        baseline = {'results': {'a[x]': result(1.0), 'a[y]': result(1.0), 'b': result(1.0)}}
+        current = {'results': {'a[x]': result(1.0)}, 'skipped': {'a[y]': 'Redis unavailable'}}
+        rows, regressions, missing = compare(baseline, current)
+        self.assertEqual((regressions, missing), ([], ['a[y]', 'b']))
+        self.assertIn(('b', 1.0, None, None), rows)
+        current['meta'] = {'filter': 'a['}
+        self.assertEqual(compare(baseline, current)[2], ['a[y]'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,7 +3,7 @@ Unit tests for game logic functions
 """
 import unittest
 from unittest.mock import patch, MagicMock
-from app import get_cards, fetch_starwars_characters, fetch_pokemon
+from app import deal_decks, get_cards, fetch_starwars_characters, fetch_pokemon
 import requests
 
 
@@ -128,6 +128,20 @@ class TestGameLogic(unittest.TestCase):
                 for card in cards:
                     self.assertTrue(len(card) > 0)
 
+    def test_deal_decks_batch(self):
+        """Test a batch has the requested decks, each made of pairs"""
+        decks = deal_decks('emoji', 4, pairs=5)
+        self.assertEqual(len(decks), 4)
+        for deck in decks:
+            self.assertEqual(len(deck), 10)
+            self.assertTrue(all(deck.count(card) == 2 for card in deck))
+
+    def test_deal_decks_seeded(self):
+        """Test the same seed reproduces the batch and decks within it differ"""
+        decks = deal_decks('food', 3, seed=42)
+        self.assertEqual(decks, deal_decks('food', 3, seed=42))
+        self.assertNotEqual(decks[0], decks[1])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,93 @@
+"""
+Unit tests for the health and readiness endpoints
+"""
+import asyncio
+import json
+import threading
+import unittest
+from unittest.mock import Mock, patch
+from asgiref.sync import sync_to_async
+from django.test import Client, TestCase
+from memory_game.health import Readiness, readiness
+
+WARM_THEMES = {'starwars': ['Luke'], 'pokemon': ['Pikachu']}
+
+
+class TestHealthViews(TestCase):
+    """Test /healthz and /readyz"""
+
+    def setUp(self):
+        self.client = Client()
+        readiness.result = None
+
+    def test_healthz(self):
+        """Test liveness answers without touching any backend"""
+        with patch('memory_game.health.get_backend') as get_backend:
+            response = self.client.get('/healthz')
+        self.assertEqual(response.status_code, 200)
+        get_backend.assert_not_called()
+
+    @patch.dict('app.THEMES', WARM_THEMES)
+    def test_ready(self):
+        """Test every check passes with the in-memory backends and warm themes"""
+        response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertTrue(data['ready'])
+        self.assertEqual(set(data['checks']), {'redis', 'channel_layer', 'themes', 'loop_lag'})
+
+    @patch.dict('app.THEMES', WARM_THEMES)
+    def test_not_ready_when_redis_down(self):
+        """Test a failing check gives 503 and names the error"""
+        with patch.dict(readiness.checks, redis=Mock(side_effect=ConnectionError('refused'))):
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 503)
+        data = json.loads(response.content)
+        self.assertFalse(data['checks']['redis']['ok'])
+        self.assertIn('refused', data['checks']['redis']['error'])
+
+    @patch.dict('app.THEMES', WARM_THEMES)
+    async def test_checks_run_off_the_shared_thread(self):
+        """Test a slow check doesn't hold the thread sync views run on"""
+        started, released = threading.Event(), threading.Event()
+
+        def slow_redis():
+            started.set()
+            return released.wait(5)
+
+        with patch.dict(readiness.checks, redis=slow_redis):
+            probe = asyncio.ensure_future(self.async_client.get('/readyz'))
+            self.assertTrue(await asyncio.to_thread(started.wait, 5))
+            # Would queue behind slow_redis if the checks held the shared thread
+            await asyncio.wait_for(sync_to_async(released.set)(), 2)
+            response = await probe
+        self.assertEqual(response.status_code, 200)
+
+    def test_cold_themes_start_warmup(self):
+        """Test unloaded themes fail readiness and start loading in the background"""
+        warmed = threading.Event()
+        with patch.dict('app.THEMES', {'starwars': [], 'pokemon': []}), \
+                patch('memory_game.health.warm_themes', side_effect=warmed.set):
+            response = self.client.get('/readyz')
+            self.assertTrue(warmed.wait(5))
+        self.assertEqual(response.status_code, 503)
+
+
+class TestReadinessCache(unittest.TestCase):
+    """Test readiness results are reused within the window"""
+
+    def test_checks_run_once_per_window(self):
+        """Test repeat calls inside the TTL don't rerun the checks"""
+        calls = []
+        checks = Readiness({'redis': lambda: calls.append(1) or True}, ttl=60)
+        for _ in range(5):
+            result, age = checks.get()
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(result['ready'])
+        checks.ttl = 0
+        checks.get()
+        self.assertEqual(len(calls), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
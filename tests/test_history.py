@@ -0,0 +1,114 @@
+"""
+Unit tests for the write-behind game history
+"""
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.test import override_settings
+from memory_game import history
+from memory_game.consumers import GameConsumer
+from memory_game.history import HistoryWriter, game_row
+from memory_game.records import decode
+from memory_game.routing import websocket_urlpatterns
+
+
+def finished_game():
+    return {
+        'players': {'a': {'name': 'Player 1', 'score': 5}, 'b': {'name': 'Player 2', 'score': 3}},
+        'cards': ['x', 'x'] * 8,
+        'matched': list(range(16)),
+        'theme': 'food',
+        'seed': 42,
+        'moves': 30,
+        'started_at': 1000.0,
+    }
+
+
+class TestHistoryWriter(unittest.TestCase):
+    """Test rows reach SQLite in batches"""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, 'history', 'games.sqlite3')
+
+    def read(self):
+        with sqlite3.connect(self.path) as db:
+            return db.execute('SELECT room, theme, seed, players, moves, duration FROM games').fetchall()
+
+    def test_rows_written_on_stop(self):
+        """Test queued rows are flushed in WAL mode when the writer stops"""
+        writer = HistoryWriter(self.path, batch_size=3, flush_interval=60)
+        for i in range(7):
+            writer.put(game_row(f'room{i}', finished_game(), finished_at=1090.0))
+        writer.stop()
+        rows = self.read()
+        self.assertEqual(len(rows), 7)
+        room, theme, seed, players, moves, duration = rows[0]
+        self.assertEqual((room, theme, seed, moves, duration), ('room0', 'food', 42, 30, 90.0))
+        self.assertEqual(json.loads(players)[0], {'name': 'Player 1', 'score': 5})
+        with sqlite3.connect(self.path) as db:
+            self.assertEqual(db.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+
+    def test_full_queue_drops(self):
+        """Test a full queue drops the record instead of blocking"""
+        writer = HistoryWriter(self.path, maxsize=1)
+        writer.stop()
+        dropped = history.RECORDED_DROPPED.value
+        writer.put(game_row('a', finished_game()))
+        writer.put(game_row('b', finished_game()))
+        self.assertEqual(history.RECORDED_DROPPED.value, dropped + 1)
+
+
+class TestRecordGame(unittest.TestCase):
+    """Test recording a game never raises into the consumer"""
+
+    def test_unencodable_game_is_counted(self):
+        """Test a record that can't be built is logged and counted as failed"""
+        with tempfile.TemporaryDirectory() as tmp, \
+                override_settings(GAME_HISTORY_DB=os.path.join(tmp, 'games.sqlite3')):
+            failed = history.RECORDED_FAILED.value
+            game = dict(finished_game(), flips=[[999, 0, 0]])
+            with self.assertLogs('memory_game.history', 'ERROR'):
+                history.record_game('bad', game)
+            self.assertEqual(history.RECORDED_FAILED.value, failed + 1)
+            history.get_writer().stop()
+
+
+class TestGameRecorded(unittest.IsolatedAsyncioTestCase):
+    """Test the socket that matches the last pair records the game"""
+
+    async def test_last_match_records_game(self):
+        GameConsumer.games.clear()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'games.sqlite3')
+            with override_settings(GAME_HISTORY_DB=path):
+                socket = WebsocketCommunicator(URLRouter(websocket_urlpatterns), '/ws/game/hist_room/')
+                await socket.connect()
+                await socket.send_json_to({'action': 'start_game', 'theme': 'emoji'})
+                for _ in range(3):  # player_joined, game_update, game_update
+                    await socket.receive_json_from()
+                game = GameConsumer.games['hist_room']
+                cards = game['cards']
+                pair = [0, cards.index(cards[0], 1)]
+                game['matched'] = [i for i in range(len(cards)) if i not in pair]
+                for index in pair:
+                    await socket.send_json_to({'action': 'flip_card', 'index': index})
+                for _ in range(4):  # game_update x2, match_found, game_update
+                    await socket.receive_json_from()
+                await socket.disconnect()
+                history.get_writer().stop()
+            with sqlite3.connect(path) as db:
+                rows = db.execute('SELECT room, seed, moves, record FROM games').fetchall()
+        self.assertEqual([row[:3] for row in rows], [('hist_room', game['seed'], 2)])
+        record = decode(rows[0][3])
+        self.assertEqual((record['deck'], record['seed']), (cards, game['seed']))
+        self.assertEqual([flip[:2] for flip in record['flips']], [(pair[0], 0), (pair[1], 0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
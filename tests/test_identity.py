@@ -0,0 +1,83 @@
+"""
+Unit tests for signed player tokens
+"""
+import time
+import unittest
+from unittest.mock import patch
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.test import override_settings
+from memory_game import identity
+from memory_game.consumers import GameConsumer
+from memory_game.routing import websocket_urlpatterns
+
+
+class TestTokens(unittest.TestCase):
+    """Test issuing and verifying tokens"""
+
+    def test_round_trip(self):
+        """Test a token carries its player id, and new tokens get fresh ids"""
+        self.assertEqual(identity.verify(identity.issue('abc')), 'abc')
+        self.assertNotEqual(identity.verify(identity.issue()), identity.verify(identity.issue()))
+
+    def test_rejected_tokens(self):
+        """Test missing, forged, re-salted and expired tokens give no player"""
+        token = identity.issue('abc')
+        self.assertIsNone(identity.verify(''))
+        self.assertIsNone(identity.verify(token.replace('abc', 'abd')))
+        self.assertIsNone(identity.verify(token + 'x'))
+        with override_settings(SECRET_KEY='another-key'):
+            self.assertIsNone(identity.verify(token))
+        with override_settings(PLAYER_TOKEN_MAX_AGE=60), \
+                patch('django.core.signing.time.time', return_value=time.time() + 61):
+            self.assertIsNone(identity.verify(token))
+
+    def test_scope_token(self):
+        """Test the token is read from the handshake's cookie header"""
+        scope = {'headers': [(b'host', b'x'), (b'cookie', b'a=1; player=tok')]}
+        self.assertEqual(identity.scope_token(scope), 'tok')
+        self.assertIsNone(identity.scope_token({'headers': []}))
+
+
+class TestConsumerIdentity(unittest.IsolatedAsyncioTestCase):
+    """Test sockets with the same token are one player"""
+
+    def setUp(self):
+        GameConsumer.games.clear()
+        self.app = URLRouter(websocket_urlpatterns)
+        self.sockets = []
+
+    async def asyncTearDown(self):
+        for socket in self.sockets:
+            await socket.disconnect()
+
+    async def open(self, path, token=None):
+        headers = [(b'cookie', f'player={token}'.encode())] if token else []
+        socket = WebsocketCommunicator(self.app, path, headers=headers)
+        connected, _ = await socket.connect()
+        self.assertTrue(connected)
+        self.sockets.append(socket)
+        return socket
+
+    async def test_reconnect_is_same_player(self):
+        """Test a second socket with the token rejoins instead of adding a player"""
+        token = identity.issue('alice')
+        await self.open('/ws/game/ident_same/', token)
+        await self.open('/ws/game/ident_same/', token)
+        self.assertEqual(list(GameConsumer.games['ident_same']['players']), ['alice'])
+        self.assertTrue(GameConsumer.games['ident_same']['players']['alice']['identified'])
+        await self.sockets.pop(0).disconnect()
+        self.assertIn('alice', GameConsumer.games['ident_same']['players'])
+
+    async def test_bad_token_plays_as_channel(self):
+        """Test a forged token is ignored rather than trusted"""
+        await self.open('/ws/game/ident_forged/', 'alice:forged:sig')
+        await self.open('/ws/game/ident_forged/', 'alice:forged:sig')
+        players = GameConsumer.games['ident_forged']['players']
+        self.assertEqual(len(players), 2)
+        self.assertNotIn('alice', players)
+        self.assertFalse(any(player['identified'] for player in players.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
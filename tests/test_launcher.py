@@ -0,0 +1,132 @@
+"""
+Unit tests for the multi-worker launcher
+"""
+import unittest
+from unittest.mock import Mock, patch
+from memory_game.launcher import (
+    Launcher, check_shared_backends, http_command, label_sample, merge_metrics, parse_args, worker_command, worker_env,
+)
+
+WORKER_TEXT = """# HELP memory_game_active_connections WebSocket connections open on this process.
+# TYPE memory_game_active_connections gauge
+memory_game_active_connections {count}
+# HELP memory_game_sent_bytes_total Outbound WebSocket payload bytes, by message type.
+# TYPE memory_game_sent_bytes_total counter
+memory_game_sent_bytes_total{{type="game_update"}} 10
+"""
+
+
+class TestMetricsMerge(unittest.TestCase):
+    """Test per-worker metrics are merged into one exposition"""
+
+    def test_label_sample(self):
+        """Test the worker label is added with and without existing labels"""
+        self.assertEqual(label_sample('a_total 3', 1), 'a_total{worker="1"} 3')
+        self.assertEqual(label_sample('a{le="0.1"} 3', 0), 'a{worker="0",le="0.1"} 3')
+        self.assertEqual(label_sample('a 3', None), 'a 3')
+
+    def test_families_stay_grouped(self):
+        """Test every family's samples follow its single HELP/TYPE header"""
+        text = merge_metrics([(0, WORKER_TEXT.format(count=2)), (1, WORKER_TEXT.format(count=5))])
+        lines = text.splitlines()
+        self.assertEqual(lines.count('# TYPE memory_game_active_connections gauge'), 1)
+        self.assertEqual(lines[2:4], [
+            'memory_game_active_connections{worker="0"} 2',
+            'memory_game_active_connections{worker="1"} 5',
+        ])
+        self.assertEqual(lines[4], '# HELP memory_game_sent_bytes_total Outbound WebSocket payload bytes, by message type.')
+
+
+class TestLauncherConfig(unittest.TestCase):
+    """Test worker commands and configuration checks"""
+
+    def test_worker_command(self):
+        """Test workers adopt the shared socket"""
+        args = parse_args(['--workers', '3', '--server', 'daphne'])
+        command = worker_command(args, 5)
+        self.assertIn('daphne', command)
+        self.assertEqual(command[command.index('--fd') + 1], '5')
+        self.assertEqual(command[-1], 'memory_game.asgi:application')
+
+    def test_uvicorn_worker_command(self):
+        """Test the uvicorn stack runs on uvloop with httptools"""
+        args = parse_args(['--server', 'uvicorn'])
+        command = worker_command(args, 5)
+        self.assertIn('uvicorn', command)
+        self.assertEqual(command[command.index('--fd') + 1], '5')
+        self.assertEqual(command[command.index('--loop') + 1], 'uvloop')
+        self.assertEqual(command[command.index('--http') + 1], 'httptools')
+        self.assertEqual(command[-1], 'memory_game.asgi:application')
+
+    def test_memory_backends_refused_with_several_workers(self):
+        """Test rooms can't be split across workers by in-process backends"""
+        with self.assertRaises(SystemExit):
+            check_shared_backends(2, False, {'GAME_STATE_BACKEND': 'memory'})
+        with self.assertRaises(SystemExit):
+            check_shared_backends(2, False, {'CHANNEL_LAYER': 'memory'})
+        check_shared_backends(1, False, {'GAME_STATE_BACKEND': 'memory'})
+        check_shared_backends(4, False, {})
+
+    def test_split_mode_needs_shared_state(self):
+        """Test gunicorn can't see rooms held by the ASGI process"""
+        with self.assertRaises(SystemExit):
+            check_shared_backends(1, True, {'GAME_STATE_BACKEND': 'memory'})
+        check_shared_backends(1, True, {'CHANNEL_LAYER': 'memory'})
+
+    def test_split_mode_ports(self):
+        """Test gunicorn takes the public port and ASGI workers the WebSocket one"""
+        args = parse_args(['--split', '--port', '8080', '--ws-port', '8081'])
+        self.assertIn('0.0.0.0:8080', http_command(args))
+        self.assertEqual(http_command(args)[-1], 'memory_game.wsgi:application')
+
+    def test_split_flag_reaches_workers(self):
+        """Test --split makes the workers' asgi.py serve only the ASGI_HTTP_PATHS"""
+        env = worker_env(parse_args(['--split']), 2, 9102, {'SPLIT_SERVING': '0'})
+        self.assertEqual((env['SPLIT_SERVING'], env['WORKER_ID'], env['WORKER_METRICS_PORT']), ('1', '2', '9102'))
+        self.assertEqual(worker_env(parse_args([]), 0, 9100, {'SPLIT_SERVING': '1'})['SPLIT_SERVING'], '0')
+        self.assertEqual(worker_env(parse_args(['--workers', '3']), 0, 9100, {'WEB_WORKERS': '2'})['WEB_WORKERS'], '3')
+
+
+class TestReload(unittest.TestCase):
+    """Test graceful reloads swap workers between each slot's two private ports"""
+
+    def test_reload_after_failed_reload(self):
+        """Test a reload after a failed one binds the port the surviving worker isn't holding"""
+        launcher = Launcher(parse_args(['--workers', '1', '--worker-port-base', '9300']))
+        launcher.listener = Mock()
+        with patch('memory_game.launcher.subprocess.Popen', return_value=Mock(pid=1)), \
+                patch.object(launcher, 'retire'), \
+                patch.object(launcher, 'wait_ready', side_effect=[False, True]):
+            launcher.workers[0] = launcher.spawn(0)
+            self.assertEqual(launcher.workers[0].private_port, 9300)
+            launcher.reload()  # the new worker on 9301 never comes up; 9300 is kept
+            self.assertEqual(launcher.workers[0].private_port, 9300)
+            launcher.reload()
+            self.assertEqual(launcher.workers[0].private_port, 9301)
+
+
+class TestHttpOnly(unittest.IsolatedAsyncioTestCase):
+    """Test the ASGI app's HTTP filter for split serving"""
+
+    async def test_only_listed_paths_reach_django(self):
+        """Test pages are refused and /metrics is passed through"""
+        from memory_game.asgi import http_only
+        served = []
+
+        async def app(scope, receive, send):
+            served.append(scope['path'])
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        http = http_only(['/metrics'], app)
+        await http({'type': 'http', 'path': '/metrics'}, None, send)
+        await http({'type': 'http', 'path': '/api/rooms'}, None, send)
+        self.assertEqual(served, ['/metrics'])
+        self.assertEqual(sent[0]['status'], 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+"""
+Unit tests for channel-layer configuration
+"""
+import unittest
+from memory_game.layers import channel_layer_config
+
+
+class TestChannelLayerConfig(unittest.TestCase):
+    """Test CHANNEL_LAYERS entries for each layer kind"""
+
+    def test_redis_core_layer_is_tuned(self):
+        """Test the list-based layer gets hosts and limits"""
+        config = channel_layer_config('redis', 'redis', 6380, capacity=200, expiry=10, group_expiry=7200)
+        self.assertEqual(config['BACKEND'], 'channels_redis.core.RedisChannelLayer')
+        self.assertEqual(config['CONFIG']['hosts'], ['redis://redis:6380/0'])
+        self.assertEqual(config['CONFIG']['capacity'], 200)
+        self.assertEqual(config['CONFIG']['expiry'], 10)
+        self.assertEqual(config['CONFIG']['group_expiry'], 7200)
+
+    def test_pubsub_layer_has_no_limits(self):
+        """Test the pub/sub layer only gets options it accepts"""
+        config = channel_layer_config('pubsub', 'redis', 6379)
+        self.assertEqual(config['BACKEND'], 'channels_redis.pubsub.RedisPubSubChannelLayer')
+        self.assertEqual(set(config['CONFIG']), {'hosts', 'prefix'})
+
+    def test_memory_layer_has_no_hosts(self):
+        """Test the in-memory layer needs no Redis"""
+        config = channel_layer_config('memory', capacity=50)
+        self.assertEqual(config['BACKEND'], 'channels.layers.InMemoryChannelLayer')
+        self.assertNotIn('hosts', config['CONFIG'])
+        self.assertEqual(config['CONFIG']['capacity'], 50)
+
+    def test_unknown_layer_rejected(self):
+        """Test a typo in CHANNEL_LAYER fails at startup"""
+        with self.assertRaises(ValueError):
+            channel_layer_config('rabbitmq')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+Unit tests for the cross-game leaderboard
+"""
+import asyncio
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import patch
+from django.test import override_settings
+from memory_game import leaderboard
+from memory_game.backends import MemoryStateBackend
+
+
+def make_game(*scores):
+    return {'players': {
+        f'p{i}': {'name': f'Player {i + 1}', 'score': score, 'identified': True} for i, score in enumerate(scores)
+    }}
+
+
+class TestBoards(unittest.TestCase):
+    """Test board keys per window"""
+
+    def test_keys_and_ttls(self):
+        """Test dated boards roll over by UTC day and ISO week and expire; all-time doesn't"""
+        now = datetime(2021, 1, 3, 23, 59, tzinfo=timezone.utc)
+        self.assertEqual(leaderboard.board('day', now), ('leaderboard:day:2021-01-03', 2 * leaderboard.DAY))
+        self.assertEqual(leaderboard.board('week', now), ('leaderboard:week:2020-W53', 8 * leaderboard.DAY))
+        self.assertEqual(leaderboard.board('all', now), ('leaderboard:all', None))
+        with self.assertRaises(ValueError):
+            leaderboard.board('month', now)
+
+
+class TestRecording(unittest.IsolatedAsyncioTestCase):
+    """Test points are credited in the background"""
+
+    async def asyncSetUp(self):
+        self.backend = MemoryStateBackend(rooms={})
+        patcher = patch('memory_game.leaderboard.get_backend', return_value=self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def settle(self):
+        await asyncio.gather(*leaderboard._updates)
+
+    async def test_matches_and_win_bonus(self):
+        """Test each match scores a point and every top scorer gets the bonus"""
+        game = make_game(2, 2, 1)
+        for player in ('p0', 'p0', 'p1', 'p1', 'p2'):
+            leaderboard.record_match(game, player)
+        with override_settings(LEADERBOARD_WIN_BONUS=3):
+            leaderboard.record_finish(game)
+        await self.settle()
+        self.assertEqual(await leaderboard.top('all', 10), [
+            {'rank': 1, 'player': 'p1', 'name': 'Player 2', 'score': 5},
+            {'rank': 2, 'player': 'p0', 'name': 'Player 1', 'score': 5},
+            {'rank': 3, 'player': 'p2', 'name': 'Player 3', 'score': 1},
+        ])
+        self.assertEqual(await leaderboard.rank('day', 'p2'), {'rank': 3, 'score': 1})
+
+    async def test_unidentified_players_not_credited(self):
+        """Test sockets playing under a channel name never reach the boards"""
+        game = make_game(1, 1)
+        game['players']['p1']['identified'] = False
+        leaderboard.record_match(game, 'p0')
+        leaderboard.record_match(game, 'p1')
+        leaderboard.record_finish(game)
+        await self.settle()
+        self.assertEqual([entry['player'] for entry in await leaderboard.top('all', 10)], ['p0'])
+
+    async def test_rank_cached(self):
+        """Test repeat rank lookups outside the top share one backend read per TTL"""
+        for i in range(3):
+            await leaderboard.add_points(f'p{i}', f'Player {i}', 10 - i)
+        with override_settings(LEADERBOARD_SIZE=1, LEADERBOARD_TTL=60), \
+                patch.object(self.backend, 'leaderboard_rank', wraps=self.backend.leaderboard_rank) as lookup:
+            for _ in range(3):
+                self.assertEqual(await leaderboard.rank('all', 'p2'), {'rank': 3, 'score': 8})
+            self.assertEqual(await leaderboard.rank('all', 'p1'), {'rank': 2, 'score': 9})
+        self.assertEqual(lookup.await_count, 2)
+
+    async def test_failures_are_logged(self):
+        """Test a backend error never reaches the game"""
+        with patch.object(self.backend, 'leaderboard_add', side_effect=ConnectionError('down')), \
+                self.assertLogs('memory_game.leaderboard', 'WARNING'):
+            leaderboard.record_match(make_game(1), 'p0')
+            await self.settle()
+
+    async def test_malformed_game_is_logged(self):
+        """Test game state points can't be worked out from is counted and logged, never raised"""
+        failures = leaderboard.UPDATE_FAILURES.labels().value
+        with self.assertLogs('memory_game.leaderboard', 'ERROR'):
+            leaderboard.record_match(make_game(1), 'nobody')
+            leaderboard.record_finish({'players': {'p0': {'name': 'Player 1'}}})
+        self.assertEqual(leaderboard.UPDATE_FAILURES.labels().value, failures + 2)
+
+    async def test_rank_outside_cached_top(self):
+        """Test a player below the cached top is ranked by the backend"""
+        for i in range(3):
+            await leaderboard.add_points(f'p{i}', f'Player {i}', 10 - i)
+        with override_settings(LEADERBOARD_SIZE=2):
+            self.assertEqual(await leaderboard.rank('week', 'p2'), {'rank': 3, 'score': 8})
+            self.assertIsNone(await leaderboard.rank('week', 'nobody'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+"""
+Unit tests for the load generator helpers
+"""
+import json
+import unittest
+from loadgen import Bot, Stats, parse_args, percentile, ramp_delays, summarize
+
+
+class TestLoadgenHelpers(unittest.TestCase):
+    """Test percentile maths and ramp profiles"""
+
+    def test_percentile_nearest_rank(self):
+        """Test nearest-rank percentiles"""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertIsNone(percentile([], 50))
+
+    def test_summarize_in_milliseconds(self):
+        """Test summaries are reported in milliseconds"""
+        summary = summarize([0.001, 0.002, 0.003])
+        self.assertEqual(summary['count'], 3)
+        self.assertEqual(summary['p50'], 2.0)
+        self.assertEqual(summary['max'], 3.0)
+        self.assertEqual(summarize([]), {'count': 0})
+
+    def test_ramp_profiles(self):
+        """Test linear, step and instant ramp-up offsets"""
+        self.assertEqual(ramp_delays(4, 8, 'linear'), [0, 2, 4, 6])
+        self.assertEqual(ramp_delays(4, 8, 'instant'), [0, 0, 0, 0])
+        self.assertEqual(ramp_delays(4, 8, 'step', steps=2), [0, 0, 4, 4])
+        self.assertEqual(ramp_delays(3, 0, 'linear'), [0, 0, 0])
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, text):
+        self.sent.append(json.loads(text))
+
+
+def update(cards=4, flipped=(), matched=(), your_turn=True):
+    return {'started': True, 'cards': ['a', 'b'] * (cards // 2), 'flipped': list(flipped),
+            'matched': list(matched), 'players': ['p0', 'p1'], 'is_your_turn': your_turn}
+
+
+class TestBot(unittest.IsolatedAsyncioTestCase):
+    """Test the bot keeps playing when flips go unanswered"""
+
+    def setUp(self):
+        self.bot = Bot(parse_args(['--think', '0', '--flip-timeout', '5']), Stats(), 'room', seat=1)
+        self.ws = FakeSocket()
+
+    async def test_unanswered_flip_expires(self):
+        """Test a flip with no update showing it is dropped after the timeout and the bot flips again"""
+        await self.bot.on_game(self.ws, update(), now=100.0)
+        self.assertEqual(len(self.ws.sent), 1)
+        self.bot.pending = dict.fromkeys(self.bot.pending, 100.0)
+        await self.bot.on_game(self.ws, update(), now=104.0)
+        self.assertEqual(len(self.ws.sent), 1)
+        await self.bot.on_game(self.ws, update(), now=105.0)
+        self.assertEqual(len(self.ws.sent), 2)
+        self.assertEqual(self.bot.stats.flips_expired, 1)
+
+    async def test_turn_change_clears_pending(self):
+        """Test flips still pending when the turn passes are forgotten"""
+        await self.bot.on_game(self.ws, update(), now=100.0)
+        await self.bot.on_game(self.ws, update(your_turn=False), now=100.5)
+        self.assertEqual(self.bot.pending, {})
+        await self.bot.on_game(self.ws, update(), now=101.0)
+        self.assertEqual(len(self.ws.sent), 2)
+
+    async def test_finish_uses_deck_size(self):
+        """Test a game is finished when every card of its deck is matched, whatever the size"""
+        self.bot.seat = 0
+        await self.bot.on_game(self.ws, update(cards=6, matched=range(6)), now=100.0)
+        self.assertEqual(self.bot.stats.games_finished, 1)
+        self.assertEqual(self.ws.sent, [{'action': 'start_game', 'theme': 'emoji'}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Unit tests for structured, sampled, queued logging
+"""
+import json
+import logging
+import unittest
+from unittest.mock import patch
+from memory_game.logs import QueueHandler, SamplingFilter, StructuredFormatter, parse_rates
+
+
+def make_record(msg, *args, level=logging.INFO):
+    return logging.LogRecord('memory_game.consumers', level, __file__, 1, msg, args, None)
+
+
+class TestStructuredFormatter(unittest.TestCase):
+    """Test JSON rendering of event templates"""
+
+    def test_fields_extracted_from_template(self):
+        """Test key=%s pairs become structured fields"""
+        record = make_record("ws.accept room=%s channel=%s count=%d", 'lobby', 'chan.1', 3)
+        entry = json.loads(StructuredFormatter().format(record))
+        self.assertEqual(entry['event'], 'ws.accept')
+        self.assertEqual(entry['room'], 'lobby')
+        self.assertEqual(entry['channel'], 'chan.1')
+        self.assertEqual(entry['count'], '3')
+        self.assertEqual(entry['message'], 'ws.accept room=lobby channel=chan.1 count=3')
+
+    def test_precision_format_fields(self):
+        """Test fields with precision specifiers are extracted"""
+        record = make_record("loop.stall blocked=%.3f", 0.25)
+        entry = json.loads(StructuredFormatter().format(record))
+        self.assertEqual(entry['blocked'], '0.25')
+
+
+class TestSamplingFilter(unittest.TestCase):
+    """Test per-event sampling and rate limiting"""
+
+    def test_parse_rates(self):
+        """Test sampling config string parsing"""
+        self.assertEqual(parse_rates('ws.accept=0.1, ws.disconnect=0.5'),
+                         {'ws.accept': 0.1, 'ws.disconnect': 0.5})
+        self.assertEqual(parse_rates(''), {})
+
+    def test_sampled_event_dropped(self):
+        """Test events are kept at their configured rate"""
+        sampling = SamplingFilter(rates='ws.accept=0.5')
+        with patch('memory_game.logs.random.random', return_value=0.7):
+            self.assertFalse(sampling.filter(make_record("ws.accept room=%s", 'a')))
+        with patch('memory_game.logs.random.random', return_value=0.2):
+            self.assertTrue(sampling.filter(make_record("ws.accept room=%s", 'a')))
+        self.assertTrue(sampling.filter(make_record("ws.disconnect room=%s", 'a')))
+
+    def test_rate_limit_per_event(self):
+        """Test each event is capped independently"""
+        sampling = SamplingFilter(rate_limit=3)
+        kept = [sampling.filter(make_record("ws.accept room=%s", i)) for i in range(10)]
+        self.assertEqual(sum(kept), 3)
+        self.assertTrue(sampling.filter(make_record("ws.disconnect room=%s", 'a')))
+
+    def test_warnings_never_sampled(self):
+        """Test warnings bypass sampling and rate limits"""
+        sampling = SamplingFilter(rates='ws.game_missing=0', rate_limit=1)
+        for _ in range(5):
+            self.assertTrue(sampling.filter(make_record("ws.game_missing room=%s", 'a', level=logging.WARNING)))
+
+
+class TestQueueHandler(unittest.TestCase):
+    """Test the non-blocking queue handler"""
+
+    def setUp(self):
+        self.handler = QueueHandler(maxsize=2)
+        self.handler.listener.stop()  # Keep records on the queue for inspection
+
+    def test_records_enqueued_unformatted(self):
+        """Test formatting is left to the listener thread"""
+        record = make_record("ws.accept room=%s", 'lobby')
+        self.handler.handle(record)
+        queued = self.handler.queue.get_nowait()
+        self.assertEqual(queued.msg, "ws.accept room=%s")
+        self.assertEqual(queued.args, ('lobby',))
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        """Test a full queue drops records"""
+        for i in range(5):
+            self.handler.handle(make_record("ws.accept room=%s", i))
+        self.assertEqual(self.handler.queue.qsize(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
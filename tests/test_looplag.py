@@ -0,0 +1,61 @@
+"""
+Unit tests for the event-loop lag monitor
+"""
+import asyncio
+import time
+import unittest
+from memory_game.looplag import LOOP_LAG, LoopLagMonitor
+
+
+class TestLoopLagMonitor(unittest.IsolatedAsyncioTestCase):
+    """Test lag sampling and stall capture"""
+
+    async def asyncSetUp(self):
+        self.monitor = LoopLagMonitor(interval=0.02, threshold=0.1, buffer_size=5)
+
+    async def asyncTearDown(self):
+        self.monitor.stop()
+
+    async def test_ensure_running_starts_once(self):
+        """Test ensure_running starts the sampler and is idempotent"""
+        self.monitor.ensure_running()
+        task = self.monitor._task
+        self.monitor.ensure_running()
+        self.assertTrue(self.monitor.running)
+        self.assertIs(task, self.monitor._task)
+
+    async def test_disabled_monitor_does_not_start(self):
+        """Test a disabled monitor stays idle"""
+        self.monitor.enabled = False
+        self.monitor.ensure_running()
+        self.assertFalse(self.monitor.running)
+
+    async def test_blocking_call_captures_stack(self):
+        """Test a blocking call on the loop is recorded with its stack"""
+        self.monitor.ensure_running()
+        await asyncio.sleep(0.05)
+        lag_before = LOOP_LAG._default.sum
+
+        def blocking_handler():
+            time.sleep(0.3)
+
+        blocking_handler()
+        await asyncio.sleep(0.05)
+
+        self.assertEqual(len(self.monitor.stalls), 1)
+        stall = self.monitor.stalls[0]
+        self.assertGreaterEqual(stall['blocked'], 0.1)
+        self.assertIn('blocking_handler', stall['stack'])
+        self.assertGreater(LOOP_LAG._default.sum - lag_before, 0.1)
+
+    async def test_disable_stops_sampler(self):
+        """Test disable() stops the running sampler"""
+        self.monitor.ensure_running()
+        self.monitor.disable()
+        await asyncio.sleep(0)
+        self.assertFalse(self.monitor.running)
+        self.assertFalse(self.monitor.enabled)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+Unit tests for the Prometheus metrics registry and endpoint
+"""
+import unittest
+from django.test import TestCase, Client
+from memory_game import metrics
+
+
+class TestMetricTypes(unittest.TestCase):
+    """Test metric children and text rendering"""
+
+    def setUp(self):
+        self.registry_size = len(metrics.REGISTRY)
+
+    def tearDown(self):
+        del metrics.REGISTRY[self.registry_size:]
+
+    def test_counter_labels_are_bound_once(self):
+        """Test labels() returns the same child for the same values"""
+        counter = metrics.Counter('test_counter_total', 'Test counter.', ['type'])
+        child = counter.labels('a')
+        self.assertIs(child, counter.labels('a'))
+        child.inc()
+        child.inc(2)
+        self.assertIn('test_counter_total{type="a"} 3', counter.render())
+
+    def test_labels_arity_checked(self):
+        """Test wrong number of label values is rejected"""
+        counter = metrics.Counter('test_arity_total', 'Test counter.', ['type'])
+        with self.assertRaises(ValueError):
+            counter.labels('a', 'b')
+
+    def test_gauge_inc_dec_set(self):
+        """Test gauge arithmetic"""
+        gauge = metrics.Gauge('test_gauge', 'Test gauge.')
+        gauge.inc(5)
+        gauge.dec(2)
+        self.assertIn('test_gauge 3', gauge.render())
+        gauge.set(7)
+        self.assertIn('test_gauge 7', gauge.render())
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test histogram renders cumulative buckets, sum and count"""
+        histogram = metrics.Histogram('test_seconds', 'Test histogram.', buckets=(0.1, 1.0))
+        histogram.observe(0.05)
+        histogram.observe(0.1)
+        histogram.observe(0.5)
+        histogram.observe(3.0)
+        lines = histogram.render()
+        self.assertIn('test_seconds_bucket{le="0.1"} 2', lines)
+        self.assertIn('test_seconds_bucket{le="1"} 3', lines)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 4', lines)
+        self.assertIn('test_seconds_count 4', lines)
+        self.assertIn('test_seconds_sum 3.65', lines)
+
+
+class TestMetricsEndpoint(TestCase):
+    """Test the /metrics view"""
+
+    def test_metrics_endpoint(self):
+        """Test /metrics serves Prometheus text format"""
+        response = Client().get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('text/plain', response['Content-Type'])
+        body = response.content.decode()
+        self.assertIn('# TYPE memory_game_receive_seconds histogram', body)
+        self.assertIn('memory_game_active_connections', body)
+        self.assertIn('memory_game_sent_bytes_total', body)
+
+
+if __name__ == '__main__':
+    unittest.main()
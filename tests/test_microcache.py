@@ -0,0 +1,54 @@
+"""
+Unit tests for the per-process micro-cache
+"""
+import asyncio
+import unittest
+from memory_game.microcache import MicroCache
+
+
+class TestMicroCache(unittest.IsolatedAsyncioTestCase):
+    """Test TTL reuse and single-flight refresh"""
+
+    async def test_concurrent_misses_share_one_load(self):
+        """Test callers arriving during a refresh await the same load"""
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return len(calls)
+
+        cache = MicroCache('test', ttl=60)
+        results = await asyncio.gather(*(cache.get(load) for _ in range(10)))
+        self.assertEqual(results, [1] * 10)
+        self.assertEqual(await cache.get(load), 1)
+        self.assertEqual(len(calls), 1)
+
+    async def test_expired_value_reloaded(self):
+        """Test a zero TTL reloads on every sequential call"""
+        calls = []
+
+        async def load():
+            calls.append(1)
+            return len(calls)
+
+        cache = MicroCache('test', ttl=0)
+        self.assertEqual(await cache.get(load), 1)
+        self.assertEqual(await cache.get(load), 2)
+
+    async def test_failures_are_not_cached(self):
+        """Test a failed load raises for its waiters and the next call retries"""
+        async def fail():
+            raise ConnectionError('down')
+
+        async def load():
+            return 'ok'
+
+        cache = MicroCache('test', ttl=60)
+        with self.assertRaises(ConnectionError):
+            await cache.get(fail)
+        self.assertEqual(await cache.get(load), 'ok')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+Unit tests for sampled profiling hooks
+"""
+import os
+import pstats
+import tempfile
+import unittest
+from memory_game.profiling import Profiler
+
+
+def busy():
+    return sum(i * i for i in range(1000))
+
+
+class TestProfiler(unittest.TestCase):
+    """Test sampling, output files and rotation"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_disabled_profiler_writes_nothing(self):
+        """Test sample rate 0 never profiles"""
+        profiler = Profiler(sample_rate=0, directory=self.dir)
+        with profiler.profile('ws', 'flip_card') as sample:
+            busy()
+        self.assertIsNone(sample)
+        self.assertEqual(os.listdir(self.dir), [])
+
+    def test_sampled_block_writes_pstats(self):
+        """Test a sampled block is dumped as a loadable pstats file"""
+        profiler = Profiler(sample_rate=1, directory=self.dir, clock='cpu')
+        with profiler.profile('ws', 'flip_card'):
+            busy()
+        files = os.listdir(self.dir)
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].startswith('ws-flip_card-'))
+        stats = pstats.Stats(os.path.join(self.dir, files[0]))
+        self.assertTrue(any(func[2] == 'busy' for func in stats.stats))
+
+    def test_nested_blocks_are_not_sampled_twice(self):
+        """Test only one sample is active per thread"""
+        profiler = Profiler(sample_rate=1, directory=self.dir)
+        with profiler.profile('http', 'outer'):
+            with profiler.profile('http', 'inner') as inner:
+                busy()
+        self.assertIsNone(inner)
+        self.assertEqual(len(os.listdir(self.dir)), 1)
+
+    def test_rotation_caps_file_count(self):
+        """Test old profiles are removed beyond max_files"""
+        profiler = Profiler(sample_rate=1, directory=self.dir, max_files=3)
+        for i in range(6):
+            with profiler.profile('ws', f'action{i}'):
+                busy()
+        self.assertEqual(len(os.listdir(self.dir)), 3)
+
+    def test_rotation_caps_total_size(self):
+        """Test old profiles are removed beyond max_bytes"""
+        profiler = Profiler(sample_rate=1, directory=self.dir, max_bytes=1)
+        with profiler.profile('ws', 'flip_card'):
+            busy()
+        self.assertEqual(os.listdir(self.dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
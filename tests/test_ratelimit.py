@@ -0,0 +1,101 @@
+"""
+Unit tests for inbound rate limits and frame pre-validation
+"""
+import json
+import unittest
+from unittest.mock import patch
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.test import override_settings
+from memory_game import ratelimit
+from memory_game.consumers import GameConsumer
+from memory_game.ratelimit import TokenBucket, room_bucket
+from memory_game.routing import websocket_urlpatterns
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Test token accounting"""
+
+    @patch('memory_game.ratelimit.time.monotonic')
+    def test_burst_then_rate(self, monotonic):
+        """Test a full bucket allows a burst, then refills at the rate"""
+        monotonic.return_value = 100.0
+        bucket = TokenBucket(rate=2, burst=3)
+        self.assertEqual([bucket.take() for _ in range(4)], [True, True, True, False])
+        self.assertAlmostEqual(bucket.wait(), 0.5)
+        monotonic.return_value = 100.5
+        self.assertTrue(bucket.take())
+        monotonic.return_value = 200.0
+        self.assertEqual(sum(bucket.take() for _ in range(10)), 3)
+
+    def test_room_bucket_shared_while_held(self):
+        """Test sockets in a room share one bucket, dropped with the last holder"""
+        first = room_bucket('rl_shared')
+        self.assertIs(room_bucket('rl_shared'), first)
+        del first
+        self.assertNotIn('rl_shared', ratelimit._room_buckets)
+
+
+class TestConsumerLimits(unittest.IsolatedAsyncioTestCase):
+    """Test spammed, oversized and out-of-turn frames never reach the backend"""
+
+    def setUp(self):
+        GameConsumer.games.clear()
+        self.socket = None
+
+    async def asyncTearDown(self):
+        if self.socket:
+            await self.socket.disconnect()
+
+    async def connect(self):
+        """Join rl_room; the socket's bucket follows the settings at connect"""
+        self.socket = WebsocketCommunicator(URLRouter(websocket_urlpatterns), '/ws/game/rl_room/')
+        await self.socket.connect()
+        await self.socket.receive_json_from()  # player_joined
+        await self.socket.receive_json_from()  # game_update
+
+    def dropped(self, reason):
+        return ratelimit.DROPPED[reason].value
+
+    async def send(self, message):
+        await self.socket.send_to(text_data=json.dumps(message))
+
+    async def test_prevalidation_skips_backend(self):
+        """Test unknown actions, oversized frames and out-of-turn flips are dropped unread"""
+        await self.connect()
+        GameConsumer.games['rl_room']['current_player'] = 'someone else'
+        await self.send({'action': 'start_game'})
+        await self.socket.receive_json_from()
+        before = {reason: self.dropped(reason) for reason in ratelimit.DROPPED}
+        with patch('memory_game.backends.MemoryStateBackend.get') as get:
+            await self.send({'action': 'flip_card', 'index': 0})
+            await self.send({'action': 'drop_tables'})
+            await self.socket.send_to(text_data='x' * 2000)
+            await self.socket.send_to(text_data='{not json')
+            self.assertTrue(await self.socket.receive_nothing())
+        get.assert_not_called()
+        for reason in ('invalid_move', 'unknown_action', 'too_large', 'bad_json'):
+            self.assertEqual(self.dropped(reason), before[reason] + 1, reason)
+
+    async def test_burst_is_dropped(self):
+        """Test frames past the burst are dropped"""
+        before = self.dropped('rate_limited')
+        with override_settings(WS_BURST=2):
+            await self.connect()
+            for _ in range(5):
+                await self.send({'action': 'drop_tables'})
+            await self.socket.receive_nothing()
+        self.assertEqual(self.dropped('rate_limited'), before + 3)
+
+    async def test_disconnect_response(self):
+        """Test WS_LIMIT_RESPONSE='disconnect' closes with a policy violation"""
+        with override_settings(WS_BURST=1, WS_LIMIT_RESPONSE='disconnect'):
+            await self.connect()
+            for _ in range(2):
+                await self.send({'action': 'drop_tables'})
+            output = await self.socket.receive_output()
+        self.assertEqual(output, {'type': 'websocket.close', 'code': ratelimit.CLOSE_POLICY_VIOLATION})
+
+
+if __name__ == '__main__':
+    unittest.main()
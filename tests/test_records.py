@@ -0,0 +1,128 @@
+"""
+Unit tests for binary game records and their export
+"""
+import io
+import os
+import sqlite3
+import tempfile
+import unittest
+from memory_game import records
+from memory_game.history import connect, game_row
+from memory_game.records import RecordFile, RecordWriter, decode, encode, export, game_record, read_records
+
+
+def finished_game():
+    cards = ['🦄', '🍕'] * 2
+    return {
+        'players': {'a': {'name': 'Player 1', 'score': 2}, 'c': {'name': 'Player 3', 'score': 0}},
+        'cards': cards,
+        'theme': 'emoji',
+        'seed': 42,
+        'started_at': 1000.0,
+        'flip_players': ['b', 'a'],
+        'flips': [[0, 0, 1500], [1, 0, 2100], [0, 1, 4000], [2, 1, 4200], [1, 1, 6000], [3, 1, 6300]],
+    }
+
+
+class TestEncoding(unittest.TestCase):
+    """Test records survive a round trip"""
+
+    def test_game_record_round_trip(self):
+        """Test a game state's record decodes to the same deck, players and flips"""
+        record = game_record('room', finished_game(), finished_at=1010.5)
+        self.assertEqual([p['id'] for p in record['players']], ['b', 'a', 'c'])
+        self.assertEqual(record['players'][0], {'id': 'b', 'name': '', 'score': 0})
+        data = encode(record)
+        self.assertLess(len(data), 150)
+        self.assertEqual(decode(data), record)
+
+    def test_missing_seed_and_start(self):
+        """Test games without a seed or start time keep them as None"""
+        game = dict(finished_game(), seed=None, started_at=None)
+        self.assertEqual(decode(encode(game_record('r', game, 5.0)))['seed'], None)
+        self.assertEqual(decode(encode(game_record('r', game, 5.0)))['started_at'], None)
+
+    def test_skewed_clock_clamped(self):
+        """Test flips stamped before started_at (another pod's clock ahead) still encode"""
+        game = dict(finished_game(), flips=[[0, 0, -250], [1, 0, 300]])
+        record = decode(encode(game_record('r', game, 5.0)))
+        self.assertEqual(record['flips'], [(0, 0, 0), (1, 0, 300)])
+
+    def test_unknown_version_rejected(self):
+        """Test a record from a newer format is refused, not misread"""
+        data = bytearray(encode(game_record('r', finished_game(), 5.0)))
+        data[0] = records.VERSION + 1
+        with self.assertRaises(ValueError):
+            decode(bytes(data))
+
+
+class TestFiles(unittest.TestCase):
+    """Test streaming and memory-mapped reading of record files"""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.records = [game_record(f'room{i}', finished_game(), 1000.0 + i) for i in range(5)]
+
+    def test_stream_and_map(self):
+        """Test a written file reads back the same from a stream and from a map"""
+        buffer = io.BytesIO()
+        writer = RecordWriter(buffer)
+        for record in self.records:
+            writer.write(record)
+        self.assertEqual(writer.bytes, len(buffer.getvalue()))
+        buffer.seek(0)
+        self.assertEqual(list(read_records(buffer)), self.records)
+        path = os.path.join(self.dir.name, 'games.mgr')
+        with open(path, 'wb') as file:
+            file.write(buffer.getvalue())
+        with RecordFile(path) as mapped:
+            self.assertEqual(len(list(mapped.offsets())), 5)
+            self.assertEqual(list(mapped), self.records)
+
+    def test_bad_files(self):
+        """Test foreign and truncated files raise"""
+        with self.assertRaises(ValueError):
+            list(read_records(io.BytesIO(b'nope')))
+        buffer = io.BytesIO()
+        RecordWriter(buffer).write(self.records[0])
+        with self.assertRaises(ValueError):
+            list(read_records(io.BytesIO(buffer.getvalue()[:-1])))
+
+    def test_export_rotates(self):
+        """Test export splits files at max_bytes and resumes after the last id"""
+        db_path = os.path.join(self.dir.name, 'history.sqlite3')
+        db = connect(db_path)
+        with db:
+            db.executemany(
+                'INSERT INTO games (room, theme, seed, players, moves, started_at, finished_at, duration, record) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [game_row(f'room{i}', finished_game(), 1000.0 + i) for i in range(5)],
+            )
+        db.close()
+        size = len(encode(self.records[0])) + records.LENGTH.size
+        out = os.path.join(self.dir.name, 'out')
+        files, count, last_id = export(db_path, out, max_bytes=len(records.MAGIC) + 2 * size)
+        self.assertEqual((len(files), count, last_id), (3, 5, 5))
+        self.assertEqual(sorted(os.listdir(out)), [f'games-{i:010d}.mgr' for i in (1, 3, 5)])
+        rooms = []
+        for path in files:
+            with RecordFile(path) as mapped:
+                rooms.extend(record['room'] for record in mapped)
+        self.assertEqual(rooms, [f'room{i}' for i in range(5)])
+        self.assertEqual(export(db_path, out, after_id=last_id), ([], 0, 5))
+
+    def test_old_history_gets_record_column(self):
+        """Test a history file from before records gains the column"""
+        db_path = os.path.join(self.dir.name, 'old.sqlite3')
+        with sqlite3.connect(db_path) as db:
+            db.execute('CREATE TABLE games (id INTEGER PRIMARY KEY, room TEXT, finished_at REAL)')
+        db.close()
+        db = connect(db_path)
+        columns = [column[1] for column in db.execute('PRAGMA table_info(games)')]
+        db.close()
+        self.assertIn('record', columns)
+
+
+if __name__ == '__main__':
+    unittest.main()
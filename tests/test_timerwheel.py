@@ -0,0 +1,79 @@
+"""
+Unit tests for the hierarchical timer wheel
+"""
+import random
+import unittest
+from memory_game.timerwheel import TimerWheel
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestTimerWheel(unittest.TestCase):
+    """Test timers fire on their tick across every level"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.wheel = TimerWheel(tick=1, slots=8, levels=3, clock=self.clock)
+        self.fired = []
+
+    def run_for(self, seconds):
+        for _ in range(seconds):
+            self.clock.now += 1
+            self.wheel.advance()
+
+    def schedule(self, delay, name):
+        return self.wheel.schedule(delay, lambda: self.fired.append((name, self.clock.now)))
+
+    def test_fires_on_time_at_every_level(self):
+        """Test random delays, including ones cascaded from upper levels, fire exactly"""
+        start = self.clock.now
+        delays = {f't{i}': random.randint(1, self.wheel.horizon) for i in range(2000)}
+        for name, delay in delays.items():
+            self.schedule(delay, name)
+        self.run_for(self.wheel.horizon + 1)
+        self.assertEqual(len(self.fired), len(delays))
+        for name, when in self.fired:
+            self.assertEqual(when - start, delays[name], name)
+        self.assertEqual(self.wheel.pending, 0)
+
+    def test_cancel_and_reschedule(self):
+        """Test cancelled timers never fire and rescheduled ones fire once, later"""
+        cancelled = self.schedule(5, 'cancelled')
+        moved = self.schedule(5, 'moved')
+        self.wheel.cancel(cancelled)
+        self.wheel.reschedule(moved, 100)
+        self.assertEqual(self.wheel.pending, 1)
+        self.run_for(99)
+        self.assertEqual(self.fired, [])
+        self.run_for(1)
+        self.assertEqual([name for name, _ in self.fired], ['moved'])
+        self.wheel.reschedule(moved, 2)  # fired timers can be re-armed
+        self.run_for(2)
+        self.assertEqual(len(self.fired), 2)
+
+    def test_idle_wheel_catches_up(self):
+        """Test a wheel left idle doesn't fire new timers early"""
+        self.clock.now += 10000
+        self.schedule(3, 'late')
+        self.run_for(2)
+        self.assertEqual(self.fired, [])
+        self.run_for(1)
+        self.assertEqual(len(self.fired), 1)
+
+    def test_callback_errors_are_contained(self):
+        """Test one failing callback doesn't stop the others"""
+        self.wheel.schedule(1, lambda: 1 / 0)
+        self.schedule(1, 'ok')
+        with self.assertLogs('memory_game.timerwheel', 'ERROR'):
+            self.run_for(1)
+        self.assertEqual([name for name, _ in self.fired], ['ok'])
+
+
+if __name__ == '__main__':
+    unittest.main()
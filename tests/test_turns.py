@@ -0,0 +1,140 @@
+"""
+Unit tests for server-side turn time limits
+"""
+import asyncio
+import time
+import unittest
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from unittest.mock import patch
+from django.test import override_settings
+from memory_game.consumers import GameConsumer, expire_turn, turn_timers
+from memory_game.routing import websocket_urlpatterns
+from memory_game.turns import RoomTimers, pass_turn, start_turn
+from memory_game.timerwheel import TimerWheel
+
+
+def make_game():
+    return {
+        'players': {'a': {'name': 'Player 1'}, 'b': {'name': 'Player 2'}},
+        'cards': ['x', 'x'],
+        'flipped': [0],
+        'matched': [],
+        'current_player': 'a',
+        'started': True,
+    }
+
+
+class TestTurnClock(unittest.TestCase):
+    """Test when the turn clock runs"""
+
+    def test_start_and_pass_turn(self):
+        """Test passing the turn moves on, clears flips and restarts the clock"""
+        game = make_game()
+        with override_settings(TURN_TIME_LIMIT=30):
+            start_turn(game)
+            self.assertAlmostEqual(game['turn_deadline'], time.time() + 30, delta=1)
+            pass_turn(game)
+        self.assertEqual(game['current_player'], 'b')
+        self.assertEqual(game['flipped'], [])
+
+    def test_no_clock_when_disabled_or_finished(self):
+        """Test no deadline before the start, after the last match, or with no limit"""
+        game = make_game()
+        with override_settings(TURN_TIME_LIMIT=0):
+            start_turn(game)
+        self.assertIsNone(game['turn_deadline'])
+        game['matched'] = [0, 1]
+        start_turn(game)
+        self.assertIsNone(game['turn_deadline'])
+
+
+class TestRoomTimers(unittest.IsolatedAsyncioTestCase):
+    """Test one timer per room follows the room's deadline"""
+
+    async def test_deadline_moves_timer(self):
+        """Test a new deadline reschedules rather than adding a timer"""
+        expired = []
+
+        async def expire(room, deadline):
+            expired.append((room, deadline))
+
+        timers = RoomTimers(TimerWheel(tick=0.01), expire)
+        timers.watch('r', {'turn_deadline': time.time() + 60})
+        deadline = time.time() + 0.05
+        timers.watch('r', {'turn_deadline': deadline})
+        timers.watch('r', {'turn_deadline': deadline})
+        self.assertEqual(timers.wheel.pending, 1)
+        await asyncio.sleep(0.2)
+        self.assertEqual(expired, [('r', deadline)])
+        timers.watch('r', {'turn_deadline': time.time() + 0.05})
+        timers.watch('r', None)
+        self.assertEqual(timers.wheel.pending, 0)
+
+    async def test_early_timer_rearms(self):
+        """Test a timer due before its deadline waits out the rest instead of expiring"""
+        expired = []
+
+        async def expire(room, deadline):
+            expired.append((room, deadline))
+
+        timers = RoomTimers(TimerWheel(tick=0.01), expire)
+        deadline = time.time() + 0.3
+        # Armed as if the wall clock were ahead, so the wheel comes due ~0.28s early
+        with patch('memory_game.turns.time.time', return_value=deadline - 0.02):
+            timers.watch('r', {'turn_deadline': deadline})
+        await asyncio.sleep(0.1)
+        self.assertEqual(expired, [])
+        self.assertEqual(timers.wheel.pending, 1)
+        await asyncio.sleep(0.4)
+        self.assertEqual(expired, [('r', deadline)])
+
+
+class TestTurnTimeout(unittest.IsolatedAsyncioTestCase):
+    """Test an idle player loses the turn and everyone hears about it"""
+
+    def setUp(self):
+        GameConsumer.games.clear()
+        self.sockets = []
+
+    async def asyncTearDown(self):
+        for socket in self.sockets:
+            await socket.disconnect()
+        turn_timers.forget('turn_room')
+
+    async def join(self):
+        socket = WebsocketCommunicator(URLRouter(websocket_urlpatterns), '/ws/game/turn_room/')
+        await socket.connect()
+        self.sockets.append(socket)
+        return socket
+
+    async def next_of_type(self, socket, type_):
+        while True:
+            message = await socket.receive_json_from(timeout=3)
+            if message['type'] == type_:
+                return message
+
+    async def test_idle_turn_passes(self):
+        """Test the turn moves to the next player when the clock runs out"""
+        first = await self.join()
+        second = await self.join()
+        with override_settings(TURN_TIME_LIMIT=0.3):
+            await first.send_json_to({'action': 'start_game', 'theme': 'emoji'})
+            timeout = await self.next_of_type(second, 'turn_timeout')
+        self.assertEqual(timeout['player'], 'Player 1')
+        update = await self.next_of_type(second, 'game_update')
+        self.assertEqual(update['game']['current_player'], 'Player 2')
+        self.assertTrue(update['game']['is_your_turn'])
+        self.assertGreater(update['game']['turn_time_left'], 0)
+
+    async def test_early_expiry_keeps_turn(self):
+        """Test expiring before the deadline leaves the turn alone and re-arms the timer"""
+        deadline = time.time() + 60
+        GameConsumer.games['turn_room'] = dict(make_game(), turn_deadline=deadline)
+        await expire_turn('turn_room', deadline)
+        self.assertEqual(GameConsumer.games['turn_room']['current_player'], 'a')
+        self.assertEqual(turn_timers.timers['turn_room'][0], deadline)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,25 @@
 """
 Unit tests for Django views
 """
+import asyncio
 import json
 import unittest
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, AsyncMock, MagicMock
 import redis
+from memory_game import identity
+from memory_game.backends import MemoryStateBackend
+from memory_game.leaderboard import add_points
+
+
+def serve_keys(mock_redis, keys, get):
+    """Answer the async client's SCAN/MGET with `keys` and `get(key)`"""
+    async def scan_iter(match=None, count=None):
+        for key in keys:
+            yield key
+    mock_redis.scan_iter.side_effect = scan_iter
+    mock_redis.mget = AsyncMock(side_effect=lambda batch: [get(key) for key in batch])
 
 
 class TestViews(TestCase):
@@ -56,12 +69,13 @@ class TestViews(TestCase):
         self.assertContains(response, 'start-btn')
         self.assertContains(response, 'game-board')
     
-    @patch('memory_game.views.redis.Redis')
+    @override_settings(GAME_STATE_BACKEND='redis')
+    @patch('redis.asyncio.Redis')
     def test_list_rooms_api_empty(self, mock_redis_class):
         """Test list rooms API returns empty list when no rooms"""
         mock_redis = MagicMock()
         mock_redis_class.return_value = mock_redis
-        mock_redis.keys.return_value = []
+        serve_keys(mock_redis, [], lambda key: None)
         
         response = self.client.get('/api/rooms')
         self.assertEqual(response.status_code, 200)
@@ -69,14 +83,14 @@ class TestViews(TestCase):
         self.assertIn('rooms', data)
         self.assertEqual(len(data['rooms']), 0)
     
-    @patch('memory_game.views.redis.Redis')
+    @override_settings(GAME_STATE_BACKEND='redis')
+    @patch('redis.asyncio.Redis')
     def test_list_rooms_api_with_active_rooms(self, mock_redis_class):
         """Test list rooms API with active games"""
         mock_redis = MagicMock()
         mock_redis_class.return_value = mock_redis
         
         # Mock Redis data
-        mock_redis.keys.return_value = ['game:room1', 'game:room2']
         
         room1_data = json.dumps({
             'players': {
@@ -102,7 +116,8 @@ class TestViews(TestCase):
             'started': True
         })
         
-        mock_redis.get.side_effect = lambda key: room1_data if key == 'game:room1' else room2_data
+        serve_keys(mock_redis, ['game:room1', 'game:room2'],
+                   lambda key: room1_data if key == 'game:room1' else room2_data)
         
         response = self.client.get('/api/rooms')
         self.assertEqual(response.status_code, 200)
@@ -182,7 +197,8 @@ class TestViews(TestCase):
         response = self.client.get('/invalid/url/')
         self.assertEqual(response.status_code, 404)
     
-    @patch('memory_game.views.redis.Redis')
+    @override_settings(GAME_STATE_BACKEND='redis')
+    @patch('redis.asyncio.Redis')
     def test_multiple_concurrent_rooms(self, mock_redis_class):
         """Test handling multiple game rooms simultaneously"""
         mock_redis = MagicMock()
@@ -190,7 +206,6 @@ class TestViews(TestCase):
         
         # Create 5 different rooms in Redis
         room_keys = [f'game:room{i}' for i in range(5)]
-        mock_redis.keys.return_value = room_keys
         
         def get_room_data(key):
             room_num = int(key.split('room')[1])
@@ -204,12 +219,227 @@ class TestViews(TestCase):
                 'started': room_num % 2 == 0
             })
         
-        mock_redis.get.side_effect = get_room_data
+        serve_keys(mock_redis, room_keys, get_room_data)
         
         response = self.client.get('/api/rooms')
         data = json.loads(response.content)
         self.assertEqual(len(data['rooms']), 5)
 
 
+class TestAsyncApi(TestCase):
+    """Test the async /api/* views"""
+
+    @override_settings(API_CONCURRENCY=2)
+    async def test_backend_reads_are_bounded(self):
+        """Test no more than API_CONCURRENCY reads reach the backend at once"""
+        import asyncio
+        from memory_game.views import load_room_list
+        in_flight = []
+
+        class SlowBackend:
+            async def active(self):
+                in_flight.append(1)
+                peak.append(len(in_flight))
+                await asyncio.sleep(0.01)
+                in_flight.pop()
+                return {}
+
+        peak = []
+        with patch('memory_game.views.get_backend', return_value=SlowBackend()), \
+                patch.dict('memory_game.views._api_slots', clear=True):
+            results = await asyncio.gather(*(load_room_list() for _ in range(6)))
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(results[0][0], b'{"rooms": []}')
+
+    @override_settings(ROOM_LIST_TTL=60)
+    async def test_room_list_cached(self):
+        """Test concurrent and repeat requests share one backend read"""
+        import asyncio
+        from django.test import RequestFactory
+        from memory_game.views import list_rooms
+        backend = MagicMock()
+        backend.active = AsyncMock(return_value={'r1': {'players': {'p': {'name': 'P'}}}})
+        request = RequestFactory().get('/api/rooms')
+        with patch('memory_game.views.get_backend', return_value=backend):
+            responses = await asyncio.gather(*(list_rooms(request) for _ in range(5)))
+            responses.append(await list_rooms(request))
+        backend.active.assert_awaited_once()
+        self.assertEqual(len({r.content for r in responses}), 1)
+        self.assertEqual(json.loads(responses[0].content)['rooms'][0]['name'], 'r1')
+
+    @override_settings(ROOM_LIST_TTL=0)
+    def test_wsgi_requests_share_api_loop(self):
+        """Test under WSGI every API request's backend reads run on the process's one API loop"""
+        import asyncio
+        from memory_game import apiloop
+        loops = []
+
+        class Backend:
+            async def active(self):
+                loops.append(asyncio.get_running_loop())
+                return {}
+
+        apiloop.enable()
+        self.addCleanup(apiloop.stop)
+        with patch('memory_game.views.get_backend', return_value=Backend()):
+            for _ in range(3):
+                self.assertEqual(self.client.get('/api/rooms').status_code, 200)
+        self.assertEqual(loops, [apiloop.get_loop()] * 3)
+
+    @override_settings(ROOM_LIST_TTL=60)
+    def test_room_list_not_modified(self):
+        """Test a matching If-None-Match gets an empty 304"""
+        response = self.client.get('/api/rooms')
+        etag = response['ETag']
+        response = self.client.get('/api/rooms', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+
+class TestDecksApi(TestCase):
+    """Test the batch deck endpoint"""
+
+    def test_batch(self):
+        """Test count and pairs shape the response"""
+        response = self.client.get('/api/decks?theme=animals&count=3&pairs=4')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual(data['pairs'], 4)
+        self.assertEqual([len(deck) for deck in data['decks']], [8, 8, 8])
+        self.assertEqual(response['Cache-Control'], 'no-store')
+
+    def test_defaults(self):
+        """Test DECK_BATCH_DEFAULT full-size decks when only the theme is given"""
+        data = json.loads(self.client.get('/api/decks?theme=emoji').content)
+        self.assertEqual(len(data['decks']), 5)
+        self.assertTrue(all(len(deck) == 16 for deck in data['decks']))
+
+    def test_seeded_batch_repeats(self):
+        """Test a seed returns the same decks"""
+        first = json.loads(self.client.get('/api/decks?seed=7&count=2').content)
+        second = json.loads(self.client.get('/api/decks?seed=7&count=2').content)
+        self.assertEqual(first['decks'], second['decks'])
+        self.assertEqual(first['seed'], 7)
+
+    def test_invalid_parameters(self):
+        """Test out-of-range or non-numeric parameters are a 400"""
+        for query in ('count=0', 'count=21', 'pairs=9', 'pairs=1', 'seed=x'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'/api/decks?{query}').status_code, 400)
+
+
+class TestQuickJoinApi(TestCase):
+    """Test the quick join endpoint"""
+
+    def setUp(self):
+        self.backend = MemoryStateBackend(rooms={})
+        patcher = patch('memory_game.matchmaking.get_backend', return_value=self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_creates_then_fills_room(self):
+        """Test the first quick join opens a room and the next one is sent to it"""
+        first = json.loads(self.client.post('/api/quick-join?theme=food').content)
+        self.assertTrue(first['created'])
+        self.assertEqual(first['theme'], 'food')
+        second = json.loads(self.client.post('/api/quick-join?theme=food').content)
+        self.assertEqual(second, dict(first, created=False))
+        other = json.loads(self.client.post('/api/quick-join?theme=animals').content)
+        self.assertNotEqual(other['room'], first['room'])
+
+    def test_unknown_theme_and_method(self):
+        """Test unknown themes fall back to emoji and GET is refused"""
+        data = json.loads(self.client.post('/api/quick-join?theme=nope').content)
+        self.assertEqual(data['theme'], 'emoji')
+        self.assertEqual(self.client.get('/api/quick-join').status_code, 405)
+
+
+class TestLeaderboardApi(TestCase):
+    """Test the leaderboard endpoint"""
+
+    def setUp(self):
+        self.backend = MemoryStateBackend(rooms={})
+        patcher = patch('memory_game.leaderboard.get_backend', return_value=self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for player, name, points in (('p1', 'Ann', 3), ('p2', 'Bob', 5), ('p3', 'Cy', 1)):
+            asyncio.run(add_points(player, name, points))
+
+    def test_top_and_rank(self):
+        """Test the top comes back ranked and ?player= adds that player's rank"""
+        data = json.loads(self.client.get('/api/leaderboard?window=week&count=2&player=p3').content)
+        self.assertEqual(data['top'], [
+            {'rank': 1, 'player': 'p2', 'name': 'Bob', 'score': 5},
+            {'rank': 2, 'player': 'p1', 'name': 'Ann', 'score': 3},
+        ])
+        self.assertEqual(data['me'], {'rank': 3, 'score': 1})
+        data = json.loads(self.client.get('/api/leaderboard?window=day&player=nobody').content)
+        self.assertEqual(len(data['top']), 3)
+        self.assertIsNone(data['me'])
+
+    def test_bad_parameters(self):
+        """Test unknown windows and out-of-range counts are refused"""
+        for query in ('window=month', 'count=0', 'count=x'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'/api/leaderboard?{query}').status_code, 400)
+
+
+class TestPlayerApi(TestCase):
+    """Test the player token endpoint"""
+
+    def test_issues_then_renews(self):
+        """Test a new browser gets a signed cookie and keeps its player id on renewal"""
+        response = self.client.post('/api/player')
+        player = json.loads(response.content)['player']
+        cookie = response.cookies['player']
+        self.assertTrue(cookie['httponly'])
+        self.assertEqual(identity.verify(cookie.value), player)
+        self.assertEqual(json.loads(self.client.post('/api/player').content)['player'], player)
+        self.client.cookies['player'] = 'forged'
+        self.assertNotEqual(json.loads(self.client.post('/api/player').content)['player'], player)
+        self.assertEqual(self.client.get('/api/player').status_code, 405)
+
+
+class TestPageCaching(TestCase):
+    """Test pre-rendered pages and conditional GETs"""
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_lobby_revalidates_with_304(self):
+        """Test the lobby carries validators and a matching ETag gets a 304"""
+        response = self.client.get('/')
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        self.assertIn('max-age=60', response['Cache-Control'])
+        response = self.client.get('/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_game_etag_varies_by_room(self):
+        """Test each room has its own ETag and another room's doesn't match"""
+        first = self.client.get('/game/room1/')
+        second = self.client.get('/game/room2/')
+        self.assertNotEqual(first['ETag'], second['ETag'])
+        response = self.client.get('/game/room2/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_room_name_escaped(self):
+        """Test the room name is escaped where it's joined into the page"""
+        response = self.client.get('/game/a<b/')
+        self.assertContains(response, 'const roomName = "a&lt;b";')
+        self.assertNotContains(response, 'a<b')
+
+    def test_template_rendered_once(self):
+        """Test repeat hits reuse the rendering"""
+        self.client.get('/game/room1/')
+        self.client.get('/')
+        with patch('memory_game.pages.get_template') as get_template:
+            self.client.get('/game/room3/')
+            self.client.get('/')
+        get_template.assert_not_called()
+
+
 if __name__ == '__main__':
     unittest.main()